@@ -0,0 +1 @@
+#Shared functions for the hierarchy assignment and fuzzy matching notebooks.
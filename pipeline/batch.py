@@ -0,0 +1,268 @@
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from pipeline.data_utils import consolidate_competitors_df
+from pipeline.fuzzy_match import TOP_N_MATCHES, BlockPool, allocate_result_buffers, build_store_index, fill_store_results
+from pipeline.fuzzy_match import match_store_index, materialize_results, query_sort_key
+from pipeline.instrumentation import ProgressReporter, RunReport, StageRecord, iter_progress
+from pipeline.nike_stages import NIKE_STAGES, competitors_clean
+from pipeline.output_writer import ChunkedWriter
+from pipeline.runner import complete_config, stage_rows_out, start_stage, topological_order
+
+#One carga_competitors scrape matched for several clients. The competitor files are
+#   read once, cleaned once for the Nike hierarchy clients and indexed per store once
+#   for the fuzzy_farma clients; then every client runs in a forked worker that reads
+#   that corpus through copy-on-write pages instead of loading its own copy.
+#   Example (batch.json):
+#
+#   {"competitors_path": "/data/carga_competitors", "delivery_date": "2025-12-05",
+#    "report_dir": "/data/run_reports", "parallel_clients": 2,
+#    "clients": ["/etc/deliveries/nike_mx.json",
+#                {"pipeline": "fuzzy_farma", "base_path": "/data/fuzzy/", "client_name": "soriana",
+#                 "client_file": "soriana.csv"}]}
+#
+#   python -m pipeline.batch batch.json
+#
+#   Clients are runner configs (a path or the config itself). delivery_date and
+#   run_date are the ones of the batch, their competitors come from competitors_path.
+DEFAULT_BATCH_CONFIG = {'workers': os.cpu_count(),
+                        'parallel_clients': None,
+                        'report_dir': None,
+                        'run_date': None}
+REQUIRED_BATCH_CONFIG = ['competitors_path', 'delivery_date', 'clients']
+FUZZY_REQUIRED_CONFIG = ['base_path', 'client_name', 'client_file']
+
+#Nike stages the shared corpus replaces, and the frames it gives them
+SHARED_NIKE_STAGES = ['competitors_ingest', 'competitors_clean']
+SHARED_NIKE_FRAMES = ['competitors', 'competitors_usa']
+#Store columns the fuzzy_farma suggestions are filled from
+STORE_COLUMNS = ['UPC', 'Item', 'URL SKU', 'Image', 'Final Price']
+
+#Corpus of the running batch. Set before the workers fork so they inherit it;
+#   never passed as an argument (that would pickle a copy per client).
+_dictCorpus = None
+
+#Start Config
+def load_batch_config(strConfig_Path, dictOverrides = None):
+    with open(strConfig_Path, encoding = 'utf-8') as fileConfig:
+        dictBatch = {**DEFAULT_BATCH_CONFIG, **json.load(fileConfig), **(dictOverrides or {})}
+
+    lstMissing = [strKey for strKey in REQUIRED_BATCH_CONFIG if not dictBatch.get(strKey)]
+    if lstMissing:
+        raise ValueError(f'Batch config {strConfig_Path} is missing {lstMissing}.')
+
+    dictBatch['run_date'] = dictBatch['run_date'] or date.today().isoformat()
+    dictBatch['report_dir'] = dictBatch['report_dir'] or os.path.join(
+        os.path.dirname(os.path.normpath(dictBatch['competitors_path'])), 'run_reports')
+    dictBatch['workers'] = dictBatch['workers'] or 1
+
+    strConfig_Dir = os.path.dirname(os.path.abspath(strConfig_Path))
+    dictBatch['clients'] = [client_config(objClient, dictBatch, strConfig_Dir) for objClient in dictBatch['clients']]
+    lstNames = [dictClient['client_name'] for dictClient in dictBatch['clients']]
+    if len(set(lstNames)) < len(lstNames):
+        raise ValueError(f'Client names must be unique in a batch, got {lstNames}.')
+    return dictBatch
+
+#Config of one client: its runner config (file or dict) with the dates of the batch.
+#   Clients run one per worker, so each one matches on a single process by default.
+def client_config(objClient, dictBatch, strConfig_Dir):
+    strSource = 'client'
+    if isinstance(objClient, str):
+        strSource = os.path.join(strConfig_Dir, objClient)
+        with open(strSource, encoding = 'utf-8') as fileConfig:
+            objClient = json.load(fileConfig)
+
+    dictClient = {'pipeline': 'nike_hierarchy', 'workers': 1, **objClient,
+                  'delivery_date': dictBatch['delivery_date'], 'run_date': dictBatch['run_date']}
+    if dictClient['pipeline'] not in BATCH_CLIENTS:
+        raise ValueError(f"Unknown pipeline {dictClient['pipeline']!r} in {strSource}, use one of {list(BATCH_CLIENTS)}.")
+    if dictClient['pipeline'] == 'nike_hierarchy':
+        return complete_config(dictClient, strSource)
+
+    lstMissing = [strKey for strKey in FUZZY_REQUIRED_CONFIG if not dictClient.get(strKey)]
+    if lstMissing:
+        raise ValueError(f'Config {strSource} is missing {lstMissing}.')
+    dictClient['report_dir'] = dictClient.get('report_dir') or os.path.join(dictClient['base_path'], 'run_reports')
+    dictClient['top_n'] = dictClient.get('top_n') or TOP_N_MATCHES
+    return dictClient
+#End Config
+
+#Start Shared Corpus
+#Block, UPC index and suggestion columns of every store, in the order the stores
+#   appear (df_comparar['Store ID'].unique() of the notebook)
+def build_store_indexes(dfCompetitors):
+    dictStore_Rows = dfCompetitors.groupby('Store ID', sort = False, observed = True).indices
+    dictColumns = {strColumn: dfCompetitors[strColumn].to_numpy(dtype = object) for strColumn in STORE_COLUMNS}
+
+    lstStores = []
+    for objStore_ID in iter_progress(dfCompetitors['Store ID'].unique(), 'store indexes'):
+        arrRows = dictStore_Rows.get(objStore_ID, np.empty(0, dtype = np.int64))
+        dictStore_Columns = {strColumn: arrColumn[arrRows] for strColumn, arrColumn in dictColumns.items()}
+        lstStores.append({'store_id': objStore_ID,
+                          'columns': dictStore_Columns,
+                          **build_store_index(dictStore_Columns['Item'].tolist(), dictStore_Columns['UPC'].tolist())})
+    return lstStores
+
+#Reads carga_competitors once and builds only what the clients of the batch use
+def load_corpus(dictBatch, report):
+    setPipelines = {dictClient['pipeline'] for dictClient in dictBatch['clients']}
+
+    with report.stage('ingest') as stageRecord:
+        dfCompetitors = consolidate_competitors_df(dictBatch['competitors_path'], intWorkers = dictBatch['workers'])
+        stageRecord.intRows_Out = len(dfCompetitors)
+
+    dictCorpus = {}
+    if 'fuzzy_farma' in setPipelines:
+        with report.stage('store_index', len(dfCompetitors)) as stageRecord:
+            dictCorpus['stores'] = build_store_indexes(dfCompetitors)
+            stageRecord.count('stores', len(dictCorpus['stores']))
+            stageRecord.intRows_Out = sum(dictStore['size'] for dictStore in dictCorpus['stores'])
+
+    if 'nike_hierarchy' in setPipelines:
+        stageRecord = report.start('clean', len(dfCompetitors))
+        dictCorpus.update(competitors_clean(dictBatch, {'competitors_raw': dfCompetitors}, stageRecord))
+        report.end('clean', sum(len(dictCorpus[strFrame]) for strFrame in SHARED_NIKE_FRAMES))
+    return dictCorpus
+#End Shared Corpus
+
+#Start Clients
+#Nike hierarchy stages after competitors_clean, in dependency order, on the
+#   cleaned competitors of the corpus. Frames stay in memory (no stage cache).
+def run_nike_client(dictConfig, dictCorpus, report):
+    dictStage_Frames = {'competitors_clean': {strFrame: dictCorpus[strFrame] for strFrame in SHARED_NIKE_FRAMES}}
+    lstOutputs = []
+    for strStage in topological_order(NIKE_STAGES):
+        if strStage in SHARED_NIKE_STAGES:
+            continue
+        dictStage = NIKE_STAGES[strStage]
+        dictFrames = {strFrame: df for strDependency in dictStage['deps']
+                      for strFrame, df in dictStage_Frames[strDependency].items()}
+
+        stageRecord = start_stage(strStage, dictFrames)
+        dictStage_Frames[strStage] = dictStage['run'](dictConfig, dictFrames, stageRecord)
+        report.add_stage(stageRecord.end(stage_rows_out(stageRecord, dictStage_Frames[strStage])))
+        if 'outputs' in dictStage_Frames[strStage]:
+            lstOutputs.extend(dictStage_Frames[strStage]['outputs']['path'].tolist())
+    return lstOutputs
+
+#fuzzy_farma notebook on the store indexes of the corpus: client UPC and Item
+#   (first two columns of client_data/<client_file>) against every store, one
+#   store at a time into match_comparisson_<client>_<run_date>.csv
+def run_fuzzy_client(dictConfig, dictCorpus, report):
+    strClient = dictConfig['client_name']
+    with report.stage('client_prep') as stageRecord:
+        df_base = pd.read_csv(os.path.join(dictConfig['base_path'], 'client_data', dictConfig['client_file']))
+        df_base.rename(columns = {df_base.columns[1]: "Item"}, inplace = True)
+        df_base.rename(columns = {df_base.columns[0]: "UPC"}, inplace = True)
+        stageRecord.intRows_Out = len(df_base)
+
+    lstUPCs = df_base['UPC'].tolist()
+    lstQuery_Keys = [query_sort_key(strItem) for strItem in df_base['Item'].tolist()]
+    lstStores = dictCorpus['stores']
+
+    strOutput = os.path.join(dictConfig['base_path'], f"match_comparisson_{strClient}_{dictConfig['run_date']}.csv")
+    progress = ProgressReporter(len(lstStores), f'{strClient} stores')
+    report.start('matching', sum(dictStore['size'] for dictStore in lstStores))
+    with ChunkedWriter(strOutput, 'csv') as writer, \
+            BlockPool([dictStore['block'] for dictStore in lstStores], dictConfig['workers']) as pool:
+        for dictStore in lstStores:
+            dictBuffers = allocate_result_buffers(1, len(df_base), dictConfig['top_n'])
+            arrUPC_Positions, arrPositions, arrScores = match_store_index(lstQuery_Keys, lstUPCs, dictStore,
+                                                                          dictConfig['top_n'], pool = pool)
+            fill_store_results(dictBuffers, 0, lstUPCs, dictStore['columns'], arrUPC_Positions, arrPositions, arrScores)
+            writer.write(materialize_results(df_base, dictBuffers, 1))
+            progress.update()
+    report.end('matching', writer.intRows, stores = len(lstStores), client_rows = len(df_base))
+    return [strOutput]
+
+#Client pipelines a batch can run: function and report file name
+BATCH_CLIENTS = {'nike_hierarchy': {'run': run_nike_client, 'report': '{client}_{run_date}.json'},
+                 'fuzzy_farma': {'run': run_fuzzy_client, 'report': 'fuzzy_{client}_{run_date}.json'}}
+
+#Runs one client on the corpus (in a forked worker when clients run in parallel),
+#   saves its own run report and returns its line of the batch report.
+def run_client(dictConfig):
+    dictClient = BATCH_CLIENTS[dictConfig['pipeline']]
+    report = RunReport(dictConfig['client_name'], dictConfig)
+    stageRecord = StageRecord(dictConfig['client_name'])
+
+    lstOutputs = dictClient['run'](dictConfig, _dictCorpus, report)
+    report.save(os.path.join(dictConfig['report_dir'], dictClient['report'].format(client = dictConfig['client_name'],
+                                                                                    run_date = dictConfig['run_date'])))
+
+    dictResult = stageRecord.end(report.lstStages[-1]['rows_out'] if report.lstStages else None)
+    lstPeaks = [fltPeak for fltPeak in [dictResult['peak_rss_mb']] + [dictStage['peak_rss_mb'] for dictStage in report.lstStages]
+                if fltPeak is not None]
+    dictResult['peak_rss_mb'] = max(lstPeaks) if lstPeaks else None
+    dictResult['pipeline'] = dictConfig['pipeline']
+    dictResult['outputs'] = lstOutputs
+    return dictResult
+#End Clients
+
+#Start Batch
+#Loads the corpus and runs every client on it, up to parallel_clients at a time in
+#   fork workers (sequentially where fork does not exist). A failed client does not
+#   stop the others. Returns the batch RunReport and the names of the failed clients.
+def run_batch(dictBatch):
+    global _dictCorpus
+    lstClients = dictBatch['clients']
+    report = RunReport('batch', {**{strKey: objValue for strKey, objValue in dictBatch.items() if strKey != 'clients'},
+                                 'clients': [dictClient['client_name'] for dictClient in lstClients]})
+    _dictCorpus = load_corpus(dictBatch, report)
+
+    lstFailed = []
+    def collect(strClient, funcResult):
+        try:
+            report.add_stage(funcResult())
+        except Exception as excError:
+            print(f"[{strClient}] failed: {excError!r}")
+            lstFailed.append(strClient)
+
+    intParallel = max(1, int(dictBatch['parallel_clients'] or min(len(lstClients), os.cpu_count() or 1)))
+    try:
+        if intParallel > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            #Objects of the corpus move to the permanent generation so the garbage
+            #   collector of the workers does not write to (and copy) their pages
+            gc.collect()
+            gc.freeze()
+            with ProcessPoolExecutor(max_workers = min(intParallel, len(lstClients)),
+                                     mp_context = multiprocessing.get_context('fork')) as executor:
+                dictFutures = {executor.submit(run_client, dictClient): dictClient['client_name'] for dictClient in lstClients}
+                for future in as_completed(dictFutures):
+                    collect(dictFutures[future], future.result)
+        else:
+            for dictClient in lstClients:
+                collect(dictClient['client_name'], lambda: run_client(dictClient))
+    finally:
+        gc.unfreeze()
+        _dictCorpus = None
+
+    report.dictContext['failed'] = lstFailed
+    report.save(os.path.join(dictBatch['report_dir'], f"batch_{dictBatch['run_date']}.json"))
+    return report, lstFailed
+#End Batch
+
+def main(lstArgs = None):
+    parser = argparse.ArgumentParser(description = 'Matches one competitor scrape for several clients.')
+    parser.add_argument('config', help = 'JSON batch config (see DEFAULT_BATCH_CONFIG in pipeline/batch.py)')
+    parser.add_argument('--delivery-date', default = None)
+    parser.add_argument('--parallel-clients', type = int, default = None)
+    args = parser.parse_args(lstArgs)
+
+    dictOverrides = {strKey: objValue for strKey, objValue in [('delivery_date', args.delivery_date),
+                                                              ('parallel_clients', args.parallel_clients)]
+                     if objValue is not None}
+    _, lstFailed = run_batch(load_batch_config(args.config, dictOverrides))
+    return 1 if lstFailed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
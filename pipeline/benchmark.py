@@ -0,0 +1,324 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from pipeline.data_utils import LIST_COLUMN_ORDER, consolidate_competitors_df, extract_quantities_and_units
+from pipeline.fuzzy_match import BlockPool, build_store_index, match_store_index, query_sort_key
+from pipeline.hierarchy import create_inverted_index, find_best_match_batch
+from pipeline.instrumentation import cpu_seconds, current_rss_mb, peak_rss_mb, reset_peak_rss, round_mb
+from pipeline.rules import apply_condition_rules
+
+BENCHMARK_ROWS = [10000, 100000, 1000000]
+BENCHMARK_HISTORY_PATH = 'benchmark_history.json'
+
+#Start Synthetic Catalogue
+#Vocabulary of the generated items, words are drawn with Zipf weights in list
+#   order (the first ones repeat the most, as "leche" or "tenis" in real files)
+CATALOGUE_PRODUCTS = ['leche', 'tenis', 'cafe', 'arroz', 'frijol', 'aceite', 'galletas', 'cereal', 'jabon', 'shampoo',
+                      'detergente', 'yogurt', 'queso', 'jamon', 'atun', 'sardina', 'refresco', 'agua', 'jugo', 'cerveza',
+                      'playera', 'sudadera', 'pants', 'short', 'calcetas', 'gorra', 'mochila', 'balon', 'pañales', 'toallitas',
+                      'crema', 'mayonesa', 'salsa', 'chiles', 'tortillas', 'pan', 'harina', 'azucar', 'sal', 'avena',
+                      'papel', 'servilletas', 'cloro', 'suavizante', 'desodorante', 'pasta', 'cepillo', 'croquetas', 'vino', 'tequila']
+CATALOGUE_DESCRIPTORS = ['entera', 'deslactosada', 'light', 'clasico', 'original', 'integral', 'natural', 'sabor', 'fresa',
+                         'chocolate', 'vainilla', 'limon', 'mango', 'hombre', 'mujer', 'niño', 'niña', 'unisex', 'running',
+                         'futbol', 'basquetbol', 'entrenamiento', 'casual', 'negro', 'blanco', 'azul', 'rojo', 'gris', 'verde',
+                         'rosa', 'algodon', 'sin', 'azucar', 'con', 'para', 'de', 'extra', 'suave', 'familiar', 'premium',
+                         'orgánico', 'picante', 'molido', 'soluble', 'descafeinado', 'talla', 'chica', 'mediana', 'grande']
+CATALOGUE_BRANDS = ['Nike', 'Adidas', 'Puma', 'Under Armour', 'Lala', 'Alpura', 'Nestlé', 'Nescafé', 'Bimbo', 'Gamesa',
+                    'Kellogg\'s', 'La Costeña', 'Herdez', 'Del Valle', 'Jumex', 'Coca-Cola', 'Pepsi', 'Colgate', 'Palmolive',
+                    'Ariel', 'Downy', 'Huggies', 'Kleenex', 'Great Value', 'Member\'s Mark', 'Aurrera', 'Sabritas', 'Verde Valle']
+CATALOGUE_QUANTITIES = ['{:d}g', '{:d} gr', '{:d}ml', '{:d} ml', '{:.1f} kg', '{:d} kilo', '{:d} piezas', '{:d} pzs', '']
+CATALOGUE_CATEGORIES = [('Abarrotes', 'Despensa', 'Granos', 'Arroz'), ('Lácteos', 'Leche', 'Leche Entera', ''),
+                        ('Bebidas', 'Refrescos', 'Cola', ''), ('Limpieza', 'Lavandería', 'Detergentes', 'Polvo'),
+                        ('Cuidado Personal', 'Cabello', 'Shampoo', ''), ('Deportes', 'Calzado', 'Tenis', 'Running'),
+                        ('Deportes', 'Ropa', 'Playeras', ''), ('Bebés', 'Pañales', 'Etapa 3', ''),
+                        ('Mascotas', 'Perros', 'Alimento Seco', ''), ('Vinos y Licores', 'Tequila', 'Reposado', '')]
+CATALOGUE_CHANNELS = ['Walmart', 'Soriana', 'Chedraui', 'HEB', 'La Comer', 'Bodega Aurrera', 'Liverpool', 'Coppel',
+                      'Sams Club', 'Costco', 'Farmacias Guadalajara', 'Farmacias del Ahorro']
+#Share of products per UPC format: ean13 / upc12 digits, float as Excel exports
+#   them ('7501234567890.0'), short 8 digit codes and empty cells
+UPC_FORMATS = {'ean13': 0.55, 'upc12': 0.25, 'float': 0.1, 'short': 0.05, 'empty': 0.05}
+
+def zipf_choice(rng, lstValues, intSize, fltSkew):
+    arrWeights = 1.0 / np.arange(1, len(lstValues) + 1) ** fltSkew
+    return np.asarray(lstValues, dtype = object)[rng.choice(len(lstValues), size = intSize, p = arrWeights / arrWeights.sum())]
+
+def random_upcs(rng, intSize, dictUPC_Formats = None):
+    dictUPC_Formats = dictUPC_Formats or UPC_FORMATS
+    lstFormats = list(dictUPC_Formats)
+    arrWeights = np.array([dictUPC_Formats[strFormat] for strFormat in lstFormats], dtype = float)
+    arrFormats = rng.choice(len(lstFormats), size = intSize, p = arrWeights / arrWeights.sum())
+
+    arrDigits = pd.Series(rng.integers(10 ** 12, 10 ** 13, size = intSize)).astype(str)
+    dictFormatted = {'ean13': arrDigits, 'upc12': arrDigits.str[1:], 'float': arrDigits + '.0',
+                     'short': arrDigits.str[:8], 'empty': pd.Series('', index = arrDigits.index)}
+
+    srUPCs = pd.Series('', index = arrDigits.index, dtype = object)
+    for intFormat, strFormat in enumerate(lstFormats):
+        arrMask = arrFormats == intFormat
+        srUPCs[arrMask] = dictFormatted[strFormat][arrMask]
+    return srUPCs.to_numpy(dtype = object)
+
+#Products of the catalogue: item description, brand, categories and UPC. The
+#   same product is sold by several channels, so rows are drawn from this pool.
+def generate_products(intProducts, fltVocabulary_Skew = 1.1, dictUPC_Formats = None, intSeed = 0):
+    rng = np.random.default_rng(intSeed)
+
+    arrQuantity_Formats = np.asarray(CATALOGUE_QUANTITIES, dtype = object)[rng.integers(0, len(CATALOGUE_QUANTITIES), intProducts)]
+    arrAmounts = rng.choice([1, 2, 4, 6, 12, 100, 250, 400, 500, 750, 900, 1000], size = intProducts)
+    lstQuantities = [strFormat.format(intAmount if 'f}' not in strFormat else intAmount / 4)
+                     for strFormat, intAmount in zip(arrQuantity_Formats.tolist(), arrAmounts.tolist())]
+
+    arrBrands = zipf_choice(rng, CATALOGUE_BRANDS, intProducts, fltVocabulary_Skew)
+    srItem = (pd.Series(zipf_choice(rng, CATALOGUE_PRODUCTS, intProducts, fltVocabulary_Skew)).str.capitalize() + ' ' +
+              pd.Series(arrBrands) + ' ' +
+              pd.Series(zipf_choice(rng, CATALOGUE_DESCRIPTORS, intProducts, fltVocabulary_Skew)) + ' ' +
+              pd.Series(zipf_choice(rng, CATALOGUE_DESCRIPTORS, intProducts, fltVocabulary_Skew)) + ' ' +
+              pd.Series(lstQuantities)).str.strip()
+
+    arrCategories = np.array(CATALOGUE_CATEGORIES, dtype = object)[rng.integers(0, len(CATALOGUE_CATEGORIES), intProducts)]
+    return pd.DataFrame({'Item': srItem.to_numpy(dtype = object), 'Marca': arrBrands,
+                         'Category': arrCategories[:, 0], 'Subcategory': arrCategories[:, 1],
+                         'Subcategory2': arrCategories[:, 2], 'Subcategory3': arrCategories[:, 3],
+                         'UPC': random_upcs(rng, intProducts, dictUPC_Formats)})
+
+#Competitor catalogue of intRows rows in the csv layout consolidate_competitors_df
+#   reads (every column as text, prices as '$1,234.50', a few rows without price).
+def generate_catalogue(intRows, intChannels = 6, fltVocabulary_Skew = 1.1, dictUPC_Formats = None, intSeed = 0):
+    rng = np.random.default_rng(intSeed + 1)
+    dfProducts = generate_products(max(intRows // 3, 10), fltVocabulary_Skew, dictUPC_Formats, intSeed)
+
+    dfCatalogue = dfProducts.iloc[rng.integers(0, len(dfProducts), intRows)].reset_index(drop = True)
+    lstChannels = CATALOGUE_CHANNELS[:intChannels]
+    arrChannels = np.asarray(lstChannels, dtype = object)[rng.integers(0, len(lstChannels), intRows)]
+    arrStores = rng.integers(1, 21, intRows)
+
+    arrPrice = np.round(rng.lognormal(4, 1, intRows), 2)
+    arrFinal_Price = np.round(arrPrice * rng.choice([1, 1, 1, 0.9, 0.8], size = intRows), 2)
+    srPrice = pd.Series(arrPrice).map('${:,.2f}'.format)
+    srPrice[rng.random(intRows) < 0.02] = np.nan
+
+    dfCatalogue = dfCatalogue.assign(**{
+        'Date': '2026-10-12',
+        'Canal': arrChannels,
+        'Modelo': '',
+        'SKU': pd.Series(rng.integers(10 ** 6, 10 ** 9, intRows)).astype(str).to_numpy(dtype = object),
+        'Item Characteristics': '',
+        'URL SKU': 'https://www.example.com/p/' + pd.Series(np.arange(intRows)).astype(str),
+        'Image': 'https://img.example.com/' + pd.Series(np.arange(intRows)).astype(str) + '.jpg',
+        'Price': srPrice,
+        'Sale Price': pd.Series(arrFinal_Price).map('{:.2f}'.format),
+        'Shipment Cost': '0',
+        'Sales Flag': np.where(arrFinal_Price < arrPrice, '1', '0'),
+        'Store ID': arrStores.astype(str),
+        'Store Name': pd.Series(arrChannels) + ' ' + pd.Series(arrStores).astype(str),
+        'Store Address': 'Av. Insurgentes Sur ' + pd.Series(arrStores).astype(str) + ', CDMX',
+        'Stock': rng.integers(0, 200, intRows).astype(str),
+        'Final Price': pd.Series(arrFinal_Price).map('{:.2f}'.format)})
+
+    return dfCatalogue[[strColumn for strColumn in LIST_COLUMN_ORDER if strColumn not in ['UPC WM', 'UPC WM2', 'COMP']]]
+
+#One csv per channel in strDir, as the scraped files arrive
+def write_catalogue_files(dfCatalogue, strDir):
+    os.makedirs(strDir, exist_ok = True)
+    for strChannel, dfChannel in dfCatalogue.groupby('Canal', sort = True):
+        dfChannel.to_csv(os.path.join(strDir, strChannel.replace(' ', '_') + '.csv'), index = False)
+
+#product_match like hierarchy over the same vocabulary: item_conc and its Category_Nike_conc
+def generate_hierarchy(intRows, fltVocabulary_Skew = 1.1, intSeed = 0):
+    dfProducts = generate_products(intRows, fltVocabulary_Skew, intSeed = intSeed + 2)
+    srItem_Conc = dfProducts[['Item', 'Category', 'Subcategory', 'Subcategory2', 'Subcategory3']].agg(' '.join, axis = 1)
+    return pd.DataFrame({'item_conc': srItem_Conc.to_numpy(dtype = object),
+                         'Category_Nike_conc': (dfProducts['Category'] + '-' + dfProducts['Subcategory'] + '-' +
+                                                dfProducts['Subcategory2']).to_numpy(dtype = object)})
+
+#condiciones.csv like rules over Item_conc: single words and 'a+b' pairs, one in
+#   ten deletes the row, the rest rewrite Subcategoria_Nike / Subcategoria2_Nike
+def generate_condiciones(intRules = 300, intSeed = 0):
+    rng = np.random.default_rng(intSeed + 3)
+    lstWords = CATALOGUE_PRODUCTS + CATALOGUE_DESCRIPTORS + [strBrand.lower() for strBrand in CATALOGUE_BRANDS]
+    arrFirst = np.asarray(lstWords, dtype = object)[rng.integers(0, len(lstWords), intRules)]
+    arrSecond = np.asarray(lstWords, dtype = object)[rng.integers(0, len(lstWords), intRules)]
+    arrPair = rng.random(intRules) < 0.3
+
+    return pd.DataFrame({'Column': 'Item_conc',
+                         'Word': np.where(arrPair, arrFirst + '+' + arrSecond, arrFirst),
+                         'ELIMINAR': (rng.random(intRules) < 0.1).astype(int),
+                         'Subcategoria_Nike': pd.Series('MENS', index = range(intRules)).where(rng.random(intRules) < 0.5),
+                         'Subcategoria2_Nike': pd.Series('RUNNING', index = range(intRules)).where(rng.random(intRules) < 0.5)})
+#End Synthetic Catalogue
+
+#Start Stage Runners
+#Each stage prepares its inputs from the catalogue (not timed) and returns the
+#   function that runs the stage; the function returns the output rows.
+def item_conc(dfCatalogue):
+    return (dfCatalogue['Item'].fillna('') + ' ' + dfCatalogue['Category'] + ' ' + dfCatalogue['Subcategory'] + ' ' +
+            dfCatalogue['Subcategory2'] + ' ' + dfCatalogue['Subcategory3'])
+
+def prepare_consolidate(dfCatalogue, strWork_Dir, intWorkers = 1):
+    strRead_Dir = os.path.join(strWork_Dir, 'competitors') + os.sep
+    write_catalogue_files(dfCatalogue, strRead_Dir)
+    return lambda: len(consolidate_competitors_df(strRead_Dir, intWorkers = intWorkers))
+
+def prepare_quantities(dfCatalogue, strWork_Dir, intWorkers = 1):
+    dfItems = dfCatalogue[['Item']].copy()
+    return lambda: len(extract_quantities_and_units(dfItems))
+
+def prepare_index(dfCatalogue, strWork_Dir, intWorkers = 1):
+    dfHierarchy = generate_hierarchy(min(max(len(dfCatalogue) // 10, 1000), 100000))
+    lstDescriptions = item_conc(dfCatalogue).tolist()
+
+    def run_index():
+        inverted_index = create_inverted_index(dfHierarchy, 'item_conc')
+        return len(find_best_match_batch(lstDescriptions, inverted_index, dfHierarchy))
+    return run_index
+
+def prepare_condiciones(dfCatalogue, strWork_Dir, intWorkers = 1):
+    proposals_df = pd.DataFrame({'Item_conc': item_conc(dfCatalogue).to_numpy(dtype = object),
+                                 'Subcategoria_Nike': 'UNISEX', 'Subcategoria2_Nike': 'ALL'})
+    condiciones_df = generate_condiciones()
+    return lambda: len(apply_condition_rules(proposals_df, condiciones_df))
+
+#fuzzy_farma store loop: one client list against the items of each store (channel)
+def prepare_fuzzy(dfCatalogue, strWork_Dir, intWorkers = 1):
+    dfClient = dfCatalogue.drop_duplicates('Item').head(min(max(len(dfCatalogue) // 100, 100), 2000))
+    lstItems = dfClient['Item'].tolist()
+    lstUPCs = dfClient['UPC'].tolist()
+    lstStores = [(dfStore['Item'].tolist(), dfStore['UPC'].tolist()) for _, dfStore in dfCatalogue.groupby('Canal', sort = True)]
+
+    def run_fuzzy():
+        lstQuery_Keys = [query_sort_key(strItem) for strItem in lstItems]
+        lstStore_Indexes = [build_store_index(lstStore_Items, lstStore_UPCs) for lstStore_Items, lstStore_UPCs in lstStores]
+        with BlockPool([dictStore['block'] for dictStore in lstStore_Indexes], intWorkers) as pool:
+            for dictStore in lstStore_Indexes:
+                match_store_index(lstQuery_Keys, lstUPCs, dictStore, pool = pool)
+        return len(lstItems) * len(lstStores)
+    return run_fuzzy
+
+BENCHMARK_STAGES = {'consolidate': prepare_consolidate,
+                    'quantities': prepare_quantities,
+                    'index': prepare_index,
+                    'condiciones': prepare_condiciones,
+                    'fuzzy': prepare_fuzzy}
+#End Stage Runners
+
+#Start Measurement
+def measure_stage(funcRun, intRows_In):
+    boolPeak_Reset = reset_peak_rss()
+    fltRSS_Before = current_rss_mb()
+    fltStart = time.perf_counter()
+    fltCPU_Start = cpu_seconds()
+
+    intRows_Out = funcRun()
+
+    fltSeconds = time.perf_counter() - fltStart
+    return {'rows_in': intRows_In,
+            'rows_out': intRows_Out,
+            'seconds': round(fltSeconds, 4),
+            'cpu_seconds': round(cpu_seconds() - fltCPU_Start, 4),
+            'rows_per_second': round(intRows_In / fltSeconds, 1) if fltSeconds > 0 else None,
+            'rss_before_mb': round_mb(fltRSS_Before),
+            'peak_rss_mb': round_mb(peak_rss_mb()),
+            'peak_rss_reset': boolPeak_Reset}
+#End Measurement
+
+#Start Benchmark History
+#JSON list of every measured (run, stage, rows), appended run after run
+def load_history(strHistory_Path):
+    if not os.path.exists(strHistory_Path):
+        return []
+    with open(strHistory_Path, encoding = 'utf-8') as fileHistory:
+        return json.load(fileHistory)
+
+def save_history(strHistory_Path, lstHistory):
+    os.makedirs(os.path.dirname(strHistory_Path) or '.', exist_ok = True)
+    with open(strHistory_Path + '.tmp', 'w', encoding = 'utf-8') as fileHistory:
+        json.dump(lstHistory, fileHistory, ensure_ascii = False, indent = 1)
+    os.replace(strHistory_Path + '.tmp', strHistory_Path)
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output = True, text = True,
+                              cwd = os.path.dirname(os.path.abspath(__file__)), check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+#Last record of the same stage, rows and generator parameters
+def previous_record(lstHistory, dictRecord):
+    for dictPrevious in reversed(lstHistory):
+        if all(dictPrevious.get(strField) == dictRecord[strField] for strField in ['stage', 'rows_in', 'params']):
+            return dictPrevious
+    return None
+#End Benchmark History
+
+#Runs lstStages at every size of lstRows and appends the results to the history.
+#   Returns the new records and the ones slower than fltMax_Slowdown times their
+#   previous record.
+def run_benchmarks(lstRows = BENCHMARK_ROWS, lstStages = None, strHistory_Path = BENCHMARK_HISTORY_PATH,
+                   intChannels = 6, fltVocabulary_Skew = 1.1, dictUPC_Formats = None, intSeed = 0, intWorkers = 1,
+                   fltMax_Slowdown = None):
+    lstStages = list(lstStages or BENCHMARK_STAGES)
+    dictParams = {'channels': intChannels, 'vocabulary_skew': fltVocabulary_Skew,
+                  'upc_formats': dictUPC_Formats or UPC_FORMATS, 'seed': intSeed, 'workers': intWorkers}
+    dictRun = {'run': datetime.now().isoformat(timespec = 'seconds'), 'commit': git_commit(),
+               'python': platform.python_version(), 'pandas': pd.__version__,
+               'machine': platform.machine(), 'cpus': os.cpu_count()}
+
+    lstHistory = load_history(strHistory_Path)
+    lstRecords = []
+    lstRegressions = []
+    for intRows in lstRows:
+        dfCatalogue = generate_catalogue(intRows, intChannels, fltVocabulary_Skew, dictUPC_Formats, intSeed)
+        with tempfile.TemporaryDirectory(prefix = 'benchmark_') as strWork_Dir:
+            for strStage in lstStages:
+                funcRun = BENCHMARK_STAGES[strStage](dfCatalogue, strWork_Dir, intWorkers)
+                dictRecord = {**dictRun, 'stage': strStage, 'params': dictParams, **measure_stage(funcRun, intRows)}
+
+                dictPrevious = previous_record(lstHistory, dictRecord)
+                strChange = ''
+                if dictPrevious is not None and dictPrevious['seconds'] > 0:
+                    fltRatio = dictRecord['seconds'] / dictPrevious['seconds']
+                    strChange = f" ({fltRatio:.2f}x vs {dictPrevious['commit'] or dictPrevious['run']})"
+                    if fltMax_Slowdown is not None and fltRatio > fltMax_Slowdown:
+                        lstRegressions.append(dictRecord)
+                print(f"{strStage:<12} {intRows:>9,} rows  {dictRecord['seconds']:>9.3f} s  "
+                      f"{dictRecord['rows_per_second'] or 0:>12,.0f} rows/s  {dictRecord['peak_rss_mb'] or 0:>8.1f} MB peak{strChange}")
+
+                lstRecords.append(dictRecord)
+        del dfCatalogue
+
+    save_history(strHistory_Path, lstHistory + lstRecords)
+    return lstRecords, lstRegressions
+
+def main(lstArgs = None):
+    parser = argparse.ArgumentParser(description = 'Times the pipeline stages over a synthetic competitor catalogue.')
+    parser.add_argument('--rows', type = int, nargs = '+', default = BENCHMARK_ROWS)
+    parser.add_argument('--stages', nargs = '+', choices = list(BENCHMARK_STAGES), default = list(BENCHMARK_STAGES))
+    parser.add_argument('--history', default = BENCHMARK_HISTORY_PATH)
+    parser.add_argument('--channels', type = int, default = 6)
+    parser.add_argument('--skew', type = float, default = 1.1, help = 'Zipf exponent of the item vocabulary')
+    parser.add_argument('--upc-formats', type = json.loads, default = None,
+                        help = 'JSON shares per UPC format, e.g. \'{"ean13": 0.8, "empty": 0.2}\'')
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--workers', type = int, default = 1)
+    parser.add_argument('--max-slowdown', type = float, default = None,
+                        help = 'Exit with status 1 when a stage is slower than this ratio of its previous record')
+    args = parser.parse_args(lstArgs)
+
+    _, lstRegressions = run_benchmarks(args.rows, args.stages, args.history, args.channels, args.skew,
+                                       args.upc_formats, args.seed, args.workers, args.max_slowdown)
+    for dictRecord in lstRegressions:
+        print(f"Regression: {dictRecord['stage']} at {dictRecord['rows_in']:,} rows")
+    return 1 if lstRegressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
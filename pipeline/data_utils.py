@@ -0,0 +1,410 @@
+#Autor: Ricardo Velazquez Rios
+#Correo autor: ricardo.velazquez@data-bunker.com.mx
+#
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import glob
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from datetime import date
+
+from pipeline.excel_loader import read_excel, read_excel_sheets
+from pipeline.instrumentation import ProgressReporter
+from pipeline.stage_cache import cached_stage
+
+#Comment test git
+LIST_COLUMN_ORDER = ['Date', 'Canal', 'Category', 'Subcategory', 'Subcategory2', 'Subcategory3', 'Marca',
+                     'Modelo', 'SKU', 'UPC', 'Item', 'Item Characteristics', 'URL SKU', 'Image', 'Price',
+                     'Sale Price', 'Shipment Cost', 'Sales Flag', 'Store ID', 'Store Name',
+                     'Store Address', 'Stock', 'UPC WM2', 'Final Price', 'UPC WM', 'COMP']
+
+LIST_COLUMN_ORDER_SHORT = ['Date', 'Canal', 'Category', 'Subcategory', 'Subcategory2', 'Subcategory3', 'Marca',
+                     'Modelo', 'SKU', 'UPC', 'Item', 'Item Characteristics', 'URL SKU', 'Image', 'Price',
+                     'Sale Price', 'Shipment Cost', 'Sales Flag', 'Store ID', 'Store Name',
+                     'Store Address', 'Stock', 'UPC WM', 'Final Price']
+
+LIST_COLUMN_ORDER_M = ['Date', 'Canal', 'Category', 'Subcategory', 'Subcategory2', 'Subcategory3', 'Marca',
+                      'Modelo', 'SKU', 'UPC', 'Item', 'Item Characteristics', 'URL SKU', 'Image', 'Price',
+                      'Sale Price', 'Shipment Cost', 'Sales Flag', 'Store ID', 'Store Name',
+                      'Store Address', 'Stock', 'UPC WM2', 'Final Price', 'UPC WM', 'COMP',
+                      'GR', 'CAT C', 'SUB C', 'MARCA C'	, 'Precio Gramo', 'MARCA 2', 'Congelado']
+
+COMPETITORS_FLOAT_COLUMNS = ['Price', 'Final Price', 'Sale Price']
+COMPETITORS_STRING_COLUMNS = ['UPC', 'EAN', 'UPC WM', 'UPC WM2']
+COMPARISON_STRING_COLUMNS = ['upc_wm2_client', 'match', 'upc_wm2_competitor']
+#Few distinct values repeated over millions of rows, kept as category (dictionary encoded)
+COMPETITORS_CATEGORY_COLUMNS = ['Canal', 'Store ID', 'Store Name', 'Store Address', 'Date', 'Marca',
+                                'Category', 'Subcategory', 'Subcategory2', 'Subcategory3']
+
+#Start Data Frame Utils
+
+#This section is only for functions that work on columns of a Data Frame
+#   object. To call them use the class method apply().
+def create_upc_wm(strUPC, strChannel = ''):
+    
+    if strUPC.isdigit():
+        if 'Walmart' in strChannel or 'walmart' in strChannel:
+            pass
+        else:
+            if len(strUPC) > 7:
+                strUPC = strUPC[:-1]
+    
+        while len(strUPC) < 16:
+                strUPC = '0' + strUPC
+                
+    return strUPC
+
+#Column version of create_upc_wm plus the '.0' stripping and zfill(16) steps.
+#   Returns the normalized UPCs and a mask of the rows that could not be
+#   normalized (empty, not only digits or longer than intLength).
+#   With boolDrop_Check_Digit = False it only pads, like str(x).zfill(16).
+def normalize_upc_column(srUPC, srChannel = None, boolDrop_Check_Digit = True, intLength = 16):
+    srUPC = srUPC.astype(object).where(srUPC.notna(), '').astype(str)
+    srUPC = srUPC.str.replace(r'\.0+$', '', regex = True)
+
+    srIs_Digit = srUPC.str.isdigit()
+
+    if boolDrop_Check_Digit:
+        srIs_Walmart = (srChannel.astype(str).str.contains('Walmart|walmart', regex = True)
+                        if srChannel is not None else False)
+        srDrop = srIs_Digit & ~srIs_Walmart & (srUPC.str.len() > 7)
+        srUPC = srUPC.mask(srDrop, srUPC.str[:-1])
+        srUPC_WM = srUPC.mask(srIs_Digit, srUPC.str.zfill(intLength))
+    else:
+        srUPC_WM = srUPC.str.zfill(intLength)
+
+    srInvalid = ~srIs_Digit | (srUPC_WM.str.len() > intLength)
+
+    return srUPC_WM, srInvalid
+
+def select_upc_wm2(strUPCWM_Competitors, strUPCWM_Comparison):
+    if pd.isna(strUPCWM_Comparison):
+        return strUPCWM_Competitors
+    else:
+        return strUPCWM_Comparison
+
+def calculate_discount(fltPrice, fltFinal_Price):
+    return 1 - (fltFinal_Price / fltPrice)
+
+def calculate_price_per_kg(fltFinal_Price, strGram, boolIts_Pack = False):
+    if strGram not in ['Bolzalza', '0', 0] and boolIts_Pack == False:
+        fltGram = float(strGram)
+        fltPrice_Gram = fltFinal_Price / fltGram
+        fltPrice_Gram = fltPrice_Gram * 1000
+
+        return fltPrice_Gram
+    else:
+        return 0
+
+def determine_if_pack(strItem):
+    lstPieces_Names = ['piezas', 'pzs', 'pzas']
+
+    if any(strPieces_Name in strItem for strPieces_Name in lstPieces_Names):
+        return True
+    else:
+        return False
+
+#End Data Frame Utils
+
+#Start File Util Functions
+def convert_excel_to_df(strExcel_Path):
+    dictSheets = read_excel_sheets(strExcel_Path)
+
+    dfConcat_Excel = pd.concat(list(dictSheets.values()), ignore_index = True)
+
+    return dfConcat_Excel
+
+#Reads one competitor csv and leaves it in LIST_COLUMN_ORDER. Every step is
+#   row-local, so files can be processed on their own and in parallel.
+def read_competitor_file(strFilename, lstItem_Words = []):
+    dfAux = pd.read_csv(strFilename, dtype = str) #dataframe leido por iteracion
+
+    lstColumns = dfAux.columns.to_list() #Nombres de las columnas
+    dictNew_Columns = homogonize_column_names(lstColumns)
+    dfAux.rename(columns = dictNew_Columns, inplace = True)
+
+    if len(lstItem_Words) > 0:
+        dfAux = dfAux[dfAux['Item'].str.contains('|'.join(lstItem_Words))] #Filtrar por palabras
+
+    dfAux = dfAux.drop(columns = ['UPC WM'], errors = 'ignore') #Eliminar UPC WN
+    dfAux = dfAux.reindex(columns = [strColumn for strColumn in LIST_COLUMN_ORDER
+                                     if strColumn not in ['UPC WM', 'UPC WM2', 'COMP']])
+
+    dfAux['UPC'] = dfAux['UPC'].str.replace('\.0+$', '', regex = True)
+    dfAux['UPC'] = dfAux['UPC'].fillna('')
+    dfAux['UPC'] = dfAux['UPC'].astype(str)
+    dfAux['Canal'] = dfAux['Canal'].astype(str)
+    dfAux['UPC WM'], srUPC_Invalid = normalize_upc_column(dfAux['UPC'], dfAux['Canal'])
+    dfAux['UPC WM2'] = dfAux['UPC WM']
+
+    dfAux[COMPETITORS_FLOAT_COLUMNS] = dfAux[COMPETITORS_FLOAT_COLUMNS].replace(
+                                           {'\$': '',
+                                            ',': '',
+                                            r'\[': '',
+                                            r'\]': '',
+                                            'Price': '0'}, regex = True) #Reemplazar ciertos caracteres
+
+    dfAux['COMP'] = ''
+
+    dfAux = dfAux[LIST_COLUMN_ORDER] #Ordenar dataframe
+
+    dfAux = dfAux[(dfAux['Price'].notna()) & (dfAux['Price'] != '0')] #Filtrar por precio vacio
+    dfAux = dfAux.astype({strColumn: 'category' for strColumn in COMPETITORS_CATEGORY_COLUMNS})
+
+    return dfAux, int(srUPC_Invalid.sum())
+
+#Joins the per-file frames one column at a time, releasing each column of the
+#   chunks once it is copied, so memory stays close to the final frame size.
+#   Category columns are joined over the union of their categories.
+def combine_column_chunks(lstDFs, lstColumns):
+    dictColumns = {}
+    for strColumn in lstColumns:
+        lstChunks = [dfChunk[strColumn] for dfChunk in lstDFs]
+        if lstChunks and all(isinstance(srChunk.dtype, pd.CategoricalDtype) for srChunk in lstChunks):
+            try:
+                dictColumns[strColumn] = pd.Series(pd.api.types.union_categoricals(lstChunks, ignore_order = True),
+                                                   name = strColumn)
+            except TypeError: #a file without the column has empty, non text categories
+                dictColumns[strColumn] = pd.concat([srChunk.astype(object) for srChunk in lstChunks],
+                                                   ignore_index = True).astype('category')
+        else:
+            dictColumns[strColumn] = pd.concat(lstChunks, ignore_index = True)
+        for dfChunk in lstDFs:
+            del dfChunk[strColumn]
+
+    return pd.DataFrame(dictColumns, copy = False)
+
+def consolidate_competitors_df(strPath_Read, lstItem_Words = [], intWorkers = 1):
+    if len(strPath_Read) < 3:
+        raise ValueError('Path is too short for a valid file location.')
+
+    lstFilenames = sorted(glob.glob(os.path.join(strPath_Read, '*.csv'))) #Toma de ese path los archivos que tengan como extención csv
+
+    lstDFs_Concat = []
+    intUPC_Invalid = 0
+    progress = ProgressReporter(len(lstFilenames), 'competitor files')
+    if intWorkers > 1 and len(lstFilenames) > 1:
+        with ProcessPoolExecutor(max_workers = intWorkers) as executor:
+            iterResults = executor.map(read_competitor_file, lstFilenames, [lstItem_Words] * len(lstFilenames))
+            for dfAux, intInvalid in iterResults:
+                lstDFs_Concat.append(dfAux)
+                intUPC_Invalid += intInvalid
+                progress.update()
+    else:
+        for strFilename in lstFilenames: #Nombre del los csv
+            dfAux, intInvalid = read_competitor_file(strFilename, lstItem_Words)
+            lstDFs_Concat.append(dfAux) #añadir a lista de dataframes
+            intUPC_Invalid += intInvalid
+            progress.update()
+
+    print(f"UPC WM: {intUPC_Invalid} rows could not be normalized")
+
+    return combine_column_chunks(lstDFs_Concat, LIST_COLUMN_ORDER)
+
+def get_comparison_df(strPath_Comparison_File, strSheet_Name):
+    dictComparison_Dtypes = {strColumn_Name: 'str' for strColumn_Name in COMPARISON_STRING_COLUMNS}
+
+    dfComparison = read_excel(strPath_Comparison_File, strSheet_Name, dictComparison_Dtypes)
+
+    dfComparison = dfComparison[['upc_wm2_client', 'match', 'upc_wm2_competitor']]
+    dfComparison = dfComparison.dropna(subset = ['upc_wm2_competitor'])
+    dfComparison.drop_duplicates(inplace = True)
+
+    return dfComparison
+
+#Start UPC Remap
+#Competitor UPC WM2 -> client UPC WM2 hash map of a comparison sheet (get_comparison_df).
+#   A competitor UPC listed with more than one client UPC is a conflict: the first
+#   row of the sheet is kept and all its rows are returned in dfConflicts.
+def build_upc_remap(dfComparison):
+    srClient_Counts = dfComparison.groupby('upc_wm2_competitor', sort = False)['upc_wm2_client'].nunique(dropna = False)
+    dfConflicts = dfComparison[dfComparison['upc_wm2_competitor'].isin(srClient_Counts.index[srClient_Counts > 1])]
+
+    dfFirst = dfComparison.drop_duplicates(subset = ['upc_wm2_competitor'])
+    srRemap = pd.Series(dfFirst['upc_wm2_client'].to_numpy(), index = dfFirst['upc_wm2_competitor'].to_numpy())
+
+    return srRemap, dfConflicts
+
+#Comparison sheet remap kept in strCache_Dir by file content, so later deliveries
+#   with the same sheet do not read the Excel again.
+def load_upc_remap(strCache_Dir, strPath_Comparison_File, strSheet_Name):
+    dfComparison = cached_stage(strCache_Dir, 'upc_comparison', [strPath_Comparison_File], get_comparison_df,
+                                strPath_Comparison_File, strSheet_Name, dictParams = {'sheet': strSheet_Name})
+    return build_upc_remap(dfComparison)
+
+#UPC WM = remapped client UPC when UPC WM2 is in the map, UPC WM2 otherwise.
+def remap_upc_wm2(dfCompetitors, srRemap):
+    dfCompetitors = dfCompetitors.reset_index(drop = True)
+    dfCompetitors['UPC WM'] = dfCompetitors['UPC WM2'].map(srRemap).fillna(dfCompetitors['UPC WM2'])
+
+    return dfCompetitors
+
+#Same UPC WM as the old merge + select_upc_wm2, one row per competitor row:
+#   conflicting comparison rows are reported instead of duplicating competitors.
+def replace_upc_wm2(dfCompetitors, dfComparison):
+    srRemap, dfConflicts = build_upc_remap(dfComparison)
+    if len(dfConflicts) > 0:
+        print(f"UPC WM2: {dfConflicts['upc_wm2_competitor'].nunique()} competitor UPCs with several client UPCs, "
+              "first one used")
+
+    return remap_upc_wm2(dfCompetitors, srRemap)
+#End UPC Remap
+
+#Start Clean Stage
+#(column, test) pairs that make a competitor row invalid, checked in this order;
+#   a dropped row is counted under the first one it fails as '<column>_<test>'.
+COMPETITORS_INVALID_VALUES = [
+    ('Price', 'missing'), ('Price', 'zero'), ('Price', 'empty'), ('Price', 'none'),
+    ('UPC', 'missing'), ('UPC', 'zero'), ('UPC', 'empty'), ('UPC', 'none'),
+]
+COMPETITORS_DEDUPE_KEY = ["SKU", "Date", "Canal", "UPC", "Image", "Final Price"]
+
+INVALID_VALUE_TESTS = {
+    'missing': lambda srValues: srValues.isna(),
+    'zero': lambda srValues: srValues.eq('0'),
+    'empty': lambda srValues: srValues.eq(''),
+    'none': lambda srValues: srValues.str.contains('None', regex = False, na = False),
+}
+
+#One validity mask over COMPETITORS_INVALID_VALUES, one hash pass to keep the first
+#   row of every COMPETITORS_DEDUPE_KEY, and a single copy of the surviving rows
+#   (Price and UPC as text). Returns the clean frame and the rows dropped per reason.
+def clean_competitors_df(dfCompetitors):
+    dictText = {strColumn: dfCompetitors[strColumn].where(dfCompetitors[strColumn].isna(),
+                                                          dfCompetitors[strColumn].astype(str)).astype(object)
+                for strColumn in dict.fromkeys(strColumn for strColumn, _ in COMPETITORS_INVALID_VALUES)}
+
+    dictDropped = {}
+    arrValid = np.ones(len(dfCompetitors), dtype = bool)
+    for strColumn, strTest in COMPETITORS_INVALID_VALUES:
+        arrInvalid = INVALID_VALUE_TESTS[strTest](dictText[strColumn]).to_numpy(dtype = bool) & arrValid
+        dictDropped[f'{strColumn}_{strTest}'] = int(arrInvalid.sum())
+        arrValid &= ~arrInvalid
+
+    dfKey = dfCompetitors[COMPETITORS_DEDUPE_KEY].assign(**{strColumn: dictText[strColumn]
+                                                            for strColumn in COMPETITORS_DEDUPE_KEY if strColumn in dictText})
+    arrValid_Rows = np.flatnonzero(arrValid)
+    arrKeep = arrValid_Rows[~dfKey.iloc[arrValid_Rows].duplicated(keep = 'first').to_numpy()]
+    dictDropped['duplicate_key'] = len(arrValid_Rows) - len(arrKeep)
+
+    dfClean = dfCompetitors.iloc[arrKeep].reset_index(drop = True)
+    for strColumn, srText in dictText.items():
+        dfClean[strColumn] = srText.iloc[arrKeep].astype(str).to_numpy()
+
+    return dfClean, dictDropped
+#End Clean Stage
+
+#One pass over the lower-cased item text (no dashes nor 'granos'), each lookahead
+#   captures the first match of its kind, spaces allowed between number and unit:
+#   ml -> '400 ml', kg -> '1.5k', g -> '500 g', kg_name -> 'kg'/'kilo' (por kilo, el kilo...)
+#   Spaces are not removed, so a pack count before the quantity stays apart
+#   ('pack 12 355 ml' -> 355).
+QUANTITY_PATTERN = (r'(?s)^'
+                    r'(?=(?:.*?(?P<ml>[0-9]+\.?[0-9]*)\s*ml)?)'
+                    r'(?=(?:.*?(?P<kg>[0-9]+\.?[0-9]*)\s*k)?)'
+                    r'(?=(?:.*?(?P<g>[0-9]+\.?[0-9]*)\s*g)?)'
+                    r'(?=(?:.*?(?P<kg_name>kg|kilo))?)')
+
+#Numeric Cantidad and Unidad for every item, in the same row order. Priority:
+#   ml, kilograms (x1000, only with a kg/kilo word), grams, sold per kilo (1000), 0.
+def parse_quantities(srItem, boolMl = True):
+    srText = srItem.astype(str).str.lower().str.replace(r'-|granos', '', regex = True)
+    dfMatches = srText.str.extract(QUANTITY_PATTERN)
+
+    srMl = pd.to_numeric(dfMatches['ml'], errors = 'coerce').fillna(0)
+    srKg = pd.to_numeric(dfMatches['kg'], errors = 'coerce').fillna(0) * 1000
+    srG = pd.to_numeric(dfMatches['g'], errors = 'coerce').fillna(0)
+
+    srIs_Ml = (srMl != 0) & boolMl
+    srHas_Kg = dfMatches['kg'].notna()
+    srHas_Kg_Name = dfMatches['kg_name'].notna()
+
+    arrCantidad = np.select([srIs_Ml, srHas_Kg & srHas_Kg_Name, srHas_Kg, dfMatches['g'].notna(), srHas_Kg_Name],
+                            [srMl, srKg, 0, srG, 1000], default = 0).astype(float)
+
+    return pd.DataFrame({'Cantidad': arrCantidad,
+                         'Unidad': np.where(srIs_Ml, 'ml', 'gr')}, index = srItem.index)
+
+def extract_weight(dfCompetitors):
+    dfQuantities = parse_quantities(dfCompetitors['Item'], boolMl = False)
+    dfCompetitors['Cantidad'] = dfQuantities['Cantidad']
+    dfCompetitors['Unidad'] = 'gr'
+
+    return dfCompetitors
+
+def extract_ml(dfCompetitors):
+    dfQuantities = parse_quantities(dfCompetitors['Item'])
+    dfCompetitors['Cantidad'] = dfQuantities['Cantidad'].where(dfQuantities['Unidad'] == 'ml', 0)
+    dfCompetitors['Unidad'] = 'ml'
+
+    return dfCompetitors
+
+def extract_quantities_and_units(dfCompetitors):
+    dfQuantities = parse_quantities(dfCompetitors['Item'])
+    dfCompetitors['Cantidad'] = dfQuantities['Cantidad']
+    dfCompetitors['Unidad'] = dfQuantities['Unidad']
+
+    return dfCompetitors
+
+def compare_rows(dfTo_Compare, intPosition_Fst_Row, intPosition_Sec_Row):
+    lstColumn_Names = dfTo_Compare.columns.to_list()
+
+    dicResult = {}
+    for strColumn_name in lstColumn_Names:
+        rowFirst_Value = dfTo_Compare.loc[intPosition_Fst_Row, strColumn_name]
+        rowSecond_Value = dfTo_Compare.loc[intPosition_Fst_Row, strColumn_name]
+
+        if pd.isna(rowFirst_Value) and pd.isna(rowSecond_Value):
+            dicResult[strColumn_name] = True
+
+        else:
+            dicResult[strColumn_name] = rowFirst_Value == rowSecond_Value
+
+    return dicResult
+
+def homogonize_column_names(lstColumns):
+    setColumns_Upper = ['sku', 'upc', 'url sku', 'upc wm']
+
+    dictNew_Columns = {}
+    for strColumn_Name in lstColumns:
+        strNew_Column = strColumn_Name.lower().replace('_', ' ')
+
+        if strNew_Column == 'store id':
+            dictNew_Columns[strColumn_Name] = 'Store ID'
+        elif strNew_Column not in setColumns_Upper:
+            dictNew_Columns[strColumn_Name] = strNew_Column.title()
+        else:
+            dictNew_Columns[strColumn_Name] = strNew_Column.upper()
+
+    return dictNew_Columns
+#End File Util Functions
+
+#Function get monday date
+def calculate_update_date():
+    now = date.today()
+    monday_date = now - timedelta(days=now.weekday())
+
+    return monday_date.isoformat()
+
+#Function get counts Date and UPC grouping
+#   Rows per (Date, UPC WM) as a groupby transform over the observed groups only,
+#   rows with a missing Date or UPC WM are dropped as the old inner merge did.
+def getCounts(dfCompetitors):
+    srCounts = dfCompetitors.groupby(by=["Date","UPC WM"], observed = True, sort = False)["UPC WM"].transform('size')
+    dfCompetitors = dfCompetitors.assign(counts = srCounts)[srCounts.notna()].reset_index(drop = True)
+    dfCompetitors['counts'] = dfCompetitors['counts'].astype(np.int64)
+    return dfCompetitors
+
+#Text concatenation of lstColumns joined by strSeparator on Arrow string arrays,
+#   missing values count as empty text. Returns an Arrow backed string Series.
+def concat_text_columns(df, lstColumns, strSeparator = ' '):
+    lstArrays = [pa.array(df[strColumn].astype('string[pyarrow]'), from_pandas = True).cast(pa.large_string()).fill_null('')
+                 for strColumn in lstColumns]
+    arrJoined = pc.binary_join_element_wise(*lstArrays, pa.scalar(strSeparator, pa.large_string()))
+
+    return pd.Series(pd.arrays.ArrowStringArray(arrJoined), index = df.index, name = None)
+
@@ -0,0 +1,124 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from pipeline.output_writer import to_arrow_table
+
+DELIVERY_STATE_VERSION = 1
+#Competitor columns a proposal depends on: item_conc inputs and the columns carried to proposals_df
+FINGERPRINT_COLUMNS = ['Canal', 'SKU', 'UPC', 'Item', 'URL SKU', 'Image',
+                       'Category', 'Subcategory', 'Subcategory2', 'Subcategory3']
+
+#Start Row Fingerprints
+def row_fingerprints(df, lstColumns = FINGERPRINT_COLUMNS):
+    return pd.util.hash_pandas_object(df[lstColumns].astype(object), index = False).to_numpy(dtype = np.uint64)
+#End Row Fingerprints
+
+#Start Delivery State
+#Key store of the last delivery, one row per key with the fingerprint it was last
+#   processed with: the proposal that row got (proposals_df and dfTop_Proposals
+#   columns) and whether the rules deleted it. It is only valid for the context it was built with (hierarchy
+#   history, rules and parameters), otherwise every row is processed again.
+def delivery_state_path(strState_Dir):
+    return os.path.join(strState_Dir, 'delivery_state.parquet')
+
+def load_delivery_state(strState_Dir, strContext_Key):
+    strPath = delivery_state_path(strState_Dir)
+    if not os.path.exists(strPath):
+        return None
+
+    tblState = pq.read_table(strPath)
+    dictMeta = tblState.schema.metadata or {}
+    if dictMeta.get(b'context') != strContext_Key.encode('utf-8') or \
+            dictMeta.get(b'version') != str(DELIVERY_STATE_VERSION).encode('utf-8'):
+        print("Delivery state: context changed, every row is processed")
+        return None
+
+    return latest_key_rows(tblState.to_pandas())
+
+def save_delivery_state(strState_Dir, strContext_Key, dfState):
+    os.makedirs(strState_Dir, exist_ok = True)
+    tblState = to_arrow_table(dfState.reset_index(drop = True))
+    tblState = tblState.replace_schema_metadata({**(tblState.schema.metadata or {}),
+                                                 b'context': strContext_Key.encode('utf-8'),
+                                                 b'version': str(DELIVERY_STATE_VERSION).encode('utf-8')})
+
+    strPath = delivery_state_path(strState_Dir)
+    pq.write_table(tblState, strPath + '.tmp', compression = 'zstd')
+    os.replace(strPath + '.tmp', strPath)
+
+#Last entry of every key. A key repeats when the same SKU + Canal is in several
+#   stores, or when its rows changed since the stored delivery.
+def latest_key_rows(dfState):
+    return dfState.drop_duplicates(subset = ['key'], keep = 'last').reset_index(drop = True)
+
+#Position in dfState of every delivery row whose key was already processed with
+#   the same fingerprint, -1 for new or changed rows.
+def carried_state_rows(arrKeys, arrFingerprints, dfState):
+    if dfState is None or len(dfState) == 0:
+        return np.full(len(arrKeys), -1, dtype = np.int64)
+
+    srKeys = dfState['key'].astype(str)
+    arrLatest = np.flatnonzero(~srKeys.duplicated(keep = 'last').to_numpy())
+    arrPositions = pd.Index(srKeys.to_numpy()[arrLatest]).get_indexer(
+        pd.Series(arrKeys, dtype = object).astype(str).to_numpy())
+
+    arrState_Rows = np.where(arrPositions >= 0, arrLatest[np.maximum(arrPositions, 0)], -1).astype(np.int64)
+    arrStored_Fingerprints = dfState['fingerprint'].to_numpy(dtype = np.uint64)[np.maximum(arrState_Rows, 0)]
+    arrState_Rows[arrStored_Fingerprints != np.asarray(arrFingerprints, dtype = np.uint64)] = -1
+    return arrState_Rows
+
+#State entries of the processed rows: row i of the processed frame (arrKeys,
+#   arrFingerprints, dfTop) kept by the rules when its position is in the index of
+#   dfProposals, deleted otherwise.
+def processed_state_rows(arrKeys, arrFingerprints, dfProposals, dfTop):
+    arrAlive = np.zeros(len(arrKeys), dtype = bool)
+    arrAlive[dfProposals.index.to_numpy()] = True
+
+    dfProposal_Columns = dfProposals.reindex(range(len(arrKeys)))
+    dfProposal_Columns.columns = ['proposal|' + strColumn for strColumn in dfProposal_Columns.columns]
+    dfTop_Columns = dfTop.reset_index(drop = True)
+    dfTop_Columns.columns = ['top|' + strColumn for strColumn in dfTop_Columns.columns]
+
+    dfState = pd.concat([pd.DataFrame({'key': pd.Series(arrKeys, dtype = object).astype(str).to_numpy(),
+                                       'fingerprint': np.asarray(arrFingerprints, dtype = np.uint64),
+                                       'deleted': ~arrAlive}),
+                         dfProposal_Columns.reset_index(drop = True), dfTop_Columns], axis = 1)
+    return dfState
+
+#New state: the entries of this delivery replace the stored ones with the same key
+#   (older fingerprints are dropped), the rest of the stored entries are kept.
+def merge_delivery_state(dfState, dfProcessed_State):
+    if dfState is None or len(dfState) == 0:
+        return latest_key_rows(dfProcessed_State)
+    return latest_key_rows(pd.concat([dfState, dfProcessed_State], ignore_index = True))
+
+#Rebuilds the full delivery in its original row order from the carried state rows
+#   (arrState_Rows >= 0) and the processed ones (in order, for arrState_Rows == -1).
+#   Returns (proposals, top proposals) without the rows the rules deleted in the
+#   proposals frame, like apply_condition_rules leaves it.
+def assemble_delivery(arrState_Rows, dfState, dfProcessed_State):
+    arrCarried = arrState_Rows >= 0
+    dfRows = pd.DataFrame(index = range(len(arrState_Rows)), columns = dfProcessed_State.columns, dtype = object)
+    if arrCarried.any():
+        dfRows.iloc[np.flatnonzero(arrCarried)] = dfState.iloc[arrState_Rows[arrCarried]][dfProcessed_State.columns].to_numpy(dtype = object)
+    if (~arrCarried).any():
+        dfRows.iloc[np.flatnonzero(~arrCarried)] = dfProcessed_State.to_numpy(dtype = object)
+
+    lstProposal_Columns = [strColumn for strColumn in dfProcessed_State.columns if strColumn.startswith('proposal|')]
+    lstTop_Columns = [strColumn for strColumn in dfProcessed_State.columns if strColumn.startswith('top|')]
+
+    dfProposals = dfRows.loc[~dfRows['deleted'].astype(bool), lstProposal_Columns]
+    dfProposals.columns = [strColumn.split('|', 1)[1] for strColumn in lstProposal_Columns]
+    dfTop = dfRows[lstTop_Columns].reset_index(drop = True)
+    dfTop.columns = [strColumn.split('|', 1)[1] for strColumn in lstTop_Columns]
+
+    dfTop = dfTop.infer_objects()
+    #Missing ranks are None, as find_top_matches_batch leaves them
+    for strColumn in dfTop.columns[dfTop.dtypes == object]:
+        dfTop[strColumn] = dfTop[strColumn].astype(object).where(dfTop[strColumn].notna(), None)
+
+    return dfProposals.infer_objects(), dfTop
+#End Delivery State
@@ -0,0 +1,47 @@
+import os
+
+import pandas as pd
+
+try:
+    import python_calamine
+except ImportError:
+    python_calamine = None
+
+#calamine (Rust reader) when python-calamine is installed, openpyxl otherwise.
+#   python-calamine is optional (pip install python-calamine): both engines give
+#   the same frames, openpyxl is only slower on large workbooks.
+EXCEL_ENGINE = 'calamine' if python_calamine is not None else 'openpyxl'
+
+#Parsed workbooks of this process: (path, mtime, size, sheets, dtypes) -> {sheet: DataFrame}
+_dictWorkbook_Cache = {}
+
+#Start Excel Loader
+def workbook_cache_key(strExcel_Path, lstSheets, dictDtypes):
+    statExcel = os.stat(strExcel_Path)
+    return (os.path.abspath(strExcel_Path), statExcel.st_mtime_ns, statExcel.st_size,
+            None if lstSheets is None else tuple(lstSheets), tuple(sorted((dictDtypes or {}).items())))
+
+#Reads lstSheets (every sheet when None) of a workbook into {sheet: DataFrame},
+#   with dictDtypes applied while parsing. The workbook is opened once and every
+#   sheet is parsed from it. Results are cached per file mtime and size, callers
+#   get copies.
+def read_excel_sheets(strExcel_Path, lstSheets = None, dictDtypes = None):
+    tupKey = workbook_cache_key(strExcel_Path, lstSheets, dictDtypes)
+    if tupKey not in _dictWorkbook_Cache:
+        with pd.ExcelFile(strExcel_Path, engine = EXCEL_ENGINE) as xlsWorkbook:
+            lstRead_Sheets = xlsWorkbook.sheet_names if lstSheets is None else list(lstSheets)
+            lstDFs = [xlsWorkbook.parse(strSheet_Name, dtype = dictDtypes) for strSheet_Name in lstRead_Sheets]
+
+        #Older versions of the file are dropped
+        for tupCached_Key in [tupCached_Key for tupCached_Key in _dictWorkbook_Cache
+                              if tupCached_Key[0] == tupKey[0] and tupCached_Key[1:3] != tupKey[1:3]]:
+            del _dictWorkbook_Cache[tupCached_Key]
+        _dictWorkbook_Cache[tupKey] = dict(zip(lstRead_Sheets, lstDFs))
+
+    return {strSheet_Name: df.copy() for strSheet_Name, df in _dictWorkbook_Cache[tupKey].items()}
+
+#Single sheet version of read_excel_sheets, a drop in for pd.read_excel: the sheet
+#   is a name or a position (first sheet by default).
+def read_excel(strExcel_Path, strSheet_Name = 0, dictDtypes = None):
+    return read_excel_sheets(strExcel_Path, [strSheet_Name], dictDtypes)[strSheet_Name]
+#End Excel Loader
@@ -0,0 +1,284 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import process as rf_process
+from rapidfuzz.distance import Indel
+
+ASCII_TRANSLATION = dict.fromkeys(range(128, 256), None)
+NON_WORD_PATTERN = re.compile(r"(?ui)\W")
+TOP_N_MATCHES = 5
+
+#Start Text Processing
+#Same steps as fuzzywuzzy.utils.full_process, so keys compare exactly as
+#   process.extract(..., scorer = fuzz.token_sort_ratio) compares them.
+def full_process(strText, boolForce_Ascii = False):
+    if boolForce_Ascii:
+        strText = strText.translate(ASCII_TRANSLATION)
+    return NON_WORD_PATTERN.sub(" ", strText).lower().strip()
+
+def sort_tokens(strText):
+    return " ".join(sorted(strText.split())).strip()
+
+#process.extract runs the query through full_process and then the ascii full_process,
+#   every choice only through the ascii one. Values that are not text (NaN Items)
+#   are compared as str(), as fuzzywuzzy's asciidammit does: NaN scores as 'nan'.
+def query_sort_key(strItem):
+    return sort_tokens(full_process(full_process(str(strItem)), boolForce_Ascii = True))
+
+def choice_sort_key(strItem):
+    return sort_tokens(full_process(str(strItem), boolForce_Ascii = True))
+#End Text Processing
+
+#Start Store Blocks
+#Everything a store needs to be matched, computed once per store:
+#   sorted-token key and length of every choice, and a token -> positions blocking index.
+def build_store_block(lstChoices):
+    lstKeys = [choice_sort_key(strChoice) for strChoice in lstChoices]
+
+    dictPostings = {}
+    for intPosition, strKey in enumerate(lstKeys):
+        for strToken in set(strKey.split()):
+            dictPostings.setdefault(strToken, []).append(intPosition)
+
+    return {
+        'keys': np.array(lstKeys, dtype = object),
+        'lengths': np.fromiter((len(strKey) for strKey in lstKeys), dtype = np.int64, count = len(lstKeys)),
+        'postings': {strToken: np.array(lstPositions, dtype = np.int64) for strToken, lstPositions in dictPostings.items()},
+    }
+
+def score_keys(strQuery_Key, arrKeys, fltScore_Cutoff = 0):
+    if len(arrKeys) == 0:
+        return np.empty(0, dtype = np.int64)
+    arrRatios = rf_process.cdist([strQuery_Key], arrKeys, scorer = Indel.normalized_similarity,
+                                 dtype = np.float64, score_cutoff = fltScore_Cutoff)[0]
+    #fuzzywuzzy utils.intr: int(round(100 * ratio))
+    return np.round(100 * arrRatios).astype(np.int64)
+#End Store Blocks
+
+#Start Blocked Matching
+#Top intTop_N (position, score) of one query, same order as process.extract:
+#   score descending, earlier choices first on ties.
+#   1. Choices sharing a selective token with the query are scored first, the
+#      intTop_N-th best of them is a lower bound T of the final top.
+#   2. The rest is kept only when the length bound 2*min(len)/(len sum) can still
+#      round to T, and is scored with a score cutoff so the C scorer can exit early.
+def top_matches_in_block(strQuery_Key, dictBlock, intTop_N = TOP_N_MATCHES, fltMax_Df_Ratio = 0.1):
+    arrKeys = dictBlock['keys']
+    arrLengths = dictBlock['lengths']
+    intChoices = len(arrKeys)
+
+    lstSeed_Postings = [dictBlock['postings'][strToken] for strToken in set(strQuery_Key.split())
+                        if strToken in dictBlock['postings'] and
+                        len(dictBlock['postings'][strToken]) <= max(intTop_N, fltMax_Df_Ratio * intChoices)]
+    arrSeed = np.unique(np.concatenate(lstSeed_Postings)) if lstSeed_Postings else np.empty(0, dtype = np.int64)
+    arrSeed_Scores = score_keys(strQuery_Key, arrKeys[arrSeed])
+
+    intThreshold = 0
+    if len(arrSeed) >= intTop_N:
+        intThreshold = int(np.partition(arrSeed_Scores, len(arrSeed) - intTop_N)[len(arrSeed) - intTop_N])
+
+    arrRest_Mask = np.ones(intChoices, dtype = bool)
+    arrRest_Mask[arrSeed] = False
+    if intThreshold > 0:
+        intQuery_Length = len(strQuery_Key)
+        arrBound = 200 * np.minimum(arrLengths, intQuery_Length) / np.maximum(arrLengths + intQuery_Length, 1)
+        arrRest_Mask &= (arrBound >= intThreshold - 0.5 - 1e-9) | (arrLengths + intQuery_Length == 0)
+    arrRest = np.flatnonzero(arrRest_Mask)
+
+    fltCutoff = max(0.0, (intThreshold - 0.5) / 100 - 1e-9)
+    arrRest_Scores = score_keys(strQuery_Key, arrKeys[arrRest], fltCutoff)
+
+    arrPositions = np.concatenate([arrSeed, arrRest])
+    arrScores = np.concatenate([arrSeed_Scores, arrRest_Scores])
+    arrOrder = np.lexsort((arrPositions, -arrScores))[:intTop_N]
+
+    return arrPositions[arrOrder], arrScores[arrOrder]
+
+def top_matches_chunk(lstQuery_Keys, dictBlock, intTop_N = TOP_N_MATCHES):
+    arrPositions = np.full((len(lstQuery_Keys), intTop_N), -1, dtype = np.int64)
+    arrScores = np.zeros((len(lstQuery_Keys), intTop_N), dtype = np.int64)
+    for intQuery, strQuery_Key in enumerate(lstQuery_Keys):
+        arrQuery_Positions, arrQuery_Scores = top_matches_in_block(strQuery_Key, dictBlock, intTop_N)
+        arrPositions[intQuery, :len(arrQuery_Positions)] = arrQuery_Positions
+        arrScores[intQuery, :len(arrQuery_Scores)] = arrQuery_Scores
+
+    return arrPositions, arrScores
+
+#Top intTop_N choice positions and scores of every query key against a built store
+#   block, as two (queries x intTop_N) arrays; missing matches have position -1.
+#   With a BlockPool holding the block the queries are split in chunks over its
+#   workers; with intWorkers > 1 and no pool a pool is opened for this block only.
+def match_block_positions(lstQuery_Keys, dictBlock, intTop_N = TOP_N_MATCHES, intWorkers = 1, pool = None):
+    if pool is not None:
+        return pool.match(lstQuery_Keys, dictBlock, intTop_N)
+    if intWorkers <= 1 or len(lstQuery_Keys) < 2 * intWorkers:
+        return top_matches_chunk(lstQuery_Keys, dictBlock, intTop_N)
+
+    with BlockPool([dictBlock], intWorkers) as pool:
+        return pool.match(lstQuery_Keys, dictBlock, intTop_N)
+
+def match_store_positions(lstQueries, lstChoices, intTop_N = TOP_N_MATCHES, intWorkers = 1):
+    return match_block_positions([query_sort_key(strQuery) for strQuery in lstQueries], build_store_block(lstChoices),
+                                 intTop_N, intWorkers)
+
+#Same (desc, score) tuples process.extract(query, lstChoices, limit = intTop_N,
+#   scorer = fuzz.token_sort_ratio) returns, for every query.
+def match_store(lstQueries, lstChoices, intTop_N = TOP_N_MATCHES, intWorkers = 1):
+    arrPositions, arrScores = match_store_positions(lstQueries, lstChoices, intTop_N, intWorkers)
+
+    return [[(lstChoices[intPosition], intScore) for intPosition, intScore in zip(lstRow_Positions, lstRow_Scores)
+             if intPosition >= 0]
+            for lstRow_Positions, lstRow_Scores in zip(arrPositions.tolist(), arrScores.tolist())]
+#End Blocked Matching
+
+#Start Block Pool
+#Store blocks of the pool, set once in every worker by the pool initializer
+_lstPool_Blocks = []
+
+def set_pool_blocks(lstBlocks):
+    global _lstPool_Blocks
+    _lstPool_Blocks = lstBlocks
+
+def top_matches_pool_chunk(intBlock, lstQuery_Keys, intTop_N):
+    return top_matches_chunk(lstQuery_Keys, _lstPool_Blocks[intBlock], intTop_N)
+
+#One process pool for a whole run over a fixed list of store blocks: the blocks
+#   reach every worker once, through the initializer, and each chunk only carries
+#   its query keys and the block number. With intWorkers <= 1 no process is started.
+#
+#   with BlockPool([dictStore['block'] for dictStore in lstStores], intWorkers) as pool:
+#       match_store_index(lstQuery_Keys, lstUPCs, dictStore, pool = pool)
+class BlockPool:
+    def __init__(self, lstBlocks, intWorkers):
+        self.intWorkers = intWorkers
+        self.dictBlock_Numbers = {id(dictBlock): intBlock for intBlock, dictBlock in enumerate(lstBlocks)}
+        self.lstBlocks = lstBlocks
+        self.executor = None
+        if intWorkers > 1:
+            self.executor = ProcessPoolExecutor(max_workers = intWorkers, initializer = set_pool_blocks,
+                                                initargs = (lstBlocks,))
+
+    def match(self, lstQuery_Keys, dictBlock, intTop_N = TOP_N_MATCHES):
+        if self.executor is None or len(lstQuery_Keys) < 2 * self.intWorkers:
+            return top_matches_chunk(lstQuery_Keys, dictBlock, intTop_N)
+
+        intBlock = self.dictBlock_Numbers[id(dictBlock)]
+        intChunk_Size = -(-len(lstQuery_Keys) // (self.intWorkers * 4))
+        lstChunks = [lstQuery_Keys[i:i + intChunk_Size] for i in range(0, len(lstQuery_Keys), intChunk_Size)]
+        lstResults = list(self.executor.map(top_matches_pool_chunk, [intBlock] * len(lstChunks), lstChunks,
+                                            [intTop_N] * len(lstChunks)))
+
+        return (np.concatenate([arrPositions for arrPositions, _ in lstResults]),
+                np.concatenate([arrScores for _, arrScores in lstResults]))
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, excTraceback):
+        self.shutdown()
+        return False
+#End Block Pool
+
+#Start UPC Index
+#UPC -> position of its first row in the store, the row the old
+#   df[df['UPC'] == upc].iloc[0] lookup returned. Missing UPCs never match.
+def build_upc_index(lstUPCs):
+    dictUPC_Index = {}
+    for intPosition, objUPC in enumerate(lstUPCs):
+        if pd.notna(objUPC):
+            dictUPC_Index.setdefault(objUPC, intPosition)
+    return dictUPC_Index
+
+#Block and UPC index of one store, built once and matched by any number of clients
+def build_store_index(lstStore_Items, lstStore_UPCs):
+    return {'block': build_store_block(lstStore_Items),
+            'upc_index': build_upc_index(lstStore_UPCs),
+            'size': len(lstStore_Items)}
+
+#Matches the client rows (their query keys and UPCs) against a built store index:
+#   rows whose UPC is in the store get that row position (arrUPC_Positions, -1
+#   otherwise), the rest get their top intTop_N fuzzy positions and scores; all
+#   positions index the store rows. pool is a BlockPool holding the store block.
+def match_store_index(lstQuery_Keys, lstUPCs, dictStore_Index, intTop_N = TOP_N_MATCHES, intWorkers = 1, pool = None):
+    dictUPC_Index = dictStore_Index['upc_index']
+    arrUPC_Positions = np.array([dictUPC_Index.get(objUPC, -1) if pd.notna(objUPC) else -1 for objUPC in lstUPCs],
+                                dtype = np.int64)
+
+    arrText_Rows = np.flatnonzero(arrUPC_Positions < 0)
+    arrPositions = np.full((len(lstQuery_Keys), intTop_N), -1, dtype = np.int64)
+    arrScores = np.zeros((len(lstQuery_Keys), intTop_N), dtype = np.int64)
+    if len(arrText_Rows) > 0 and dictStore_Index['size'] > 0:
+        arrPositions[arrText_Rows], arrScores[arrText_Rows] = match_block_positions(
+            [lstQuery_Keys[intRow] for intRow in arrText_Rows], dictStore_Index['block'], intTop_N, intWorkers, pool)
+
+    return arrUPC_Positions, arrPositions, arrScores
+
+#Same as match_store_index for a store given by its rows (one client, one store)
+def match_store_rows(lstItems, lstUPCs, lstStore_Items, lstStore_UPCs, intTop_N = TOP_N_MATCHES, intWorkers = 1):
+    return match_store_index([query_sort_key(strItem) for strItem in lstItems], lstUPCs,
+                             build_store_index(lstStore_Items, lstStore_UPCs), intTop_N, intWorkers)
+#End UPC Index
+
+#Start Result Buffers
+#(title, store column) of the suggestion columns written for every rank,
+#   in the order of the fuzzy_farma deliverable.
+SUGGESTION_COLUMNS = [
+    ('Tipo de Comparación', None),
+    ('UPC Sugerido', 'UPC'),
+    ('Descripción de producto Sugerido', 'Item'),
+    ('Puntuación', None),
+    ('URL SKU Sugerido', 'URL SKU'),
+    ('Imagen Sugerida', 'Image'),
+    ('Precio Final Sugerido', 'Final Price'),
+]
+
+def suggestion_column_names(intTop_N = TOP_N_MATCHES):
+    return [f'{strTitle} {intRank + 1}' for intRank in range(intTop_N) for strTitle, _ in SUGGESTION_COLUMNS]
+
+#One object buffer of intStores * intRows cells per suggestion column, filled
+#   with "" like the empty suggestions of the notebook.
+def allocate_result_buffers(intStores, intRows, intTop_N = TOP_N_MATCHES):
+    return {strColumn: np.full(intStores * intRows, "", dtype = object)
+            for strColumn in suggestion_column_names(intTop_N)}
+
+#Writes the matches of store intStore (match_store_rows output) into its slice of
+#   the buffers: identical UPC rows fill rank 1 with score 100 and the client UPC,
+#   fuzzy rows fill every rank they got.
+def fill_store_results(dictBuffers, intStore, lstUPCs, dictStore_Columns, arrUPC_Positions, arrPositions, arrScores):
+    intRows = len(arrUPC_Positions)
+    intOffset = intStore * intRows
+    arrUPC_Rows = np.flatnonzero(arrUPC_Positions >= 0)
+
+    for intRank in range(arrPositions.shape[1]):
+        arrRank_Rows = np.flatnonzero(arrPositions[:, intRank] >= 0)
+        arrRank_Positions = arrPositions[arrRank_Rows, intRank]
+
+        for strTitle, strStore_Column in SUGGESTION_COLUMNS:
+            arrColumn = dictBuffers[f'{strTitle} {intRank + 1}']
+            if strTitle == 'Tipo de Comparación':
+                arrColumn[intOffset + arrRank_Rows] = "Sugerido"
+            elif strTitle == 'Puntuación':
+                arrColumn[intOffset + arrRank_Rows] = arrScores[arrRank_Rows, intRank].astype(object)
+            else:
+                arrColumn[intOffset + arrRank_Rows] = dictStore_Columns[strStore_Column][arrRank_Positions]
+
+    arrUPC_Store_Positions = arrUPC_Positions[arrUPC_Rows]
+    dictBuffers['Tipo de Comparación 1'][intOffset + arrUPC_Rows] = "Idéntico"
+    dictBuffers['UPC Sugerido 1'][intOffset + arrUPC_Rows] = np.asarray(lstUPCs, dtype = object)[arrUPC_Rows]
+    dictBuffers['Puntuación 1'][intOffset + arrUPC_Rows] = 100
+    for strTitle, strStore_Column in SUGGESTION_COLUMNS[2:]:
+        if strStore_Column is not None:
+            dictBuffers[f'{strTitle} 1'][intOffset + arrUPC_Rows] = dictStore_Columns[strStore_Column][arrUPC_Store_Positions]
+
+#Client rows repeated once per store followed by the suggestion buffers, built
+#   in one step at the end.
+def materialize_results(df_base, dictBuffers, intStores):
+    dfResults = df_base.iloc[np.tile(np.arange(len(df_base)), intStores)].reset_index(drop = True)
+    return pd.concat([dfResults, pd.DataFrame(dictBuffers, index = dfResults.index)], axis = 1)
+#End Result Buffers
@@ -0,0 +1,483 @@
+import argparse
+import csv
+import email.parser
+import email.policy
+import hashlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from pipeline.tokenizer import clean_text, tokenize
+
+#Resident version of POST /api/fuzzy/process (backend/src/routes/fuzzy.js): same
+#   multipart fields (pivotFile, comparisonFile, matchCount), same SSE events and
+#   same results as performFuzzyMatching in backend/src/services/fuzzyService.js.
+#   Comparison files are parsed and indexed once and kept warm in the worker
+#   processes, keyed by the sha256 of the file, so repeat matches against the same
+#   competitor file only hash the upload and match the pivot rows.
+#
+#   python -m pipeline.fuzzy_service --port 3002 --workers 4
+#   VITE_API_URL=http://localhost:3002/api npm run dev
+SERVICE_PORT = 3002
+DEFAULT_MATCH_COUNT = 4
+MAX_MATCH_COUNT = 10
+MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+FILE_FORMATS = ['csv', 'xlsx', 'xls']
+#Warm comparison indexes per worker (least recently used ones are dropped)
+MAX_WARM_INDEXES = 4
+#Pivot rows per worker call; progress is sent after each one
+MIN_CHUNK_ROWS = 10
+PROGRESS_STEPS = 100
+
+#normalizeData of fuzzyService.js: column name (lower case) -> UPC / Item
+UPC_COLUMN_NAMES = frozenset(['upc', 'ean', 'sku', 'codigo', 'codigo de barras'])
+ITEM_COLUMN_NAMES = frozenset(['item', 'description', 'descripcion', 'producto', 'nombre'])
+#Columns of a match, first non empty one of each list
+URL_COLUMNS = ['URL SKU', 'URL']
+IMAGE_COLUMNS = ['Image', 'Imagen']
+PRICE_COLUMNS = ['Final Price', 'Price', 'Precio']
+#parseInt: leading integer of the text
+LEADING_INTEGER_PATTERN = re.compile(r'\s*([+-]?\d+)')
+
+#Start JavaScript Values
+#Falsy values of JavaScript (row[key] || '' in the service)
+def js_truthy(objValue):
+    if objValue is None or objValue is False or objValue == '':
+        return False
+    if isinstance(objValue, (int, float)) and (objValue == 0 or math.isnan(objValue)):
+        return False
+    return True
+
+#String(row[key] || '').trim(): whole numbers without '.0', as JavaScript prints them
+def js_string(objValue):
+    if not js_truthy(objValue):
+        return ''
+    if isinstance(objValue, float) and objValue.is_integer():
+        objValue = int(objValue)
+    return str(objValue).strip()
+
+def js_first(dictRow, lstColumns):
+    for strColumn in lstColumns:
+        if js_truthy(dictRow.get(strColumn)):
+            return dictRow[strColumn]
+    return ''
+
+#Math.round rounds halves up
+def js_round(fltValue):
+    return math.floor(fltValue + 0.5)
+
+def parse_match_count(strValue):
+    matchInteger = LEADING_INTEGER_PATTERN.match(strValue or '')
+    return (int(matchInteger.group(1)) if matchInteger else 0) or DEFAULT_MATCH_COUNT
+#End JavaScript Values
+
+#Start Parsing
+def file_extension(strName):
+    strExtension = strName.lower().split('.')[-1]
+    if strExtension not in FILE_FORMATS:
+        raise ValueError(f'Unsupported file format: {strExtension}')
+    return strExtension
+
+#CSV (every value as text) or the first sheet of an Excel file, one dict per row;
+#   empty lines and empty sheet rows are skipped
+def parse_file(bytesData, strName):
+    strExtension = file_extension(strName)
+    if strExtension == 'csv':
+        readerCSV = csv.DictReader(io.StringIO(bytesData.decode('utf-8-sig'), newline = ''))
+        return [{strColumn: objValue for strColumn, objValue in dictRow.items() if strColumn is not None and objValue is not None}
+                for dictRow in readerCSV]
+    dfSheet = pd.read_excel(io.BytesIO(bytesData), sheet_name = 0, dtype = object).dropna(how = 'all')
+    return dfSheet.astype(object).where(dfSheet.notna(), '').to_dict('records')
+
+#UPC and Item under their usual names, the other columns as they are
+def normalize_rows(lstRows):
+    lstNormalized = []
+    for dictRow in lstRows:
+        dictNormalized = {}
+        for strColumn, objValue in dictRow.items():
+            strName = str(strColumn).lower().strip()
+            if strName in UPC_COLUMN_NAMES:
+                dictNormalized['UPC'] = js_string(objValue)
+            elif strName in ITEM_COLUMN_NAMES:
+                dictNormalized['Item'] = js_string(objValue)
+            else:
+                dictNormalized[strColumn] = objValue
+        lstNormalized.append(dictNormalized)
+    return lstNormalized
+#End Parsing
+
+#Start Comparison Index
+#Words of a text as createInvertedIndex / findBestMatches count them: no repeats,
+#   in text order
+def text_words(strText):
+    return list(dict.fromkeys(tokenize(strText)))
+
+#Normalized comparison rows, word -> ascending row positions, and UPC -> row (the
+#   last row of a repeated UPC, as upcMap.set keeps it)
+def build_comparison_index(lstRows):
+    lstComparison = normalize_rows(lstRows)
+
+    dictPostings = {}
+    for intPosition, dictRow in enumerate(lstComparison):
+        for strWord in text_words(dictRow.get('Item') or ''):
+            dictPostings.setdefault(strWord, []).append(intPosition)
+
+    dictUPC_Index = {}
+    for intPosition, dictRow in enumerate(lstComparison):
+        if dictRow.get('UPC'):
+            dictUPC_Index[dictRow['UPC']] = intPosition
+
+    return {'rows': lstComparison,
+            'postings': {strWord: np.array(lstPositions, dtype = np.int64) for strWord, lstPositions in dictPostings.items()},
+            'upc_index': dictUPC_Index,
+            'raw_rows': len(lstRows)}
+
+#Top intMax_Results (position, score) by shared words: most words first, then the
+#   order the rows were first reached (word by word, ascending positions)
+def best_matches(lstWords, dictIndex, intMax_Results):
+    lstPostings = [dictIndex['postings'][strWord] for strWord in lstWords if strWord in dictIndex['postings']]
+    if not lstWords or not lstPostings:
+        return []
+
+    arrPositions, arrFirst, arrCounts = np.unique(np.concatenate(lstPostings), return_index = True, return_counts = True)
+    arrOrder = np.lexsort((arrFirst, -arrCounts))[:max(intMax_Results, 0)]
+    return [(intPosition, min(js_round(intCount / len(lstWords) * 100), 100))
+            for intPosition, intCount in zip(arrPositions[arrOrder].tolist(), arrCounts[arrOrder].tolist())]
+
+def match_entry(strMatch_Type, dictRow, intScore):
+    return {'matchType': strMatch_Type,
+            'suggestedUPC': dictRow.get('UPC') or '',
+            'suggestedDescription': dictRow.get('Item') or '',
+            'score': intScore,
+            'urlSKU': js_first(dictRow, URL_COLUMNS),
+            'image': js_first(dictRow, IMAGE_COLUMNS),
+            'finalPrice': js_first(dictRow, PRICE_COLUMNS)}
+
+EMPTY_MATCH = {'matchType': 'Suggested', 'suggestedUPC': '', 'suggestedDescription': '', 'score': 0,
+               'urlSKU': '', 'image': '', 'finalPrice': ''}
+
+#Results of normalized pivot rows: identical UPC first, then the best word matches
+#   (skipping UPCs already suggested), padded to intMatch_Count
+def match_pivot_rows(lstPivot, dictIndex, intMatch_Count):
+    lstComparison = dictIndex['rows']
+    lstResults = []
+    for dictPivot in lstPivot:
+        dictResult = {'UPC': dictPivot.get('UPC') or '', 'Item': dictPivot.get('Item') or '', 'matches': []}
+        lstMatches = dictResult['matches']
+
+        strPivot_UPC = js_string(dictPivot.get('UPC'))
+        if strPivot_UPC and strPivot_UPC in dictIndex['upc_index']:
+            lstMatches.append(match_entry('Identical', lstComparison[dictIndex['upc_index'][strPivot_UPC]], 100))
+
+        strClean_Item = clean_text(dictPivot.get('Item') or '')
+        if strClean_Item:
+            for intPosition, intScore in best_matches(text_words(strClean_Item), dictIndex,
+                                                      intMatch_Count - len(lstMatches) + 5):
+                dictMatched = lstComparison[intPosition]
+                if any(dictMatch['suggestedUPC'] == dictMatched.get('UPC') for dictMatch in lstMatches):
+                    continue
+                lstMatches.append(match_entry('Suggested', dictMatched, intScore))
+                if len(lstMatches) >= intMatch_Count:
+                    break
+
+        while len(lstMatches) < intMatch_Count:
+            lstMatches.append(dict(EMPTY_MATCH))
+        dictResult['matches'] = lstMatches[:intMatch_Count]
+        lstResults.append(dictResult)
+    return lstResults
+#End Comparison Index
+
+#Start Worker
+#Warm comparison indexes of this worker process: sha256 -> index
+_dictWarm_Indexes = OrderedDict()
+
+#Index of a comparison file, parsed from its spooled copy only when it is not warm.
+#   Returns the index and whether it was warm.
+def comparison_index(strHash, strSpool_Path, strName, intMax_Indexes = MAX_WARM_INDEXES):
+    if strHash in _dictWarm_Indexes:
+        _dictWarm_Indexes.move_to_end(strHash)
+        return _dictWarm_Indexes[strHash], True
+
+    with open(strSpool_Path, 'rb') as fileSpool:
+        dictIndex = build_comparison_index(parse_file(fileSpool.read(), strName))
+    _dictWarm_Indexes[strHash] = dictIndex
+    while len(_dictWarm_Indexes) > intMax_Indexes:
+        _dictWarm_Indexes.popitem(last = False)
+    return dictIndex, False
+
+#Worker calls: rows of the comparison file (indexing it if needed), and one chunk of
+#   pivot rows matched against it
+def warm_comparison(strHash, strSpool_Path, strName, intMax_Indexes = MAX_WARM_INDEXES):
+    dictIndex, boolWarm = comparison_index(strHash, strSpool_Path, strName, intMax_Indexes)
+    return dictIndex['raw_rows'], boolWarm
+
+def match_chunk(strHash, strSpool_Path, strName, lstPivot, intMatch_Count, intMax_Indexes = MAX_WARM_INDEXES):
+    dictIndex, _ = comparison_index(strHash, strSpool_Path, strName, intMax_Indexes)
+    return match_pivot_rows(lstPivot, dictIndex, intMatch_Count)
+
+#Drops the index of a comparison file the pool no longer assigns to this worker
+def drop_comparison(strHash):
+    _dictWarm_Indexes.pop(strHash, None)
+#End Worker
+
+#Start Worker Pool
+#One single process executor per worker. Every comparison file is sent to the same
+#   worker (the one with the fewest files when it is new), so its index is built and
+#   kept once; requests on different files run at the same time. Workers are spawned,
+#   not forked, since the server already runs threads.
+#   Each worker keeps at most intMax_Indexes files: when a new one goes over, the
+#   least recently requested file not in use by a request loses its assignment,
+#   its spooled copy and its warm index in the worker.
+class MatchingPool:
+    def __init__(self, intWorkers, strSpool_Dir, intMax_Indexes = MAX_WARM_INDEXES):
+        contextSpawn = multiprocessing.get_context('spawn')
+        self.lstExecutors = [ProcessPoolExecutor(max_workers = 1, mp_context = contextSpawn) for _ in range(max(1, intWorkers))]
+        self.strSpool_Dir = strSpool_Dir
+        self.intMax_Indexes = intMax_Indexes
+        #sha256 -> worker, least recently requested first
+        self.dictAssigned = OrderedDict()
+        #sha256 -> requests using the file
+        self.dictActive = {}
+        self.lockAssigned = threading.Lock()
+        os.makedirs(strSpool_Dir, exist_ok = True)
+
+    #Worker of a comparison file and the path of its spooled copy (written once).
+    #   Every assign is paired with a release once the request is done with the file.
+    def assign(self, strHash, bytesData, strName):
+        strSpool_Path = os.path.join(self.strSpool_Dir, strHash + '.' + file_extension(strName))
+        with self.lockAssigned:
+            if not os.path.exists(strSpool_Path):
+                with open(strSpool_Path + '.tmp', 'wb') as fileSpool:
+                    fileSpool.write(bytesData)
+                os.replace(strSpool_Path + '.tmp', strSpool_Path)
+            if strHash in self.dictAssigned:
+                self.dictAssigned.move_to_end(strHash)
+            else:
+                lstLoads = [0] * len(self.lstExecutors)
+                for intWorker in self.dictAssigned.values():
+                    lstLoads[intWorker] += 1
+                self.dictAssigned[strHash] = lstLoads.index(min(lstLoads))
+            self.dictActive[strHash] = self.dictActive.get(strHash, 0) + 1
+            self.evict(self.dictAssigned[strHash])
+            return self.lstExecutors[self.dictAssigned[strHash]], strSpool_Path
+
+    def release(self, strHash):
+        with self.lockAssigned:
+            self.dictActive[strHash] -= 1
+            if self.dictActive[strHash] == 0:
+                del self.dictActive[strHash]
+                if strHash in self.dictAssigned:
+                    self.evict(self.dictAssigned[strHash])
+
+    #Drops the least recently requested idle files of a worker over intMax_Indexes
+    #   (called with lockAssigned held)
+    def evict(self, intWorker):
+        lstWorker_Hashes = [strHash for strHash, intAssigned in self.dictAssigned.items() if intAssigned == intWorker]
+        lstIdle_Hashes = [strHash for strHash in lstWorker_Hashes if strHash not in self.dictActive]
+        for strHash in lstIdle_Hashes[:max(len(lstWorker_Hashes) - self.intMax_Indexes, 0)]:
+            del self.dictAssigned[strHash]
+            self.remove_spool(strHash)
+            self.lstExecutors[intWorker].submit(drop_comparison, strHash)
+
+    def remove_spool(self, strHash):
+        for strFile_Name in os.listdir(self.strSpool_Dir):
+            if strFile_Name.startswith(strHash + '.'):
+                os.remove(os.path.join(self.strSpool_Dir, strFile_Name))
+
+    def shutdown(self):
+        for executor in self.lstExecutors:
+            executor.shutdown(cancel_futures = True)
+        with self.lockAssigned:
+            for strHash in list(self.dictAssigned):
+                self.remove_spool(strHash)
+            self.dictAssigned.clear()
+#End Worker Pool
+
+#Start HTTP Service
+def parse_multipart(strContent_Type, bytesBody):
+    msgForm = email.parser.BytesParser(policy = email.policy.HTTP).parsebytes(
+        b'Content-Type: ' + strContent_Type.encode('latin-1') + b'\r\n\r\n' + bytesBody)
+    dictFields, dictFiles = {}, {}
+    for msgPart in msgForm.iter_parts():
+        strField = msgPart.get_param('name', header = 'content-disposition')
+        if msgPart.get_filename() is not None:
+            dictFiles[strField] = (msgPart.get_filename(), msgPart.get_payload(decode = True))
+        else:
+            dictFields[strField] = msgPart.get_payload(decode = True).decode('utf-8')
+    return dictFields, dictFiles
+
+def chunk_rows(intTotal):
+    intChunk = max(MIN_CHUNK_ROWS, -(-intTotal // PROGRESS_STEPS))
+    return [(intStart, min(intStart + intChunk, intTotal)) for intStart in range(0, intTotal, intChunk)]
+
+#HTTP/1.1 so uploads sent with 'Expect: 100-continue' are not held back; the SSE
+#   stream is sent chunked, as Express does.
+class FuzzyRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    pool = None
+    strAllowed_Origin = os.environ.get('FRONTEND_URL', 'http://localhost:5173')
+
+    def send_cors_headers(self):
+        self.send_header('Access-Control-Allow-Origin', self.strAllowed_Origin)
+        self.send_header('Access-Control-Allow-Credentials', 'true')
+
+    def send_json(self, intStatus, dictBody):
+        bytesBody = json.dumps(dictBody, ensure_ascii = False).encode('utf-8')
+        self.send_response(intStatus)
+        self.send_cors_headers()
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(bytesBody)))
+        self.end_headers()
+        self.wfile.write(bytesBody)
+
+    def send_event(self, dictData):
+        bytesEvent = f"data: {json.dumps(dictData, ensure_ascii = False, default = str)}\n\n".encode('utf-8')
+        self.wfile.write(f'{len(bytesEvent):x}\r\n'.encode('ascii') + bytesEvent + b'\r\n')
+        self.wfile.flush()
+
+    def end_events(self):
+        self.wfile.write(b'0\r\n\r\n')
+        self.wfile.flush()
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self.send_cors_headers()
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', self.headers.get('Access-Control-Request-Headers', '*'))
+        self.end_headers()
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/api/health':
+            return self.send_json(404, {'success': False, 'error': 'Not found'})
+        self.send_json(200, {'status': 'ok', 'timestamp': datetime.now(timezone.utc).isoformat(),
+                             'comparison_files': len(self.pool.dictAssigned)})
+
+    def do_POST(self):
+        if self.path.split('?')[0] != '/api/fuzzy/process':
+            return self.send_json(404, {'success': False, 'error': 'Not found'})
+        print('=== FUZZY PROCESS REQUEST RECEIVED ===')
+        fltStart = time.perf_counter()
+
+        intLength = int(self.headers.get('Content-Length') or 0)
+        if intLength > 2 * MAX_UPLOAD_BYTES:
+            self.close_connection = True
+            return self.send_json(400, {'success': False, 'error': 'El archivo excede el tamaño máximo permitido (50MB)'})
+        dictFields, dictFiles = parse_multipart(self.headers.get('Content-Type', ''), self.rfile.read(intLength))
+
+        if 'pivotFile' not in dictFiles or 'comparisonFile' not in dictFiles:
+            return self.send_json(400, {'success': False, 'error': 'Se requieren ambos archivos: pivotFile y comparisonFile'})
+        if any(len(bytesData) > MAX_UPLOAD_BYTES for _, bytesData in dictFiles.values()):
+            return self.send_json(400, {'success': False, 'error': 'El archivo excede el tamaño máximo permitido (50MB)'})
+        intMatch_Count = parse_match_count(dictFields.get('matchCount'))
+        if intMatch_Count < 1 or intMatch_Count > MAX_MATCH_COUNT:
+            return self.send_json(400, {'success': False, 'error': 'matchCount debe estar entre 1 y 10'})
+
+        self.send_response(200)
+        self.send_cors_headers()
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'keep-alive')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        try:
+            self.send_event({'type': 'start', 'message': 'Iniciando procesamiento...'})
+            try:
+                self.process(dictFiles['pivotFile'], dictFiles['comparisonFile'], intMatch_Count, fltStart)
+            except Exception as excError:
+                print(f'Error processing fuzzy matching: {excError!r}')
+                self.send_event({'type': 'error', 'success': False, 'error': str(excError) or 'Error al procesar los archivos'})
+            self.end_events()
+        except (BrokenPipeError, ConnectionResetError):
+            print('Client disconnected')
+            self.close_connection = True
+
+    def process(self, tupPivot, tupComparison, intMatch_Count, fltStart):
+        strPivot_Name, bytesPivot = tupPivot
+        strComparison_Name, bytesComparison = tupComparison
+        print(f'Processing files: {strPivot_Name} vs {strComparison_Name} - match count: {intMatch_Count}')
+
+        lstPivot = normalize_rows(parse_file(bytesPivot, strPivot_Name))
+        strHash = hashlib.sha256(bytesComparison).hexdigest()
+        executor, strSpool_Path = self.pool.assign(strHash, bytesComparison, strComparison_Name)
+        try:
+            self.match_comparison(executor, (strHash, strSpool_Path, strComparison_Name), lstPivot, intMatch_Count, fltStart)
+        finally:
+            self.pool.release(strHash)
+
+    def match_comparison(self, executor, tupArgs, lstPivot, intMatch_Count, fltStart):
+        strHash = tupArgs[0]
+        intComparison_Rows, boolWarm = executor.submit(warm_comparison, *tupArgs, self.pool.intMax_Indexes).result()
+        print(f"Pivot items: {len(lstPivot)}, Comparison items: {intComparison_Rows} "
+              f"({'warm index' if boolWarm else 'parsed and indexed'} {strHash[:12]})")
+
+        if not lstPivot:
+            return self.send_event({'type': 'error', 'success': False,
+                                    'error': 'El archivo pivote está vacío o no tiene el formato correcto'})
+        if not intComparison_Rows:
+            return self.send_event({'type': 'error', 'success': False,
+                                    'error': 'El archivo de comparación está vacío o no tiene el formato correcto'})
+        self.send_event({'type': 'parsing',
+                         'message': f'Archivos parseados: {len(lstPivot)} productos pivote, {intComparison_Rows} productos de comparación'})
+
+        lstResults = []
+        intTotal = len(lstPivot)
+        for intStart, intEnd in chunk_rows(intTotal):
+            lstResults.extend(executor.submit(match_chunk, *tupArgs, lstPivot[intStart:intEnd], intMatch_Count,
+                                              self.pool.intMax_Indexes).result())
+            intPercentage = js_round(intEnd / intTotal * 100)
+            self.send_event({'type': 'progress', 'current': intEnd, 'total': intTotal, 'percentage': intPercentage,
+                             'message': f'Procesando {intEnd} de {intTotal} productos ({intPercentage}%)'})
+
+        intProcessing_Time = int((time.perf_counter() - fltStart) * 1000)
+        print(f'Processing completed in {intProcessing_Time}ms - {len(lstResults)} results')
+        self.send_event({'type': 'complete', 'success': True, 'results': lstResults, 'totalPivot': intTotal,
+                         'totalComparison': intComparison_Rows, 'processingTime': intProcessing_Time,
+                         'warmIndex': boolWarm})
+
+def serve(strHost = '0.0.0.0', intPort = SERVICE_PORT, intWorkers = None, strSpool_Dir = None,
+          intMax_Indexes = MAX_WARM_INDEXES):
+    FuzzyRequestHandler.pool = MatchingPool(intWorkers or os.cpu_count() or 1,
+                                            strSpool_Dir or os.path.join(tempfile.gettempdir(), 'fuzzy_service'),
+                                            intMax_Indexes)
+    server = ThreadingHTTPServer((strHost, intPort), FuzzyRequestHandler)
+    print(f"Fuzzy matching service on http://localhost:{intPort} ({len(FuzzyRequestHandler.pool.lstExecutors)} workers)")
+    print("   - POST /api/fuzzy/process")
+    print("   - GET  /api/health")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        FuzzyRequestHandler.pool.shutdown()
+#End HTTP Service
+
+def main(lstArgs = None):
+    parser = argparse.ArgumentParser(description = 'Resident fuzzy matching service (POST /api/fuzzy/process).')
+    parser.add_argument('--host', default = '0.0.0.0')
+    parser.add_argument('--port', type = int, default = int(os.environ.get('FUZZY_SERVICE_PORT', SERVICE_PORT)))
+    parser.add_argument('--workers', type = int, default = None, help = 'Worker processes (CPUs by default)')
+    parser.add_argument('--spool-dir', default = None, help = 'Where comparison files are kept for the workers')
+    parser.add_argument('--max-indexes', type = int, default = MAX_WARM_INDEXES, help = 'Warm comparison files per worker')
+    args = parser.parse_args(lstArgs)
+
+    serve(args.host, args.port, args.workers, args.spool_dir, args.max_indexes)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
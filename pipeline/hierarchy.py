@@ -0,0 +1,300 @@
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+NO_MATCH_FOUND = "No Match Found"
+SCORING_MODES = ['bm25', 'tfidf']
+#Terms in more of the hierarchy rows than this share are stopwords (learn_stopwords)
+MAX_DF_RATIO = 0.2
+
+#Start Inverted Index Functions
+def create_inverted_index(df, column):
+    inverted_index = defaultdict(set)
+    for idx, row in df.iterrows():
+        words = set(row[column].lower().split())
+        for word in words:
+            inverted_index[word].add(idx)
+    return inverted_index
+
+# Función para encontrar la mejor coincidencia
+def find_best_match(new_description, inverted_index, hierarchy_df):
+    words = set(new_description.lower().split())
+    matched_records = defaultdict(int)
+    for word in words:
+        if word in inverted_index:
+            for idx in inverted_index[word]:
+                matched_records[idx] += 1
+
+    if not matched_records:
+        return NO_MATCH_FOUND
+
+    best_match = max(matched_records, key=matched_records.get)
+    #print(best_match)
+    return hierarchy_df.iloc[best_match]['Category_Nike_conc']
+#End Inverted Index Functions
+
+#Start Term Statistics Functions
+def document_frequencies(inverted_index):
+    if hasattr(inverted_index, 'document_frequencies'):
+        return inverted_index.document_frequencies()
+    return {word: len(postings) for word, postings in inverted_index.items()}
+
+#Document frequency of every term over the hierarchy, most frequent first.
+def term_statistics(inverted_index, intHierarchy_Rows):
+    dictDocument_Frequency = document_frequencies(inverted_index)
+    dfStats = pd.DataFrame({'term': list(dictDocument_Frequency),
+                            'document_frequency': list(dictDocument_Frequency.values())})
+    dfStats['df_ratio'] = dfStats['document_frequency'] / max(intHierarchy_Rows, 1)
+
+    return dfStats.sort_values(['document_frequency', 'term'], ascending = [False, True], ignore_index = True)
+
+#Terms present in more than fltMax_Df_Ratio of the hierarchy rows ("de", "para", the brand...).
+def learn_stopwords(inverted_index, intHierarchy_Rows, fltMax_Df_Ratio = MAX_DF_RATIO):
+    dfStats = term_statistics(inverted_index, intHierarchy_Rows)
+    return frozenset(dfStats.loc[dfStats['df_ratio'] > fltMax_Df_Ratio, 'term'])
+
+#End Term Statistics Functions
+
+#Start Term Vocabulary
+#Term -> integer id of an inverted index (the row of the term in the postings
+#   matrix). Indexes loaded from disk keep theirs with the stored terms (see
+#   index_store), so it is built once per index. The ids of every distinct
+#   description are looked up once and reused by all the query matrices.
+class TermVocabulary:
+    def __init__(self, lstTerms):
+        self.lstTerms = list(lstTerms)
+        self.dictIds = {strTerm: intId for intId, strTerm in enumerate(self.lstTerms)}
+        self._dictText_Ids = {}
+
+    def __len__(self):
+        return len(self.lstTerms)
+
+    def __contains__(self, strTerm):
+        return strTerm in self.dictIds
+
+    #Ids of the distinct known words of strText, in the order find_best_match walks them
+    def text_ids(self, strText):
+        tupIds = self._dictText_Ids.get(strText)
+        if tupIds is None:
+            tupIds = self._dictText_Ids[strText] = tuple(self.dictIds[strWord] for strWord in set(strText.lower().split())
+                                                         if strWord in self.dictIds)
+        return tupIds
+
+    def term_ids(self, setTerms):
+        return {self.dictIds[strTerm] for strTerm in setTerms if strTerm in self.dictIds}
+#End Term Vocabulary
+
+#Start Batched Assignment Functions
+
+#Term-document matrix of the hierarchy (vocabulary x hierarchy rows) built
+#   straight from the postings of the inverted index. Indexes loaded from disk
+#   already hold the postings arrays and their vocabulary.
+def build_postings_matrix(inverted_index, intHierarchy_Rows):
+    if hasattr(inverted_index, 'postings_matrix'):
+        return inverted_index.postings_matrix(intHierarchy_Rows)
+
+    vocabulary = TermVocabulary(inverted_index)
+
+    arrLengths = np.fromiter((len(setPostings) for setPostings in inverted_index.values()),
+                             dtype = np.int64, count = len(vocabulary))
+    arrIndptr = np.zeros(len(vocabulary) + 1, dtype = np.int64)
+    np.cumsum(arrLengths, out = arrIndptr[1:])
+
+    arrIndices = np.empty(arrIndptr[-1], dtype = np.int32)
+    for intWord_Id, setPostings in enumerate(inverted_index.values()):
+        arrIndices[arrIndptr[intWord_Id]:arrIndptr[intWord_Id + 1]] = sorted(setPostings)
+
+    matPostings = sparse.csr_matrix((np.ones(len(arrIndices), dtype = np.int32), arrIndices, arrIndptr),
+                                    shape = (len(vocabulary), intHierarchy_Rows))
+
+    return vocabulary, matPostings
+
+#Query matrix (descriptions x vocabulary), one entry per distinct known word
+#   that is not a stopword.
+def build_query_matrix(lstDescriptions, vocabulary, setStopwords = frozenset()):
+    setStopword_Ids = vocabulary.term_ids(setStopwords)
+    lstIndptr = [0]
+    lstIndices = []
+    for strDescription in lstDescriptions:
+        lstIndices.extend(intId for intId in vocabulary.text_ids(strDescription) if intId not in setStopword_Ids)
+        lstIndptr.append(len(lstIndices))
+
+    return sparse.csr_matrix((np.ones(len(lstIndices), dtype = np.int32),
+                              np.asarray(lstIndices, dtype = np.int32),
+                              np.asarray(lstIndptr, dtype = np.int64)),
+                             shape = (len(lstDescriptions), len(vocabulary)))
+
+#find_best_match keeps the first record inserted in matched_records among the
+#   ones with the highest count; walking the same sets in the same order gives
+#   the same record.
+def resolve_tie(strDescription, inverted_index, setCandidates, setStopwords = frozenset()):
+    for word in set(strDescription.lower().split()):
+        if word in inverted_index and word not in setStopwords:
+            for idx in inverted_index[word]:
+                if idx in setCandidates:
+                    return idx
+
+#Position of the best hierarchy row for every description, -1 when no word is shared.
+#   Words in setStopwords (see learn_stopwords) are left out of the count.
+def find_best_match_positions(lstDescriptions, inverted_index, intHierarchy_Rows, intBlock_Size = 256,
+                              setStopwords = frozenset()):
+    vocabulary, matPostings = build_postings_matrix(inverted_index, intHierarchy_Rows)
+
+    #Repeated descriptions always get the same answer, score each one once
+    dictUnique = {}
+    arrInverse = np.fromiter((dictUnique.setdefault(strDescription, len(dictUnique))
+                              for strDescription in lstDescriptions), dtype = np.int64, count = len(lstDescriptions))
+    lstUnique = list(dictUnique)
+
+    matQuery = build_query_matrix(lstUnique, vocabulary, setStopwords)
+    arrBest = np.full(len(lstUnique), -1, dtype = np.int64)
+
+    for intStart in range(0, len(lstUnique), intBlock_Size):
+        matScores = matQuery[intStart:intStart + intBlock_Size] @ matPostings
+
+        arrLengths = np.diff(matScores.indptr)
+        arrRows = np.flatnonzero(arrLengths)
+        if len(arrRows) == 0:
+            continue
+
+        arrStarts = matScores.indptr[arrRows]
+        arrRow_Max = np.maximum.reduceat(matScores.data, arrStarts)
+        arrIs_Max = matScores.data == np.repeat(arrRow_Max, arrLengths[arrRows])
+        arrMax_Count = np.add.reduceat(arrIs_Max.astype(np.int32), arrStarts)
+
+        arrMax_Positions = np.flatnonzero(arrIs_Max)
+        arrMax_Rows = np.repeat(arrRows, arrMax_Count)
+        arrMax_Columns = matScores.indices[arrMax_Positions]
+
+        arrFirst = np.concatenate(([0], np.cumsum(arrMax_Count)[:-1]))
+        arrBest[intStart + arrRows] = arrMax_Columns[arrFirst]
+
+        for intRow_Position in np.flatnonzero(arrMax_Count > 1):
+            intFirst = arrFirst[intRow_Position]
+            setCandidates = set(arrMax_Columns[intFirst:intFirst + arrMax_Count[intRow_Position]].tolist())
+            intRow = arrMax_Rows[intFirst]
+            arrBest[intStart + intRow] = resolve_tie(lstUnique[intStart + intRow], inverted_index, setCandidates,
+                                                     setStopwords)
+
+    return arrBest[arrInverse]
+
+#Batched find_best_match: one proposal per description, same output as calling
+#   find_best_match row by row.
+def find_best_match_batch(lstDescriptions, inverted_index, hierarchy_df, intBlock_Size = 256, setStopwords = frozenset()):
+    lstDescriptions = list(lstDescriptions)
+    arrBest = find_best_match_positions(lstDescriptions, inverted_index, len(hierarchy_df), intBlock_Size, setStopwords)
+
+    arrHierarchy = hierarchy_df['Category_Nike_conc'].to_numpy(dtype = object)
+    arrProposals = np.full(len(arrBest), NO_MATCH_FOUND, dtype = object)
+    arrFound = arrBest >= 0
+    arrProposals[arrFound] = arrHierarchy[arrBest[arrFound]]
+
+    return arrProposals.tolist()
+#End Batched Assignment Functions
+
+#Start Top-k Scoring Functions
+#Hierarchy rows x vocabulary weights for the scoring mode, over word sets (tf = 1):
+#   bm25  -> idf * (k1 + 1) / (1 + k1 * (1 - b + b * len / avg len))
+#   tfidf -> idf / norm of the row, for a cosine with the idf weighted query
+def build_term_weights(matPostings, strScoring, fltK1 = 1.2, fltB = 0.75):
+    if strScoring not in SCORING_MODES:
+        raise ValueError(f'Unknown scoring mode {strScoring}, use one of {SCORING_MODES}.')
+
+    intRows = matPostings.shape[1]
+    arrDocument_Frequency = np.diff(matPostings.indptr).astype(np.float64)
+    matWeights = matPostings.astype(np.float64)
+
+    if strScoring == 'bm25':
+        arrIdf = np.log1p((intRows - arrDocument_Frequency + 0.5) / (arrDocument_Frequency + 0.5))
+        arrLengths = np.bincount(matPostings.indices, minlength = intRows).astype(np.float64)
+        fltAvg_Length = arrLengths.mean() if intRows > 0 and arrLengths.mean() > 0 else 1.0
+        arrLength_Factor = (fltK1 + 1) / (1 + fltK1 * (1 - fltB + fltB * arrLengths / fltAvg_Length))
+        matWeights = sparse.diags(arrIdf) @ matWeights @ sparse.diags(arrLength_Factor)
+    else:
+        arrIdf = np.log((1 + intRows) / (1 + arrDocument_Frequency)) + 1
+        matWeights = sparse.diags(arrIdf) @ matWeights
+        arrNorms = np.sqrt(np.asarray(matWeights.multiply(matWeights).sum(axis = 0)).ravel())
+        arrNorms[arrNorms == 0] = 1.0
+        matWeights = matWeights @ sparse.diags(1 / arrNorms)
+
+    return matWeights.tocsr(), arrIdf
+
+#Top intTop_K distinct hierarchy proposals (Category_Nike_conc) per description with
+#   their scores. Rows sharing a proposal count once, with their best score.
+#   Only one block of descriptions is scored at a time, so memory is bounded by
+#   intBlock_Size x matched proposals instead of descriptions x hierarchy rows.
+def find_top_matches_batch(lstDescriptions, inverted_index, hierarchy_df, intTop_K = 5, strScoring = 'bm25',
+                           intBlock_Size = 256, setStopwords = frozenset()):
+    lstDescriptions = list(lstDescriptions)
+    vocabulary, matPostings = build_postings_matrix(inverted_index, len(hierarchy_df))
+    matWeights, arrIdf = build_term_weights(matPostings, strScoring)
+
+    arrProposal_Codes, arrProposals = pd.factorize(hierarchy_df['Category_Nike_conc'])
+    arrProposals = np.append(np.asarray(arrProposals, dtype = object), NO_MATCH_FOUND)
+    arrProposal_Codes = np.where(arrProposal_Codes < 0, len(arrProposals) - 1, arrProposal_Codes)
+    intProposals = len(arrProposals)
+
+    dictUnique = {}
+    arrInverse = np.fromiter((dictUnique.setdefault(strDescription, len(dictUnique))
+                              for strDescription in lstDescriptions), dtype = np.int64, count = len(lstDescriptions))
+    lstUnique = list(dictUnique)
+
+    matQuery = build_query_matrix(lstUnique, vocabulary, setStopwords).astype(np.float64)
+    if strScoring == 'tfidf':
+        matQuery = matQuery @ sparse.diags(arrIdf)
+        arrNorms = np.sqrt(np.asarray(matQuery.multiply(matQuery).sum(axis = 1)).ravel())
+        arrNorms[arrNorms == 0] = 1.0
+        matQuery = (sparse.diags(1 / arrNorms) @ matQuery).tocsr()
+
+    arrTop_Codes = np.full((len(lstUnique), intTop_K), -1, dtype = np.int64)
+    arrTop_Scores = np.full((len(lstUnique), intTop_K), np.nan)
+
+    for intStart in range(0, len(lstUnique), intBlock_Size):
+        matScores = (matQuery[intStart:intStart + intBlock_Size] @ matWeights).tocoo()
+        if matScores.nnz == 0:
+            continue
+
+        #Best score per (description, proposal)
+        arrKeys = matScores.row.astype(np.int64) * intProposals + arrProposal_Codes[matScores.col]
+        arrOrder = np.lexsort((-matScores.data, arrKeys))
+        arrKeys = arrKeys[arrOrder]
+        arrScores = matScores.data[arrOrder]
+        arrFirst = np.flatnonzero(np.r_[True, arrKeys[1:] != arrKeys[:-1]])
+        arrKeys = arrKeys[arrFirst]
+        arrScores = arrScores[arrFirst]
+
+        #Rank the proposals of every description: score desc, then first seen proposal
+        arrRows = arrKeys // intProposals
+        arrCodes = arrKeys % intProposals
+        arrOrder = np.lexsort((arrCodes, -arrScores, arrRows))
+        arrRows = arrRows[arrOrder]
+        arrRow_Starts = np.flatnonzero(np.r_[True, arrRows[1:] != arrRows[:-1]])
+        arrRank = np.arange(len(arrRows)) - np.repeat(arrRow_Starts, np.diff(np.r_[arrRow_Starts, len(arrRows)]))
+        arrKeep = arrRank < intTop_K
+
+        arrTop_Codes[intStart + arrRows[arrKeep], arrRank[arrKeep]] = arrCodes[arrOrder][arrKeep]
+        arrTop_Scores[intStart + arrRows[arrKeep], arrRank[arrKeep]] = arrScores[arrOrder][arrKeep]
+
+    arrTop_Codes = arrTop_Codes[arrInverse]
+    arrTop_Scores = arrTop_Scores[arrInverse]
+
+    dictColumns = {}
+    for intRank in range(intTop_K):
+        arrCodes = arrTop_Codes[:, intRank]
+        arrRank_Proposals = np.where(arrCodes >= 0, arrProposals[arrCodes], None)
+        if intRank == 0:
+            arrRank_Proposals[arrCodes < 0] = NO_MATCH_FOUND
+        dictColumns[f'proposal_{intRank + 1}'] = arrRank_Proposals
+        dictColumns[f'score_{intRank + 1}'] = np.round(arrTop_Scores[:, intRank], 4)
+
+    return pd.DataFrame(dictColumns)
+
+def find_top_matches(new_description, inverted_index, hierarchy_df, intTop_K = 5, strScoring = 'bm25',
+                     setStopwords = frozenset()):
+    dfTop = find_top_matches_batch([new_description], inverted_index, hierarchy_df, intTop_K, strScoring,
+                                   setStopwords = setStopwords)
+    return [(dfTop.at[0, f'proposal_{intRank}'], float(dfTop.at[0, f'score_{intRank}']))
+            for intRank in range(1, intTop_K + 1) if dfTop.at[0, f'proposal_{intRank}'] is not None]
+#End Top-k Scoring Functions
@@ -0,0 +1,210 @@
+import hashlib
+import json
+import os
+import shutil
+from collections.abc import Mapping
+
+import numpy as np
+from scipy import sparse
+
+from pipeline.hierarchy import TermVocabulary, create_inverted_index
+
+INDEX_FORMAT_VERSION = 1
+INDEX_ARRAYS = ['term_bytes', 'term_offsets', 'postings', 'postings_offsets']
+
+#Start Hash Functions
+def hash_file(strFile_Path, intChunk_Size = 1 << 20):
+    hashFile = hashlib.sha256()
+    with open(strFile_Path, 'rb') as fileSource:
+        for bytChunk in iter(lambda: fileSource.read(intChunk_Size), b''):
+            hashFile.update(bytChunk)
+
+    return hashFile.hexdigest()
+
+#Digest of the indexed column for the first intPrefix_Rows rows and for all of them,
+#   computed in one pass. The prefix digest tells if a stored index is still a
+#   prefix of the current history (only rows were appended).
+def hash_column_prefix(lstValues, intPrefix_Rows):
+    hashRows = hashlib.sha256()
+    strPrefix_Digest = None
+    for intRow, strValue in enumerate(lstValues):
+        if intRow == intPrefix_Rows:
+            strPrefix_Digest = hashRows.copy().hexdigest()
+        hashRows.update(strValue.encode('utf-8'))
+        hashRows.update(b'\x1f')
+
+    if intPrefix_Rows == len(lstValues):
+        strPrefix_Digest = hashRows.copy().hexdigest()
+
+    return strPrefix_Digest, hashRows.hexdigest()
+#End Hash Functions
+
+#Start Persisted Index
+#Read-only inverted index backed by memory mapped arrays:
+#   term_bytes/term_offsets -> utf-8 terms in id order, the term vocabulary
+#   postings/postings_offsets -> row indices of every term, stored in the same
+#   order as the set built by create_inverted_index so ties resolve the same way.
+#   Term ids are kept when rows are appended (new terms get the next ids).
+class PersistedInvertedIndex(Mapping):
+    def __init__(self, strIndex_Path, dictMeta, dictArrays):
+        self.strIndex_Path = strIndex_Path
+        self.dictMeta = dictMeta
+        self.arrTerm_Bytes = dictArrays['term_bytes']
+        self.arrTerm_Offsets = dictArrays['term_offsets']
+        self.arrPostings = dictArrays['postings']
+        self.arrPostings_Offsets = dictArrays['postings_offsets']
+        self._vocabulary = None
+
+    @property
+    def vocabulary(self):
+        if self._vocabulary is None:
+            bytTerms = self.arrTerm_Bytes.tobytes()
+            arrOffsets = self.arrTerm_Offsets.tolist()
+            self._vocabulary = TermVocabulary(bytTerms[arrOffsets[i]:arrOffsets[i + 1]].decode('utf-8')
+                                              for i in range(len(arrOffsets) - 1))
+        return self._vocabulary
+
+    def __getitem__(self, strWord):
+        intTerm = self.vocabulary.dictIds[strWord]
+        return self.arrPostings[self.arrPostings_Offsets[intTerm]:self.arrPostings_Offsets[intTerm + 1]]
+
+    def __contains__(self, strWord):
+        return strWord in self.vocabulary
+
+    def __iter__(self):
+        return iter(self.vocabulary.lstTerms)
+
+    def __len__(self):
+        return len(self.arrTerm_Offsets) - 1
+
+    def document_frequencies(self):
+        return dict(zip(self.vocabulary.lstTerms, np.diff(self.arrPostings_Offsets).tolist()))
+
+    def postings_matrix(self, intHierarchy_Rows):
+        matPostings = sparse.csr_matrix((np.ones(len(self.arrPostings), dtype = np.int32),
+                                         self.arrPostings, self.arrPostings_Offsets),
+                                        shape = (len(self), intHierarchy_Rows))
+        return self.vocabulary, matPostings
+
+def set_order(lstIndices):
+    setIndices = set()
+    for idx in sorted(lstIndices):
+        setIndices.add(idx)
+    return list(setIndices)
+
+def write_index(strIndex_Path, lstTerms, lstPostings, dictMeta):
+    strTmp_Path = strIndex_Path + '.tmp'
+    shutil.rmtree(strTmp_Path, ignore_errors = True)
+    os.makedirs(strTmp_Path)
+
+    lstTerm_Bytes = [strTerm.encode('utf-8') for strTerm in lstTerms]
+    arrTerm_Offsets = np.zeros(len(lstTerms) + 1, dtype = np.int64)
+    np.cumsum([len(bytTerm) for bytTerm in lstTerm_Bytes], out = arrTerm_Offsets[1:])
+    arrPostings_Offsets = np.zeros(len(lstPostings) + 1, dtype = np.int64)
+    np.cumsum([len(lstTerm_Postings) for lstTerm_Postings in lstPostings], out = arrPostings_Offsets[1:])
+
+    dictArrays = {
+        'term_bytes': np.frombuffer(b''.join(lstTerm_Bytes), dtype = np.uint8),
+        'term_offsets': arrTerm_Offsets,
+        'postings': (np.concatenate([np.asarray(lstTerm_Postings, dtype = np.int32) for lstTerm_Postings in lstPostings])
+                     if lstPostings else np.empty(0, dtype = np.int32)),
+        'postings_offsets': arrPostings_Offsets,
+    }
+    for strArray_Name, arrValues in dictArrays.items():
+        np.save(os.path.join(strTmp_Path, strArray_Name + '.npy'), arrValues)
+
+    with open(os.path.join(strTmp_Path, 'meta.json'), 'w', encoding = 'utf-8') as fileMeta:
+        json.dump(dictMeta, fileMeta)
+
+    shutil.rmtree(strIndex_Path, ignore_errors = True)
+    os.replace(strTmp_Path, strIndex_Path)
+
+def read_index(strIndex_Path):
+    strMeta_Path = os.path.join(strIndex_Path, 'meta.json')
+    if not os.path.exists(strMeta_Path):
+        return None
+
+    with open(strMeta_Path, encoding = 'utf-8') as fileMeta:
+        dictMeta = json.load(fileMeta)
+    if dictMeta.get('version') != INDEX_FORMAT_VERSION:
+        return None
+
+    dictArrays = {strArray_Name: np.load(os.path.join(strIndex_Path, strArray_Name + '.npy'), mmap_mode = 'r')
+                  for strArray_Name in INDEX_ARRAYS}
+
+    return PersistedInvertedIndex(strIndex_Path, dictMeta, dictArrays)
+
+#Add rows intFirst_Row.. of lstValues to a stored index, keeping every postings
+#   list in create_inverted_index set order and the ids of the stored terms.
+def apply_index_delta(indexStored, lstValues, lstRow_Labels, intFirst_Row):
+    dictNew_Postings = {}
+    for idx, strValue in zip(lstRow_Labels[intFirst_Row:], lstValues[intFirst_Row:]):
+        for word in set(strValue.lower().split()):
+            dictNew_Postings.setdefault(word, []).append(idx)
+
+    lstTerms = list(indexStored)
+    lstPostings = []
+    for strTerm in lstTerms:
+        arrTerm_Postings = indexStored[strTerm]
+        if strTerm in dictNew_Postings:
+            lstPostings.append(set_order(arrTerm_Postings.tolist() + dictNew_Postings.pop(strTerm)))
+        else:
+            lstPostings.append(arrTerm_Postings)
+
+    for strTerm, lstTerm_Postings in dictNew_Postings.items():
+        lstTerms.append(strTerm)
+        lstPostings.append(set_order(lstTerm_Postings))
+
+    return lstTerms, lstPostings
+#End Persisted Index
+
+#Loads the index of strSource_Path from strIndex_Dir, keyed by the file content hash.
+#   - same file: memory maps the stored arrays, nothing is tokenized.
+#   - file with appended rows: tokenizes only the new rows over the latest index.
+#   - anything else: full create_inverted_index build.
+def load_or_build_inverted_index(strSource_Path, df, column, strIndex_Dir):
+    os.makedirs(strIndex_Dir, exist_ok = True)
+    strSource_Hash = hash_file(strSource_Path)
+    strIndex_Path = os.path.join(strIndex_Dir, strSource_Hash)
+    strLatest_Path = os.path.join(strIndex_Dir, 'LATEST')
+
+    lstValues = df[column].tolist()
+    lstRow_Labels = df.index.tolist()
+
+    indexStored = read_index(strIndex_Path)
+    if indexStored is None and os.path.exists(strLatest_Path):
+        with open(strLatest_Path, encoding = 'utf-8') as fileLatest:
+            indexStored = read_index(os.path.join(strIndex_Dir, fileLatest.read().strip()))
+
+    intStored_Rows = 0
+    if indexStored is not None and indexStored.dictMeta['column'] == column:
+        intStored_Rows = min(indexStored.dictMeta['rows'], len(lstValues))
+    strPrefix_Digest, strRows_Digest = hash_column_prefix(lstValues, intStored_Rows)
+
+    if (indexStored is not None and indexStored.strIndex_Path == strIndex_Path and
+            indexStored.dictMeta['rows_digest'] == strRows_Digest):
+        print(f"Inverted index loaded from {strIndex_Path} ({len(indexStored)} terms)")
+        return indexStored
+
+    dictMeta = {'version': INDEX_FORMAT_VERSION, 'source_hash': strSource_Hash, 'column': column,
+                'rows': len(lstValues), 'rows_digest': strRows_Digest}
+
+    if indexStored is not None and indexStored.dictMeta['rows_digest'] == strPrefix_Digest:
+        print(f"Inverted index delta: {len(lstValues) - intStored_Rows} new rows over {intStored_Rows}")
+        lstTerms, lstPostings = apply_index_delta(indexStored, lstValues, lstRow_Labels, intStored_Rows)
+    else:
+        print(f"Inverted index full build: {len(lstValues)} rows")
+        inverted_index = create_inverted_index(df, column)
+        lstTerms = list(inverted_index)
+        lstPostings = [list(setPostings) for setPostings in inverted_index.values()]
+
+    strPrevious_Path = indexStored.strIndex_Path if indexStored is not None else None
+    indexStored = None
+
+    write_index(strIndex_Path, lstTerms, lstPostings, dictMeta)
+    with open(strLatest_Path, 'w', encoding = 'utf-8') as fileLatest:
+        fileLatest.write(strSource_Hash)
+    if strPrevious_Path is not None and strPrevious_Path != strIndex_Path:
+        shutil.rmtree(strPrevious_Path, ignore_errors = True)
+
+    return read_index(strIndex_Path)
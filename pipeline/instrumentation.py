@@ -0,0 +1,238 @@
+import json
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+#resource only exists on Unix; on Windows the peak comes from psutil when it is
+#   installed, otherwise it is not measured (None)
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+RUN_REPORT_VERSION = 1
+PROGRESS_INTERVAL_SECONDS = 5.0
+
+#Start Memory
+#Peak resident memory (VmHWM) of this process in MB. reset_peak_rss brings it back
+#   to the current RSS (Linux clear_refs); where that is not possible the peak is
+#   the one of the whole process. None where the platform does not give it.
+def read_proc_status(strField):
+    try:
+        with open('/proc/self/status', encoding = 'utf-8') as fileStatus:
+            for strLine in fileStatus:
+                if strLine.startswith(strField + ':'):
+                    return int(strLine.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def peak_rss_mb():
+    fltPeak = read_proc_status('VmHWM')
+    if fltPeak is None and resource is not None:
+        intMax_RSS = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        fltPeak = intMax_RSS / (1024 * 1024) if sys.platform == 'darwin' else intMax_RSS / 1024
+    if fltPeak is None and psutil is not None:
+        infoMemory = psutil.Process().memory_info()
+        fltPeak = getattr(infoMemory, 'peak_wset', infoMemory.rss) / (1024 * 1024)
+    return fltPeak
+
+def current_rss_mb():
+    fltRSS = read_proc_status('VmRSS')
+    if fltRSS is None and psutil is not None:
+        fltRSS = psutil.Process().memory_info().rss / (1024 * 1024)
+    return fltRSS
+
+def round_mb(fltMB):
+    return round(fltMB, 1) if fltMB is not None else None
+
+def reset_peak_rss():
+    try:
+        with open('/proc/self/clear_refs', 'w') as fileClear_Refs:
+            fileClear_Refs.write('5')
+        return True
+    except OSError:
+        return False
+
+#CPU seconds of this process plus its finished workers (process pools)
+def cpu_seconds():
+    timesProcess = os.times()
+    return timesProcess.user + timesProcess.system + timesProcess.children_user + timesProcess.children_system
+#End Memory
+
+#Start Progress
+def format_seconds(fltSeconds):
+    intSeconds = int(round(fltSeconds))
+    return f"{intSeconds // 3600:d}:{intSeconds // 60 % 60:02d}:{intSeconds % 60:02d}"
+
+#Rate limited progress line: at most one print every fltInterval seconds (plus
+#   the first and the last one) with the done count, throughput and ETA.
+#
+#   progress = ProgressReporter(len(store_ids), 'stores')
+#   for store_id in store_ids:
+#       ...
+#       progress.update()
+class ProgressReporter:
+    def __init__(self, intTotal, strLabel = 'rows', fltInterval = PROGRESS_INTERVAL_SECONDS):
+        self.intTotal = intTotal
+        self.strLabel = strLabel
+        self.fltInterval = fltInterval
+        self.intDone = 0
+        self.fltStart = time.perf_counter()
+        self._fltLast_Print = None
+
+    def update(self, intSteps = 1):
+        self.intDone += intSteps
+        fltNow = time.perf_counter()
+        if (self._fltLast_Print is None or fltNow - self._fltLast_Print >= self.fltInterval or
+                self.intDone >= self.intTotal):
+            self._fltLast_Print = fltNow
+            print(self.status(fltNow))
+
+    def status(self, fltNow = None):
+        fltElapsed = (fltNow or time.perf_counter()) - self.fltStart
+        fltRate = self.intDone / fltElapsed if fltElapsed > 0 else 0.0
+        strStatus = f"{self.strLabel}: {self.intDone:,}/{self.intTotal:,}"
+        if self.intTotal:
+            strStatus += f" ({self.intDone / self.intTotal:.1%})"
+        strStatus += f" - {fltRate:,.1f}/s - elapsed {format_seconds(fltElapsed)}"
+        if 0 < self.intDone < self.intTotal and fltRate > 0:
+            strStatus += f" - ETA {format_seconds((self.intTotal - self.intDone) / fltRate)}"
+        return strStatus
+
+#Iterates lstItems reporting progress after every item
+def iter_progress(lstItems, strLabel = 'rows', fltInterval = PROGRESS_INTERVAL_SECONDS):
+    progress = ProgressReporter(len(lstItems), strLabel, fltInterval)
+    for objItem in lstItems:
+        yield objItem
+        progress.update()
+#End Progress
+
+#Start Run Report
+#Measures of one stage: wall and CPU seconds, rows in and out, rows dropped per
+#   reason, peak RSS and any extra counts. Stages are opened and closed with
+#   start/end (they may span several notebook cells) or used as a context manager.
+#   Stages do not nest: each one resets the peak RSS when it starts.
+class StageRecord:
+    def __init__(self, strStage, intRows_In = None):
+        self.strStage = strStage
+        self.intRows_In = intRows_In
+        self.intRows_Out = None
+        self.dictDropped = {}
+        self.dictCounts = {}
+        self.boolPeak_Reset = reset_peak_rss()
+        self.fltStart = time.perf_counter()
+        self.fltCPU_Start = cpu_seconds()
+        self.dictResult = None
+
+    def drop(self, strReason, intRows):
+        self.dictDropped[strReason] = self.dictDropped.get(strReason, 0) + int(intRows)
+
+    def drop_counts(self, dictDropped):
+        for strReason, intRows in dictDropped.items():
+            self.drop(strReason, intRows)
+
+    def count(self, strName, intValue):
+        self.dictCounts[strName] = int(intValue)
+
+    def end(self, intRows_Out = None):
+        if intRows_Out is not None:
+            self.intRows_Out = int(intRows_Out)
+        fltSeconds = time.perf_counter() - self.fltStart
+
+        self.dictResult = {'stage': self.strStage,
+                           'rows_in': self.intRows_In,
+                           'rows_out': self.intRows_Out,
+                           'dropped': dict(self.dictDropped),
+                           'counts': dict(self.dictCounts),
+                           'seconds': round(fltSeconds, 4),
+                           'cpu_seconds': round(cpu_seconds() - self.fltCPU_Start, 4),
+                           'rows_per_second': (round(self.intRows_In / fltSeconds, 1)
+                                               if self.intRows_In and fltSeconds > 0 else None),
+                           'peak_rss_mb': round_mb(peak_rss_mb()),
+                           'peak_rss_reset': self.boolPeak_Reset}
+        return self.dictResult
+
+#Stages of one pipeline run in the order they ran, saved as a JSON report.
+#
+#   report = RunReport('nike_mx')
+#   with report.stage('clean', len(df)) as stage:
+#       df, dictDropped = clean_competitors_df(df)
+#       stage.drop_counts(dictDropped)
+#       stage.intRows_Out = len(df)
+#   report.save(strPath + 'run_reports/nike_mx.json')
+class RunReport:
+    def __init__(self, strRun_Name, dictContext = None):
+        self.strRun_Name = strRun_Name
+        self.dictContext = dict(dictContext or {})
+        self.strStarted = datetime.now().isoformat(timespec = 'seconds')
+        self.fltStart = time.perf_counter()
+        self.lstStages = []
+        self.dictOpen = {}
+
+    def start(self, strStage, intRows_In = None):
+        self.dictOpen[strStage] = StageRecord(strStage, None if intRows_In is None else int(intRows_In))
+        return self.dictOpen[strStage]
+
+    def end(self, strStage, intRows_Out = None, dictDropped = None, **dictCounts):
+        stageRecord = self.dictOpen.pop(strStage)
+        stageRecord.drop_counts(dictDropped or {})
+        for strName, intValue in dictCounts.items():
+            stageRecord.count(strName, intValue)
+
+        return self.add_stage(stageRecord.end(intRows_Out))
+
+    #Adds a finished stage (a StageRecord result, possibly measured in a worker)
+    def add_stage(self, dictResult):
+        self.lstStages.append(dictResult)
+        if dictResult.get('skipped'):
+            print(f"[{dictResult['stage']}] up to date, skipped")
+        else:
+            print(f"[{dictResult['stage']}] {dictResult['seconds']:.2f} s - rows {dictResult['rows_in']} -> {dictResult['rows_out']}"
+                  + (f" - dropped {dictResult['dropped']}" if dictResult['dropped'] else '')
+                  + (f" - peak {dictResult['peak_rss_mb']:.0f} MB" if dictResult['peak_rss_mb'] is not None else ''))
+        return dictResult
+
+    @contextmanager
+    def stage(self, strStage, intRows_In = None):
+        stageRecord = self.start(strStage, intRows_In)
+        try:
+            yield stageRecord
+        except BaseException:
+            self.dictOpen.pop(strStage, None)
+            raise
+        self.end(strStage)
+
+    def to_dict(self):
+        return {'version': RUN_REPORT_VERSION,
+                'run': self.strRun_Name,
+                'started': self.strStarted,
+                'seconds': round(time.perf_counter() - self.fltStart, 4),
+                'context': self.dictContext,
+                'python': platform.python_version(),
+                'pandas': pd.__version__,
+                'cpus': os.cpu_count(),
+                'stages': self.lstStages}
+
+    def summary(self):
+        return pd.DataFrame([{strKey: objValue for strKey, objValue in dictStage.items() if strKey != 'counts'}
+                             for dictStage in self.lstStages])
+
+    def save(self, strReport_Path):
+        os.makedirs(os.path.dirname(strReport_Path) or '.', exist_ok = True)
+        with open(strReport_Path + '.tmp', 'w', encoding = 'utf-8') as fileReport:
+            json.dump(self.to_dict(), fileReport, ensure_ascii = False, indent = 1, default = str)
+        os.replace(strReport_Path + '.tmp', strReport_Path)
+        print(f"Run report written to {strReport_Path}")
+
+#End Run Report
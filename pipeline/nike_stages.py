@@ -0,0 +1,266 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from pipeline.data_utils import clean_competitors_df, concat_text_columns, consolidate_competitors_df, normalize_upc_column
+from pipeline.delivery_state import assemble_delivery, carried_state_rows, load_delivery_state, merge_delivery_state
+from pipeline.delivery_state import processed_state_rows, row_fingerprints, save_delivery_state
+from pipeline.excel_loader import read_excel
+from pipeline.hierarchy import NO_MATCH_FOUND, find_best_match_batch, find_top_matches_batch, learn_stopwords
+from pipeline.index_store import load_or_build_inverted_index
+from pipeline.output_writer import write_output
+from pipeline.rules import apply_condition_rules, classify_keywords, SUBCATEGORIA_KEYWORDS, SUBCATEGORIA2_KEYWORDS
+from pipeline.stage_cache import stage_key
+from pipeline.tokenizer import TOKENIZER_VERSION, normalize_column
+
+#Stages of the Nike hierarchy assignment (nike_mx_hierarchyassignment_indiceinverso_versionfinal 1.py)
+#   for the headless runner. Every stage gets the run config, the frames of the
+#   stages it depends on and its StageRecord, and returns its frames by name.
+
+CLIENT_COLUMN_MAPPING = {'BUSINESS UNIT': 'Category', 'CATEGORY': 'Subcategory2', 'Style': 'SKU', 'MATERIAL': 'UPC',
+                         'DESCRIPTION': 'Item', 'GENDER': 'Subcategory', 'AGE': 'Stock', 'SILHOUETTE': 'Subcategory3',
+                         'PRECIO_CON_IVA': 'Price', 'DIMENSION': 'Modelo'}
+CLIENT_COLUMN_ORDER = ['Date', 'Canal', 'Category', 'Subcategory', 'Subcategory2', 'Subcategory3', 'Marca', 'Modelo',
+                       'SKU', 'UPC', 'Item', 'Item Characteristics', 'URL SKU', 'Image', 'Price', 'Sale Price',
+                       'Shipment Cost', 'Sales Flag', 'Store ID', 'Store Name', 'Store Address', 'Stock', 'UPC WM2',
+                       'Final Price', 'UPC WM', 'COMP']
+ITEM_CONC_COLUMNS = ['Item', 'Category', 'Subcategory', 'Subcategory2', 'Subcategory3']
+NIKE_HIERARCHY_COLUMNS = ['Categoria_Nike', 'Subcategoria_Nike', 'Subcategoria2_Nike', 'Subcatgory3_Nike',
+                          'Subcatgory4_Nike', 'Subcatgory5_Nike']
+PROPOSAL_COLUMNS = ['Item_conc', 'Canal', 'SKU', 'UPC', 'Item', 'URL SKU', 'Image', 'proposal_conc'] + NIKE_HIERARCHY_COLUMNS
+LAYOUT_COLUMN_ORDER = ['key', 'Canal', 'Category', 'Subcategory', 'Subcategory2', 'Subcategory3', 'Marca', 'Modelo',
+                       'SKU', 'UPC', 'Item', 'Item Characteristics', 'URL SKU', 'Image', 'Price'] + NIKE_HIERARCHY_COLUMNS
+CLIENT_LAYOUT_RENAME = {'Category': 'Categoria_Nike', 'Subcategory': 'Subcategoria_Nike', 'Subcategory2': 'Subcategoria2_Nike',
+                        'Subcategory3': 'Subcatgory3_Nike', 'Modelo': 'Subcatgory4_Nike', 'Stock': 'Subcatgory5_Nike'}
+CLIENT_LAYOUT_DROP = ['Sale Price', 'Shipment Cost', 'Sales Flag', 'Store ID', 'Store Name', 'Store Address', 'UPC WM2',
+                      'Final Price', 'UPC WM', 'COMP', 'Date']
+USA_STORE_ID = '9999_adidas_us'
+
+#Start Paths
+def competitor_files(dictConfig):
+    return sorted(glob.glob(os.path.join(dictConfig['base_path'], 'carga_competitors', '*.csv')))
+
+def client_file(dictConfig):
+    return os.path.join(dictConfig['base_path'], 'carga_client', dictConfig['client_file'])
+
+def match_file(dictConfig):
+    return os.path.join(dictConfig['base_path'], 'product_match.xlsx')
+
+def condiciones_file(dictConfig):
+    return os.path.join(dictConfig['base_path'], 'condiciones_automatizadas', 'condiciones.csv')
+
+def output_path(dictConfig, strFolder, strFile_Name):
+    return os.path.join(dictConfig['base_path'], strFolder, strFile_Name)
+
+#Writes the deliverables of an export stage and lists them in its 'outputs' frame
+def export_frames(lstOutputs):
+    for df, strPath in lstOutputs:
+        os.makedirs(os.path.dirname(strPath), exist_ok = True)
+        write_output(df, strPath, 'csv')
+    return {'outputs': pd.DataFrame({'path': [strPath for _, strPath in lstOutputs],
+                                     'rows': [len(df) for df, _ in lstOutputs]})}
+#End Paths
+
+#Start Competitor Stages
+def competitors_ingest(dictConfig, dictFrames, stageRecord):
+    dfCompetitors = consolidate_competitors_df(os.path.join(dictConfig['base_path'], 'carga_competitors'),
+                                               intWorkers = dictConfig['workers'])
+    return {'competitors_raw': dfCompetitors}
+
+#Clean stage, delivery date, UPC WM / UPC WM2 and the adidas US stores apart
+def competitors_clean(dictConfig, dictFrames, stageRecord):
+    dfCompetitors, dictDropped = clean_competitors_df(dictFrames['competitors_raw'])
+    stageRecord.drop_counts(dictDropped)
+
+    dfCompetitors['Date'] = dictConfig['delivery_date']
+    dfCompetitors['UPC WM2'], srUPC_Invalid = normalize_upc_column(dfCompetitors['UPC'], boolDrop_Check_Digit = False)
+    dfCompetitors['UPC WM'] = dfCompetitors['UPC WM2']
+    stageRecord.count('upc_invalid', srUPC_Invalid.sum())
+
+    srUSA = dfCompetitors['Store ID'].astype(str).str.contains(USA_STORE_ID, regex = False)
+    return {'competitors': dfCompetitors[~srUSA], 'competitors_usa': dfCompetitors[srUSA]}
+
+def export_competitors(dictConfig, dictFrames, stageRecord):
+    strClient, strDelivery_Date = dictConfig['client_name'], dictConfig['delivery_date']
+    return export_frames([(dictFrames['competitors'],
+                           output_path(dictConfig, 'competitors_csv', f'{strClient}_competitors_{strDelivery_Date}.csv')),
+                          (dictFrames['competitors_usa'],
+                           output_path(dictConfig, 'competitors_csv', f'{strClient}_usa_{strDelivery_Date}.csv'))])
+#End Competitor Stages
+
+#Start Client Stages
+#Client template in the competitors layout
+def client(dictConfig, dictFrames, stageRecord):
+    dfClient = read_excel(client_file(dictConfig)).rename(columns = CLIENT_COLUMN_MAPPING)
+
+    dfClient['Date'] = dictConfig['delivery_date']
+    dfClient['Canal'] = 'Nike Mx'
+    dfClient['Marca'] = 'Nike'
+    dfClient['Store ID'] = '9999_nikemx'
+    dfClient['Store Name'] = 'ONLINE'
+    dfClient['Store Address'] = 'ONLINE'
+    dfClient['COMP'] = ''
+    dfClient['UPC WM'], _ = normalize_upc_column(dfClient['UPC'], boolDrop_Check_Digit = False)
+    dfClient['UPC WM2'] = dfClient['UPC WM']
+    dfClient['Sale Price'] = ''
+    dfClient['Final Price'] = dfClient['Price']
+
+    for strColumn in CLIENT_COLUMN_ORDER:
+        if strColumn not in dfClient.columns:
+            dfClient[strColumn] = ''
+    return {'client': dfClient[CLIENT_COLUMN_ORDER]}
+
+def export_client(dictConfig, dictFrames, stageRecord):
+    strFile_Name = f"{dictConfig['client_name']}_nikedata_{dictConfig['delivery_date']}.csv"
+    return export_frames([(dictFrames['client'], output_path(dictConfig, 'competitors_csv', strFile_Name))])
+
+#key = UPC + Canal for the client rows, SKU + Canal for the rest
+def layout_keys(df):
+    return np.where(df['Canal'] == "Nike Mx", df['UPC'] + df['Canal'], df['SKU'] + df['Canal'])
+
+def export_client_layout(dictConfig, dictFrames, stageRecord):
+    dfLayout = dictFrames['client'].rename(columns = CLIENT_LAYOUT_RENAME).drop(columns = CLIENT_LAYOUT_DROP)
+    for strColumn in LAYOUT_COLUMN_ORDER:
+        if strColumn not in dfLayout.columns:
+            dfLayout[strColumn] = None
+    dfLayout = dfLayout[LAYOUT_COLUMN_ORDER]
+    dfLayout['SKU'] = dfLayout['SKU'].astype(str)
+    dfLayout['key'] = layout_keys(dfLayout)
+
+    strFile_Name = f"{dictConfig['client_name']}_clientLayout_{dictConfig['run_date']}.csv"
+    return export_frames([(dfLayout, output_path(dictConfig, 'match_proposal', strFile_Name))])
+#End Client Stages
+
+#Start Matching Stages
+def join_hierarchy_columns(df):
+    srConc = df[NIKE_HIERARCHY_COLUMNS[0]].astype(str)
+    for strColumn in NIKE_HIERARCHY_COLUMNS[1:]:
+        srConc = srConc + "-" + df[strColumn].astype(str)
+    return srConc
+
+#product_match with item_conc / item_tokens and its Category_Nike_conc, without the client rows
+def match_history(dictConfig, dictFrames, stageRecord):
+    dfMatch = read_excel(match_file(dictConfig))
+    stageRecord.intRows_In = len(dfMatch)
+    for strColumn in ITEM_CONC_COLUMNS:
+        dfMatch[strColumn] = dfMatch[strColumn].fillna('')
+    dfMatch['item_conc'] = concat_text_columns(dfMatch, ITEM_CONC_COLUMNS, " ")
+
+    dfMatch['item_tokens'] = normalize_column(dfMatch['item_conc'])
+
+    dfMatch = dfMatch[~dfMatch['Canal'].str.contains('Nike Mx')]
+    dfMatch['Category_Nike_conc'] = join_hierarchy_columns(dfMatch)
+    stageRecord.drop('client_rows', stageRecord.intRows_In - len(dfMatch))
+    return {'match_history': dfMatch}
+
+def delivery_context(dictConfig):
+    return stage_key(dictConfig['cache_dir'], 'delivery', [match_file(dictConfig), condiciones_file(dictConfig)],
+                     {'top_k': 5, 'scoring': 'bm25', 'max_df_ratio': dictConfig['max_df_ratio'], 'tokenizer': TOKENIZER_VERSION})
+
+def read_condiciones(dictConfig):
+    condiciones_df = pd.read_csv(condiciones_file(dictConfig), encoding = 'utf-8-sig', sep = ";")
+    condiciones_df = condiciones_df.dropna(subset = "Word")
+    condiciones_df['Word'] = condiciones_df['Word'].str.replace('\\', '+', regex = False)
+    return condiciones_df
+
+#Competitor rows not in product_match (new or changed since the last delivery when
+#   incremental) -> best hierarchy, top 5 BM25 proposals, keyword classifiers and
+#   condiciones.csv rules, then the full delivery from the delivery state.
+def proposals(dictConfig, dictFrames, stageRecord):
+    dfMatch = dictFrames['match_history']
+    dfCompetitors = dictFrames['competitors'].copy()
+    stageRecord.intRows_In = len(dfCompetitors)
+
+    dfCompetitors['key'] = concat_text_columns(dfCompetitors, ['SKU', 'Canal'], "")
+    merged_df = dfCompetitors.merge(dfMatch[['key']], on = 'key', how = 'left', indicator = True)
+    new_products_df = merged_df[merged_df['_merge'] == 'left_only'].drop(columns = ['_merge'])
+    stageRecord.drop('already_matched', len(merged_df) - len(new_products_df))
+
+    strDelivery_Dir = os.path.join(dictConfig['base_path'], 'delivery_state')
+    strDelivery_Context = delivery_context(dictConfig)
+    arrDelivery_Fingerprints = row_fingerprints(new_products_df)
+    dfDelivery_State = load_delivery_state(strDelivery_Dir, strDelivery_Context) if dictConfig['incremental'] else None
+    arrState_Rows = carried_state_rows(new_products_df['key'].to_numpy(), arrDelivery_Fingerprints, dfDelivery_State)
+    new_products_df = new_products_df[arrState_Rows < 0].copy()
+    stageRecord.count('carried_forward', (arrState_Rows >= 0).sum())
+
+    new_products_df['Item'] = new_products_df['Item'].fillna('')
+    new_products_df['item_conc'] = concat_text_columns(new_products_df, ITEM_CONC_COLUMNS, " ")
+    new_products_df['item_tokens'] = normalize_column(new_products_df['item_conc'])
+
+    products_hierarchy_df = dfMatch.dropna(subset = ['Category'])
+    products_hierarchy_df = products_hierarchy_df[products_hierarchy_df['Category'].str.strip() != ''].reset_index(drop = True)
+
+    inverted_index = load_or_build_inverted_index(match_file(dictConfig), products_hierarchy_df, 'item_tokens',
+                                                  os.path.join(dictConfig['base_path'], 'index_cache'))
+    lstDescriptions = new_products_df['item_tokens'].tolist()
+    lstProposals = find_best_match_batch(lstDescriptions, inverted_index, products_hierarchy_df)
+    stageRecord.count('no_match', lstProposals.count(NO_MATCH_FOUND))
+
+    lstRows = [list(new_product) + [proposal] + proposal.split("-")
+               for new_product, proposal in zip(new_products_df[['item_conc', 'Canal', 'SKU', 'UPC', 'Item', 'URL SKU', 'Image']]
+                                                .itertuples(index = False, name = None), lstProposals)]
+    proposals_df = pd.DataFrame(lstRows, columns = PROPOSAL_COLUMNS)
+
+    setStopwords = learn_stopwords(inverted_index, len(products_hierarchy_df), fltMax_Df_Ratio = dictConfig['max_df_ratio'])
+    dfTop_Proposals = find_top_matches_batch(lstDescriptions, inverted_index, products_hierarchy_df,
+                                             intTop_K = 5, strScoring = 'bm25', setStopwords = setStopwords)
+    dfTop_Proposals.insert(0, 'key', new_products_df['key'].to_numpy())
+    dfTop_Proposals.insert(1, 'Item', new_products_df['Item'].to_numpy())
+
+    proposals_df['Subcategoria_Nike'] = classify_keywords(proposals_df['Item_conc'], proposals_df['Subcategoria_Nike'], SUBCATEGORIA_KEYWORDS)
+    proposals_df['Subcategoria2_Nike'] = classify_keywords(proposals_df['Item_conc'], proposals_df['Subcategoria2_Nike'], SUBCATEGORIA2_KEYWORDS)
+    kids_mask = proposals_df['Subcategoria2_Nike'].str.contains('KIDS', case = False)
+    proposals_df.loc[kids_mask, 'Subcategoria_Nike'] = 'KIDS'
+
+    proposals_df['concatenated_adjusted'] = join_hierarchy_columns(proposals_df)
+    proposals_df = proposals_df[PROPOSAL_COLUMNS[:8] + ['concatenated_adjusted'] + NIKE_HIERARCHY_COLUMNS]
+
+    intProposals = len(proposals_df)
+    proposals_df = apply_condition_rules(proposals_df, read_condiciones(dictConfig))
+    stageRecord.drop('rule_deleted', intProposals - len(proposals_df))
+
+    dfProcessed_State = processed_state_rows(new_products_df['key'].to_numpy(), arrDelivery_Fingerprints[arrState_Rows < 0],
+                                             proposals_df, dfTop_Proposals)
+    save_delivery_state(strDelivery_Dir, strDelivery_Context, merge_delivery_state(dfDelivery_State, dfProcessed_State))
+    proposals_df, dfTop_Proposals = assemble_delivery(arrState_Rows, dfDelivery_State, dfProcessed_State)
+
+    stageRecord.intRows_Out = len(proposals_df)
+    return {'proposals': proposals_df, 'top_proposals': dfTop_Proposals}
+
+def export_proposals(dictConfig, dictFrames, stageRecord):
+    matchlayout_df = dictFrames['proposals'].drop(columns = ['proposal_conc', 'concatenated_adjusted', 'Item_conc'])
+    for strColumn in LAYOUT_COLUMN_ORDER:
+        if strColumn not in matchlayout_df.columns:
+            matchlayout_df[strColumn] = None
+    matchlayout_df = matchlayout_df[LAYOUT_COLUMN_ORDER]
+    matchlayout_df['key'] = layout_keys(matchlayout_df)
+
+    strClient, strRun_Date = dictConfig['client_name'], dictConfig['run_date']
+    return export_frames([(matchlayout_df, output_path(dictConfig, 'match_proposal', f'{strClient}_matchProposal_{strRun_Date}.csv')),
+                          (dictFrames['top_proposals'],
+                           output_path(dictConfig, 'match_proposal', f'{strClient}_matchTopProposals_{strRun_Date}.csv'))])
+#End Matching Stages
+
+#Stage graph: name -> function, stages it reads from, input files and the config
+#   keys its result depends on. Stages without a path between them run in parallel.
+NIKE_STAGES = {
+    'competitors_ingest': {'run': competitors_ingest, 'deps': [], 'inputs': competitor_files, 'params': []},
+    'competitors_clean': {'run': competitors_clean, 'deps': ['competitors_ingest'], 'inputs': None,
+                          'params': ['delivery_date']},
+    'export_competitors': {'run': export_competitors, 'deps': ['competitors_clean'], 'inputs': None,
+                           'params': ['client_name', 'delivery_date']},
+    'client': {'run': client, 'deps': [], 'inputs': lambda dictConfig: [client_file(dictConfig)],
+               'params': ['delivery_date']},
+    'export_client': {'run': export_client, 'deps': ['client'], 'inputs': None, 'params': ['client_name', 'delivery_date']},
+    'export_client_layout': {'run': export_client_layout, 'deps': ['client'], 'inputs': None,
+                             'params': ['client_name', 'run_date']},
+    'match_history': {'run': match_history, 'deps': [], 'inputs': lambda dictConfig: [match_file(dictConfig)], 'params': []},
+    'proposals': {'run': proposals, 'deps': ['competitors_clean', 'match_history'],
+                  'inputs': lambda dictConfig: [match_file(dictConfig), condiciones_file(dictConfig)],
+                  'params': ['incremental', 'max_df_ratio']},
+    'export_proposals': {'run': export_proposals, 'deps': ['proposals'], 'inputs': None,
+                         'params': ['client_name', 'run_date']},
+}
@@ -0,0 +1,97 @@
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+OUTPUT_FORMATS = ['csv', 'parquet']
+OUTPUT_CHUNK_ROWS = 100000
+
+#Columns Arrow can not type (mixed numbers and text, as read_excel returns them)
+#   are stored as text, keeping the missing values.
+def to_arrow_table(df):
+    dictMixed = {}
+    for strColumn in df.columns[df.dtypes == object]:
+        try:
+            pa.array(df[strColumn], from_pandas = True)
+        except (pa.ArrowTypeError, pa.ArrowInvalid):
+            dictMixed[strColumn] = df[strColumn].where(df[strColumn].isna(), df[strColumn].astype(str))
+
+    if dictMixed:
+        df = df.assign(**dictMixed)
+
+    return pa.Table.from_pandas(df, preserve_index = not isinstance(df.index, pd.RangeIndex))
+
+#Start Chunked Writer
+#Writes a deliverable chunk by chunk (a store, a batch) into strPath + '.tmp' and
+#   renames it to strPath only when closed without errors, so the output folder
+#   never holds a half-written file. csv keeps the utf-8-sig deliverable format,
+#   parquet takes the schema of the first chunk.
+#
+#   with ChunkedWriter(strPath) as writer:
+#       writer.write(dfChunk)
+class ChunkedWriter:
+    def __init__(self, strPath, strFormat = None):
+        self.strPath = strPath
+        self.strTmp_Path = strPath + '.tmp'
+        self.strFormat = strFormat or os.path.splitext(strPath)[1].lstrip('.').lower()
+        if self.strFormat not in OUTPUT_FORMATS:
+            raise ValueError(f'Output format must be one of {OUTPUT_FORMATS}, got {self.strFormat!r}.')
+
+        self.intRows = 0
+        self._fileOutput = None
+        self._pqWriter = None
+        self._schema = None
+
+    def write(self, df):
+        if self.strFormat == 'csv':
+            if self._fileOutput is None:
+                self._fileOutput = open(self.strTmp_Path, 'w', encoding = 'utf-8-sig', newline = '')
+                df.to_csv(self._fileOutput, index = False)
+            else:
+                df.to_csv(self._fileOutput, index = False, header = False)
+        else:
+            tblChunk = to_arrow_table(df.reset_index(drop = True))
+            if self._pqWriter is None:
+                #Columns empty in the first chunk are typed as text
+                self._schema = pa.schema([pa.field(field.name, pa.string()) if pa.types.is_null(field.type) else field
+                                          for field in tblChunk.schema])
+                self._pqWriter = pq.ParquetWriter(self.strTmp_Path, self._schema, compression = 'zstd')
+            self._pqWriter.write_table(tblChunk.cast(self._schema))
+
+        self.intRows += len(df)
+
+    def close(self):
+        if self._fileOutput is not None:
+            self._fileOutput.close()
+        if self._pqWriter is not None:
+            self._pqWriter.close()
+        if not os.path.exists(self.strTmp_Path):
+            raise ValueError(f'Nothing was written to {self.strPath}.')
+
+        os.replace(self.strTmp_Path, self.strPath)
+
+    def abort(self):
+        if self._fileOutput is not None:
+            self._fileOutput.close()
+        if self._pqWriter is not None:
+            self._pqWriter.close()
+        if os.path.exists(self.strTmp_Path):
+            os.remove(self.strTmp_Path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, excTraceback):
+        if excType is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+#End Chunked Writer
+
+#Writes a whole frame through ChunkedWriter, intChunk_Rows rows at a time.
+def write_output(df, strPath, strFormat = None, intChunk_Rows = OUTPUT_CHUNK_ROWS):
+    with ChunkedWriter(strPath, strFormat) as writer:
+        for intStart in range(0, max(len(df), 1), intChunk_Rows):
+            writer.write(df.iloc[intStart:intStart + intChunk_Rows])
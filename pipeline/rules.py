@@ -0,0 +1,170 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+RULE_KEY_COLUMNS = ['Column', 'Word', 'ELIMINAR']
+REGEX_CHARACTERS = set('.^$*+?{}[]\\|()')
+
+#Start Term Matching
+def is_literal_term(strTerm):
+    return strTerm != '' and not (set(strTerm) & REGEX_CHARACTERS)
+
+#Which terms (case-insensitive str.contains) appear in each value. Values are
+#   matched once per distinct value; literal terms go through one Aho-Corasick
+#   automaton per column when pyahocorasick is installed, the rest as regex.
+def match_terms(arrValues, lstTerms):
+    arrCodes, arrUniques = pd.factorize(pd.Series(arrValues, dtype = object))
+    arrUnique_Hits = np.zeros((len(arrUniques) + 1, len(lstTerms)), dtype = bool) #last row: missing values
+
+    srUniques = pd.Series(arrUniques, dtype = object)
+    lstRegex_Terms = list(range(len(lstTerms)))
+
+    if ahocorasick is not None:
+        dictLiteral_Terms = {}
+        for intTerm, strTerm in enumerate(lstTerms):
+            if is_literal_term(strTerm):
+                dictLiteral_Terms.setdefault(strTerm.lower(), []).append(intTerm)
+
+        if dictLiteral_Terms:
+            automaton = ahocorasick.Automaton()
+            for strTerm, lstTerm_Positions in dictLiteral_Terms.items():
+                automaton.add_word(strTerm, lstTerm_Positions)
+            automaton.make_automaton()
+
+            for intUnique, objValue in enumerate(arrUniques):
+                if isinstance(objValue, str):
+                    for _, lstTerm_Positions in automaton.iter(objValue.lower()):
+                        arrUnique_Hits[intUnique, lstTerm_Positions] = True
+
+            lstRegex_Terms = [intTerm for intTerm, strTerm in enumerate(lstTerms) if not is_literal_term(strTerm)]
+
+    for intTerm in lstRegex_Terms:
+        arrUnique_Hits[:-1, intTerm] = srUniques.str.contains(lstTerms[intTerm], case = False, na = False).to_numpy(dtype = bool)
+
+    return arrUnique_Hits[arrCodes]
+#End Term Matching
+
+#Start Rule Engine
+#Compiles condiciones_df into an ordered list of rules:
+#   (column, term positions in that column, {column to update: value}, delete)
+#   and the distinct terms searched in each column.
+def compile_condition_rules(condiciones_df):
+    lstUpdate_Columns = [strColumn for strColumn in condiciones_df.columns if strColumn not in RULE_KEY_COLUMNS]
+
+    dictColumn_Terms = {}
+    lstRules = []
+    for cond in condiciones_df.to_dict('records'):
+        strColumn = cond['Column']
+        strWord = cond['Word']
+        # Separar términos si contiene '+' (solo se usan los dos primeros, como antes)
+        lstWord_Terms = strWord.split('+')[:2] if '+' in strWord else [strWord]
+
+        dictTerms = dictColumn_Terms.setdefault(strColumn, {})
+        lstTerm_Positions = [dictTerms.setdefault(strTerm, len(dictTerms)) for strTerm in lstWord_Terms]
+
+        dictUpdates = {strUpdate_Column: cond[strUpdate_Column] for strUpdate_Column in lstUpdate_Columns
+                       if pd.notna(cond[strUpdate_Column])}
+
+        lstRules.append((strColumn, lstTerm_Positions, dictUpdates, cond['ELIMINAR'] == 1))
+
+    return lstRules, {strColumn: list(dictTerms) for strColumn, dictTerms in dictColumn_Terms.items()}
+
+#Applies every rule of condiciones_df in file order with boolean masks. Later rules
+#   see the values written by earlier ones: when a rule writes into a searched
+#   column, only the new value is matched again. Deleted rows are dropped once at the end.
+def apply_condition_rules(proposals_df, condiciones_df):
+    lstRules, dictColumn_Terms = compile_condition_rules(condiciones_df)
+
+    dictValues = {}
+    def column_values(strColumn):
+        if strColumn not in dictValues:
+            dictValues[strColumn] = (proposals_df[strColumn].to_numpy(dtype = object, copy = True)
+                                     if strColumn in proposals_df.columns else np.full(len(proposals_df), np.nan, dtype = object))
+        return dictValues[strColumn]
+
+    dictHits = {strColumn: match_terms(column_values(strColumn), lstTerms)
+                for strColumn, lstTerms in dictColumn_Terms.items()}
+
+    setUpdated = set()
+    arrAlive = np.ones(len(proposals_df), dtype = bool)
+    for strColumn, lstTerm_Positions, dictUpdates, boolDelete in lstRules:
+        arrMask = arrAlive.copy()
+        for intTerm in lstTerm_Positions:
+            arrMask &= dictHits[strColumn][:, intTerm]
+
+        if not arrMask.any():
+            continue
+
+        for strUpdate_Column, objValue in dictUpdates.items():
+            column_values(strUpdate_Column)[arrMask] = objValue
+            setUpdated.add(strUpdate_Column)
+            if strUpdate_Column in dictHits:
+                dictHits[strUpdate_Column][arrMask] = match_terms(np.array([objValue], dtype = object),
+                                                                  dictColumn_Terms[strUpdate_Column])[0]
+
+        if boolDelete:
+            arrAlive &= ~arrMask
+
+    proposals_df = proposals_df.copy()
+    for strColumn in [strColumn for strColumn in dictValues if strColumn in setUpdated]:
+        proposals_df[strColumn] = dictValues[strColumn]
+
+    return proposals_df[arrAlive]
+#End Rule Engine
+
+#Start Keyword Classifiers
+#Ordered (value, keywords) tables, the first row with a keyword contained in the
+#   lower-cased Item_conc wins; rows without any keep their current value.
+SUBCATEGORIA_KEYWORDS = [
+    ("WOMENS", ["mujer", "dama", "women", "femenil", "femenin"]),
+    ("MENS", ["hombre", "caballero", "mens", "unisex", "masculin"]),
+    ("KIDS", ["niño", "niña", "niños"]),
+]
+
+SUBCATEGORIA2_KEYWORDS = [
+    ("OTHER", ["fútbol americano", "futbol americano", "football americano"]),
+    ("FOOTBALL/SOCCER", ["fútbol", "futbol", "football"]),
+    ("BASKETBALL", ["basketball", "básquetbol", "basquetbol"]),
+    ("SKATEBOARDING", ["skateboarding", "skate", "patinar"]),
+    ("RUNNING", ["para correr"]),
+    ("OTHER", ["pádel", "paddel", "padel", "páddel", "natación", "natacion", "bikini", "golf", "traje de baño"]),
+]
+
+SUBCATEGORIA3_KEYWORDS = [
+    ("BAGS", ["mochila", "cartera"]),
+    ("POLO", ["playera polo", "polo"]),
+    ("SHORTS", ["shorts"]),
+    ("HEADWEAR", ["sombrero"]),
+    ("TIGHTS", ["leggings", "legging", "leging"]),
+    ("PANTS", ["pants"]),
+    ("OTHER", ["panties", "tanga", "traje de baño", "bikini", "calzon", "calzón"]),
+    ("OUTERWEAR", ["chaleco"]),
+    ("SKIRTS", ["falda"]),
+    ("GLOVES", ["gloves"]),
+    ("PROTECTIVE", ["espinilleras"]),
+    ("SOCKS", ["calcetines"]),
+    ("BAGS", ["maleta"]),
+]
+
+def compile_keyword_table(lstKeyword_Table):
+    return [(strValue, re.compile('|'.join(re.escape(strKeyword.lower()) for strKeyword in lstKeywords)))
+            for strValue, lstKeywords in lstKeyword_Table]
+
+#One regex scan per table row over the whole column; rows are written from last
+#   to first so the first matching row wins.
+def classify_keywords(srText, srCurrent, lstKeyword_Table):
+    srLower = srText.astype(str).str.lower()
+
+    arrClassified = np.full(len(srText), None, dtype = object)
+    for strValue, regKeywords in reversed(compile_keyword_table(lstKeyword_Table)):
+        arrClassified[srLower.str.contains(regKeywords, na = False).to_numpy(dtype = bool)] = strValue
+
+    srClassified = pd.Series(arrClassified, index = srCurrent.index, dtype = object)
+    return srClassified.where(srClassified.notna(), srCurrent)
+#End Keyword Classifiers
@@ -0,0 +1,262 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date
+
+from pipeline.hierarchy import MAX_DF_RATIO
+from pipeline.instrumentation import RunReport, StageRecord
+from pipeline.nike_stages import NIKE_STAGES
+from pipeline.stage_cache import STAGE_CACHE_VERSION, hash_input_files, load_stage, save_stage
+
+#Stage graphs the runner knows, by the 'pipeline' key of the config
+PIPELINES = {'nike_hierarchy': NIKE_STAGES}
+
+#Config keys and their defaults; base_path, client_name, delivery_date and the
+#   client_file of the pipeline are required. Example (config.json):
+#
+#   {"pipeline": "nike_hierarchy", "base_path": "/data/entregables/78. Nike/",
+#    "client_name": "nike_mx", "delivery_date": "2025-12-05",
+#    "client_file": "HO25 Template - Data Bunker- Nike_Dec2025.xlsx"}
+#
+#   python -m pipeline.runner config.json
+#   python -m pipeline.runner config.json --stages export_proposals --dry-run
+#
+#   Scheduled (cron): 0 6 * * 1 cd /opt/matches_platform && python -m pipeline.runner /etc/deliveries/nike_mx.json
+DEFAULT_CONFIG = {'pipeline': 'nike_hierarchy',
+                  'incremental': True,
+                  'max_df_ratio': MAX_DF_RATIO,
+                  'workers': os.cpu_count(),
+                  'parallel_stages': 2,
+                  'cache_dir': None,
+                  'report_dir': None,
+                  'run_date': None}
+REQUIRED_CONFIG = ['base_path', 'client_name', 'delivery_date', 'client_file']
+
+#Start Config
+def load_config(strConfig_Path, dictOverrides = None):
+    with open(strConfig_Path, encoding = 'utf-8') as fileConfig:
+        return complete_config({**json.load(fileConfig), **(dictOverrides or {})}, strConfig_Path)
+
+#Defaults and checks of a config given as a dict (strSource names it in errors)
+def complete_config(dictConfig, strSource = 'config'):
+    dictConfig = {**DEFAULT_CONFIG, **dictConfig}
+
+    lstMissing = [strKey for strKey in REQUIRED_CONFIG if not dictConfig.get(strKey)]
+    if lstMissing:
+        raise ValueError(f'Config {strSource} is missing {lstMissing}.')
+    if dictConfig['pipeline'] not in PIPELINES:
+        raise ValueError(f"Unknown pipeline {dictConfig['pipeline']!r}, use one of {list(PIPELINES)}.")
+
+    dictConfig['cache_dir'] = dictConfig['cache_dir'] or os.path.join(dictConfig['base_path'], 'stage_cache')
+    dictConfig['report_dir'] = dictConfig['report_dir'] or os.path.join(dictConfig['base_path'], 'run_reports')
+    dictConfig['run_date'] = dictConfig['run_date'] or date.today().isoformat()
+    dictConfig['workers'] = dictConfig['workers'] or 1
+    return dictConfig
+#End Config
+
+#Start Stage Graph
+#Stages in dependency order (every stage after the ones it reads from)
+def topological_order(dictStages):
+    lstOrder = []
+    setVisiting = set()
+    def visit(strStage):
+        if strStage in lstOrder:
+            return
+        if strStage in setVisiting:
+            raise ValueError(f'Stage graph has a cycle through {strStage}.')
+        setVisiting.add(strStage)
+        for strDependency in dictStages[strStage]['deps']:
+            visit(strDependency)
+        lstOrder.append(strStage)
+    for strStage in dictStages:
+        visit(strStage)
+    return lstOrder
+
+#lstTargets and every stage they read from, in dependency order
+def required_stages(dictStages, lstTargets = None):
+    if not lstTargets:
+        return topological_order(dictStages)
+
+    setRequired = set()
+    lstPending = list(lstTargets)
+    while lstPending:
+        strStage = lstPending.pop()
+        if strStage not in dictStages:
+            raise ValueError(f'Unknown stage {strStage!r}, use one of {list(dictStages)}.')
+        if strStage not in setRequired:
+            setRequired.add(strStage)
+            lstPending.extend(dictStages[strStage]['deps'])
+    return [strStage for strStage in topological_order(dictStages) if strStage in setRequired]
+
+#Key of every stage: its input files, its config params and the keys of the
+#   stages it reads from, so a change upstream runs everything below it again.
+def stage_keys(dictStages, lstOrder, dictConfig):
+    dictKeys = {}
+    for strStage in lstOrder:
+        dictStage = dictStages[strStage]
+        hashKey = hashlib.sha256()
+        hashKey.update(f"{STAGE_CACHE_VERSION}|{dictConfig['pipeline']}|{strStage}|".encode('utf-8'))
+        if dictStage['inputs'] is not None:
+            for strHash in hash_input_files(dictConfig['cache_dir'], dictStage['inputs'](dictConfig)):
+                hashKey.update(strHash.encode('utf-8'))
+        hashKey.update(json.dumps({strParam: dictConfig.get(strParam) for strParam in dictStage['params']},
+                                  sort_keys = True, default = str).encode('utf-8'))
+        for strDependency in dictStage['deps']:
+            hashKey.update(dictKeys[strDependency].encode('utf-8'))
+        dictKeys[strStage] = hashKey.hexdigest()[:32]
+    return dictKeys
+#End Stage Graph
+
+#Start Stage Manifests
+#Frames written by a finished stage run; a stage is up to date when the manifest
+#   of its key exists with all its frames (and the files of its 'outputs' frame).
+def manifest_path(strCache_Dir, strStage, strKey):
+    return os.path.join(strCache_Dir, f'{strStage}-{strKey}.json')
+
+def read_manifest(strCache_Dir, strStage, strKey):
+    strPath = manifest_path(strCache_Dir, strStage, strKey)
+    if not os.path.exists(strPath):
+        return None
+    with open(strPath, encoding = 'utf-8') as fileManifest:
+        return json.load(fileManifest)
+
+def write_manifest(strCache_Dir, strStage, strKey, dictManifest):
+    strPath = manifest_path(strCache_Dir, strStage, strKey)
+    with open(strPath + '.tmp', 'w', encoding = 'utf-8') as fileManifest:
+        json.dump(dictManifest, fileManifest)
+    os.replace(strPath + '.tmp', strPath)
+
+    for strFile_Name in os.listdir(strCache_Dir):
+        if strFile_Name.startswith(strStage + '-') and strFile_Name.endswith('.json') and \
+                os.path.join(strCache_Dir, strFile_Name) != strPath:
+            os.remove(os.path.join(strCache_Dir, strFile_Name))
+
+def frame_stage(strStage, strFrame):
+    return f'{strStage}.{strFrame}'
+
+#Frames of the stage run stored under strKey, by frame name
+def read_stage_frames(strCache_Dir, strStage, strKey):
+    dictManifest = read_manifest(strCache_Dir, strStage, strKey)
+    return {strFrame: load_stage(strCache_Dir, frame_stage(strStage, strFrame), strKey) for strFrame in dictManifest['frames']}
+
+def stage_is_fresh(strCache_Dir, strStage, strKey):
+    dictManifest = read_manifest(strCache_Dir, strStage, strKey)
+    if dictManifest is None:
+        return False
+    if not all(os.path.exists(os.path.join(strCache_Dir, f'{frame_stage(strStage, strFrame)}-{strKey}.parquet'))
+               for strFrame in dictManifest['frames']):
+        return False
+    return all(os.path.exists(strPath) for strPath in dictManifest.get('outputs', []))
+#End Stage Manifests
+
+#Start Runner
+#StageRecord of a stage about to run on dictFrames, rows in = rows of its input frames
+def start_stage(strStage, dictFrames):
+    return StageRecord(strStage, sum(len(df) for strFrame, df in dictFrames.items() if strFrame != 'outputs') or None)
+
+#Rows out the stage set itself, else the rows of its deliverables or of its frames
+def stage_rows_out(stageRecord, dictOutput):
+    if stageRecord.intRows_Out is not None:
+        return stageRecord.intRows_Out
+    return (int(dictOutput['outputs']['rows'].sum()) if 'outputs' in dictOutput else
+            sum(len(df) for df in dictOutput.values()))
+
+#Runs one stage (in a worker process when stages run in parallel): loads the
+#   frames of its dependencies from the stage cache, runs it, stores its frames
+#   and manifest, and returns its StageRecord result.
+def run_stage(strStage, dictConfig, dictKeys):
+    dictStages = PIPELINES[dictConfig['pipeline']]
+    dictStage = dictStages[strStage]
+    strCache_Dir = dictConfig['cache_dir']
+
+    dictFrames = {}
+    for strDependency in dictStage['deps']:
+        dictFrames.update(read_stage_frames(strCache_Dir, strDependency, dictKeys[strDependency]))
+
+    stageRecord = start_stage(strStage, dictFrames)
+    dictOutput = dictStage['run'](dictConfig, dictFrames, stageRecord)
+
+    for strFrame, df in dictOutput.items():
+        save_stage(strCache_Dir, frame_stage(strStage, strFrame), dictKeys[strStage], df.reset_index(drop = True))
+    lstOutputs = dictOutput['outputs']['path'].tolist() if 'outputs' in dictOutput else []
+    write_manifest(strCache_Dir, strStage, dictKeys[strStage], {'frames': list(dictOutput), 'outputs': lstOutputs})
+
+    dictResult = stageRecord.end(stage_rows_out(stageRecord, dictOutput))
+    dictResult['outputs'] = lstOutputs
+    return dictResult
+
+#Runs the stages needed for lstTargets (all by default). Stages whose key did not
+#   change are skipped; the rest run as soon as the stages they read from are done,
+#   up to parallel_stages at a time. Returns the RunReport of the run.
+def run_pipeline(dictConfig, lstTargets = None, boolForce = False, boolDry_Run = False):
+    dictStages = PIPELINES[dictConfig['pipeline']]
+    os.makedirs(dictConfig['cache_dir'], exist_ok = True)
+
+    lstOrder = required_stages(dictStages, lstTargets)
+    dictKeys = stage_keys(dictStages, lstOrder, dictConfig)
+    setDone = {strStage for strStage in lstOrder
+               if not boolForce and stage_is_fresh(dictConfig['cache_dir'], strStage, dictKeys[strStage])}
+
+    report = RunReport(dictConfig['client_name'], {strKey: objValue for strKey, objValue in dictConfig.items()})
+    if boolDry_Run:
+        for strStage in lstOrder:
+            print(f"{strStage:<24} {dictKeys[strStage]}  {'up to date' if strStage in setDone else 'run'}")
+        return report
+    for strStage in lstOrder:
+        if strStage in setDone:
+            report.add_stage({'stage': strStage, 'skipped': True})
+
+    lstPending = [strStage for strStage in lstOrder if strStage not in setDone]
+    intParallel = max(1, int(dictConfig['parallel_stages']))
+    if intParallel == 1:
+        for strStage in lstPending:
+            report.add_stage(run_stage(strStage, dictConfig, dictKeys))
+    else:
+        with ProcessPoolExecutor(max_workers = intParallel) as executor:
+            dictRunning = {}
+            while lstPending or dictRunning:
+                for strStage in [strStage for strStage in lstPending
+                                 if all(strDependency in setDone for strDependency in dictStages[strStage]['deps'])]:
+                    lstPending.remove(strStage)
+                    dictRunning[executor.submit(run_stage, strStage, dictConfig, dictKeys)] = strStage
+
+                setFinished, _ = wait(dictRunning, return_when = FIRST_COMPLETED)
+                for future in setFinished:
+                    strStage = dictRunning.pop(future)
+                    report.add_stage(future.result())
+                    setDone.add(strStage)
+
+    report.save(os.path.join(dictConfig['report_dir'], f"{dictConfig['client_name']}_{dictConfig['run_date']}.json"))
+    return report
+
+#Frames of strStage for dictConfig (to review them after run_pipeline, e.g. from a notebook)
+def stage_frames(dictConfig, strStage):
+    dictStages = PIPELINES[dictConfig['pipeline']]
+    dictKeys = stage_keys(dictStages, required_stages(dictStages, [strStage]), dictConfig)
+    if not stage_is_fresh(dictConfig['cache_dir'], strStage, dictKeys[strStage]):
+        raise ValueError(f'Stage {strStage!r} is not up to date for this config, run the pipeline first.')
+    return read_stage_frames(dictConfig['cache_dir'], strStage, dictKeys[strStage])
+
+#End Runner
+
+def main(lstArgs = None):
+    parser = argparse.ArgumentParser(description = 'Runs a delivery pipeline from a JSON config.')
+    parser.add_argument('config', help = 'JSON config file (see DEFAULT_CONFIG in pipeline/runner.py)')
+    parser.add_argument('--stages', nargs = '+', default = None, help = 'Run only these stages and the ones they read from')
+    parser.add_argument('--force', action = 'store_true', help = 'Run every stage even when its inputs did not change')
+    parser.add_argument('--dry-run', action = 'store_true', help = 'Only print which stages would run')
+    parser.add_argument('--delivery-date', default = None)
+    parser.add_argument('--parallel-stages', type = int, default = None)
+    args = parser.parse_args(lstArgs)
+
+    dictOverrides = {strKey: objValue for strKey, objValue in [('delivery_date', args.delivery_date),
+                                                              ('parallel_stages', args.parallel_stages)]
+                     if objValue is not None}
+    run_pipeline(load_config(args.config, dictOverrides), args.stages, args.force, args.dry_run)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from pipeline.index_store import hash_file
+from pipeline.output_writer import to_arrow_table, write_output
+
+STAGE_CACHE_VERSION = 2
+
+#Start Input Hashes
+#Content hash of every input file. Hashes are remembered next to the cache by
+#   mtime and size, so unchanged files are not read again on the next run.
+def hash_input_files(strCache_Dir, lstInput_Paths):
+    strMemo_Path = os.path.join(strCache_Dir, 'file_hashes.json')
+    dictMemo = {}
+    if os.path.exists(strMemo_Path):
+        with open(strMemo_Path, encoding = 'utf-8') as fileMemo:
+            dictMemo = json.load(fileMemo)
+
+    lstHashes = []
+    boolChanged = False
+    for strInput_Path in sorted(os.path.abspath(strPath) for strPath in lstInput_Paths):
+        statInput = os.stat(strInput_Path)
+        lstStat = [statInput.st_mtime_ns, statInput.st_size]
+        lstMemo = dictMemo.get(strInput_Path)
+        if lstMemo is None or lstMemo[:2] != lstStat:
+            dictMemo[strInput_Path] = lstStat + [hash_file(strInput_Path)]
+            boolChanged = True
+        lstHashes.append(dictMemo[strInput_Path][2])
+
+    if boolChanged:
+        with open(strMemo_Path + '.tmp', 'w', encoding = 'utf-8') as fileMemo:
+            json.dump(dictMemo, fileMemo)
+        os.replace(strMemo_Path + '.tmp', strMemo_Path)
+
+    return lstHashes
+
+def stage_key(strCache_Dir, strStage, lstInput_Paths, dictParams = None):
+    os.makedirs(strCache_Dir, exist_ok = True)
+    hashKey = hashlib.sha256()
+    hashKey.update(f'{STAGE_CACHE_VERSION}|{strStage}|'.encode('utf-8'))
+    for strHash in hash_input_files(strCache_Dir, lstInput_Paths):
+        hashKey.update(strHash.encode('utf-8'))
+    hashKey.update(json.dumps(dictParams or {}, sort_keys = True, default = str).encode('utf-8'))
+
+    return hashKey.hexdigest()[:32]
+#End Input Hashes
+
+#Start Stage Files
+def stage_path(strCache_Dir, strStage, strKey):
+    return os.path.join(strCache_Dir, f'{strStage}-{strKey}.parquet')
+
+def save_stage(strCache_Dir, strStage, strKey, df):
+    tblStage = to_arrow_table(df)
+    lstString_Columns = [field.name for field in tblStage.schema
+                         if pa.types.is_string(field.type) or pa.types.is_large_string(field.type)]
+
+    strPath = stage_path(strCache_Dir, strStage, strKey)
+    pq.write_table(tblStage, strPath + '.tmp', use_dictionary = lstString_Columns, compression = 'zstd')
+    os.replace(strPath + '.tmp', strPath)
+
+    #Only the latest entry of each stage is kept
+    for strFile_Name in os.listdir(strCache_Dir):
+        if strFile_Name.startswith(strStage + '-') and strFile_Name.endswith('.parquet') and \
+                os.path.join(strCache_Dir, strFile_Name) != strPath:
+            os.remove(os.path.join(strCache_Dir, strFile_Name))
+
+def load_stage(strCache_Dir, strStage, strKey):
+    strPath = stage_path(strCache_Dir, strStage, strKey)
+    if not os.path.exists(strPath):
+        return None
+
+    return pq.read_table(strPath).to_pandas()
+#End Stage Files
+
+#Returns the cached result of funcBuild(*args, **kwargs) when none of the input
+#   files (nor dictParams) changed, otherwise builds it and stores it.
+def cached_stage(strCache_Dir, strStage, lstInput_Paths, funcBuild, *args, dictParams = None, **kwargs):
+    strKey = stage_key(strCache_Dir, strStage, lstInput_Paths, dictParams)
+
+    dfStage = load_stage(strCache_Dir, strStage, strKey)
+    if dfStage is not None:
+        print(f"{strStage}: loaded from cache ({len(dfStage)} rows)")
+        return dfStage
+
+    dfStage = funcBuild(*args, **kwargs)
+    save_stage(strCache_Dir, strStage, strKey, dfStage)
+
+    return dfStage
+
+#Final render of a stage as the utf-8-sig csv deliverable, written in chunks
+#   and renamed into place once complete.
+def render_csv(df, strPath):
+    write_output(df, strPath, 'csv')
@@ -0,0 +1,38 @@
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+TOKENIZER_VERSION = 1
+#Same words and minimum length as cleanText / createInvertedIndex in backend/src/services/fuzzyService.js
+STOPWORDS = frozenset(['de', 'del', 'la', 'el', 'los', 'las', 'y', 'o', 'un', 'una', 'con', 'para',
+                       'en', 'al', 'a', 'por', 'sin', 'que', 'su', 'se', 'le'])
+MIN_TOKEN_LENGTH = 3
+
+NON_WORD_PATTERN = re.compile(r'[^0-9A-Za-z_\s]')
+
+#Start Text Normalization
+#lower case, accents removed (niño -> nino), punctuation as spaces (tenis, -> tenis)
+def clean_text(strText):
+    if not isinstance(strText, str) or not strText:
+        return ''
+
+    strText = unicodedata.normalize('NFD', strText.lower())
+    strText = ''.join(strChar for strChar in strText if not '\u0300' <= strChar <= '\u036f')
+    return ' '.join(NON_WORD_PATTERN.sub(' ', strText).split())
+
+def tokenize(strText, setStopwords = STOPWORDS, intMin_Length = MIN_TOKEN_LENGTH):
+    return [strToken for strToken in clean_text(strText).split()
+            if len(strToken) >= intMin_Length and strToken not in setStopwords]
+
+def normalize_text(strText):
+    return ' '.join(tokenize(strText))
+
+#Normalized text of a column, tokenizing each distinct value once
+def normalize_column(srText):
+    arrCodes, arrUniques = pd.factorize(pd.Series(srText, dtype = object), use_na_sentinel = True)
+    arrNormalized = np.array([normalize_text(strText) for strText in arrUniques] + [''], dtype = object)
+
+    return pd.Series(arrNormalized[arrCodes], index = getattr(srText, 'index', None))
+#End Text Normalization
@@ -0,0 +1,13 @@
+from pipeline import batch
+
+def test_run_client_without_stages(tmp_path, monkeypatch):
+    monkeypatch.setitem(batch.BATCH_CLIENTS, 'empty', {'run': lambda dictConfig, dictCorpus, report: [],
+                                                       'report': '{client}_{run_date}.json'})
+
+    dictResult = batch.run_client({'pipeline': 'empty', 'client_name': 'vacio', 'run_date': '2026-10-17',
+                                   'report_dir': str(tmp_path)})
+
+    assert dictResult['stage'] == 'vacio'
+    assert dictResult['rows_out'] is None
+    assert dictResult['outputs'] == []
+    assert (tmp_path / 'vacio_2026-10-17.json').exists()
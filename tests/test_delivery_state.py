@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from pipeline.delivery_state import assemble_delivery, carried_state_rows, load_delivery_state, merge_delivery_state
+from pipeline.delivery_state import processed_state_rows, row_fingerprints, save_delivery_state
+
+CONTEXT = 'context-1'
+
+def competitor_rows(lstItems, lstStores):
+    return pd.DataFrame({'Canal': 'Walmart', 'SKU': ['A', 'A', 'B'][:len(lstItems)], 'UPC': '750', 'Item': lstItems,
+                         'URL SKU': 'u', 'Image': 'i', 'Category': 'c', 'Subcategory': 's', 'Subcategory2': 's2',
+                         'Subcategory3': 's3', 'Store ID': lstStores})
+
+#Proposals of every row, the rules delete the last one
+def processed_delivery(dfRows):
+    arrKeys = (dfRows['SKU'] + dfRows['Canal']).to_numpy()
+    dfProposals = pd.DataFrame({'SKU': dfRows['SKU'], 'proposal_conc': dfRows['Item'] + '-MENS'}).iloc[:-1]
+    dfTop = pd.DataFrame({'key': arrKeys, 'proposal_1': dfRows['Item'].to_numpy(), 'score_1': 1.5})
+    return arrKeys, processed_state_rows(arrKeys, row_fingerprints(dfRows), dfProposals, dfTop)
+
+def test_round_trip_with_a_key_in_several_stores(tmp_path):
+    dfRows = competitor_rows(['tenis', 'tenis', 'gorra'], ['1', '2', '1'])
+    arrKeys, dfProcessed = processed_delivery(dfRows)
+    dfExpected_Proposals, dfExpected_Top = assemble_delivery(np.full(3, -1), None, dfProcessed)
+
+    save_delivery_state(str(tmp_path), CONTEXT, merge_delivery_state(None, dfProcessed))
+    dfState = load_delivery_state(str(tmp_path), CONTEXT)
+    assert dfState['key'].is_unique
+
+    arrState_Rows = carried_state_rows(arrKeys, row_fingerprints(dfRows), dfState)
+    assert (arrState_Rows >= 0).all()
+    dfProposals, dfTop = assemble_delivery(arrState_Rows, dfState, dfProcessed.iloc[:0])
+    pd.testing.assert_frame_equal(dfProposals, dfExpected_Proposals)
+    pd.testing.assert_frame_equal(dfTop, dfExpected_Top)
+
+def test_changed_rows_replace_their_key(tmp_path):
+    dfRows = competitor_rows(['tenis', 'tenis', 'gorra'], ['1', '2', '1'])
+    _, dfProcessed = processed_delivery(dfRows)
+    dfState = merge_delivery_state(None, dfProcessed)
+
+    dfChanged = competitor_rows(['tenis', 'tenis', 'gorra roja'], ['1', '2', '1'])
+    arrKeys = (dfChanged['SKU'] + dfChanged['Canal']).to_numpy()
+    arrState_Rows = carried_state_rows(arrKeys, row_fingerprints(dfChanged), dfState)
+    assert arrState_Rows.tolist()[:2] == [0, 0] and arrState_Rows[2] == -1
+
+    _, dfChanged_Processed = processed_delivery(dfChanged.iloc[[2]])
+    dfState = merge_delivery_state(dfState, dfChanged_Processed)
+    assert len(dfState) == 2
+    assert carried_state_rows(arrKeys, row_fingerprints(dfChanged), dfState).tolist() == [0, 0, 1]
+
+def test_stored_duplicates_are_dropped_on_load(tmp_path):
+    dfRows = competitor_rows(['tenis', 'tenis'], ['1', '2'])
+    arrKeys, dfProcessed = processed_delivery(dfRows)
+    save_delivery_state(str(tmp_path), CONTEXT, dfProcessed)
+
+    dfState = load_delivery_state(str(tmp_path), CONTEXT)
+    assert len(dfState) == 1
+    assert carried_state_rows(arrKeys, row_fingerprints(dfRows), dfState).tolist() == [0, 0]
+    assert load_delivery_state(str(tmp_path), 'other context') is None
@@ -0,0 +1,44 @@
+import os
+
+import pandas as pd
+
+from pipeline.data_utils import convert_excel_to_df
+from pipeline.excel_loader import read_excel, read_excel_sheets
+
+def write_workbook(strPath, dictSheets):
+    with pd.ExcelWriter(strPath, engine = 'openpyxl') as writer:
+        for strSheet_Name, df in dictSheets.items():
+            df.to_excel(writer, sheet_name = strSheet_Name, index = False)
+
+def sample_sheets():
+    return {'Canal A': pd.DataFrame({'UPC': ['00750100', '750200'], 'Item': ['Leche 1 L', None], 'Price': [21.5, 8]}),
+            'Canal B': pd.DataFrame({'UPC': ['0042'], 'Item': ['Cafe 200g'], 'Price': [99.0]})}
+
+def test_read_excel_sheets_matches_pandas(tmp_path):
+    strPath = str(tmp_path / 'competitors.xlsx')
+    write_workbook(strPath, sample_sheets())
+
+    dictSheets = read_excel_sheets(strPath, dictDtypes = {'UPC': 'str'})
+
+    assert list(dictSheets) == ['Canal A', 'Canal B']
+    for strSheet_Name, df in dictSheets.items():
+        pd.testing.assert_frame_equal(df, pd.read_excel(strPath, sheet_name = strSheet_Name, dtype = {'UPC': 'str'}))
+    assert dictSheets['Canal A']['UPC'].tolist() == ['00750100', '750200']
+
+    #Old convert_excel_to_df: every sheet read with pd.read_excel and concatenated
+    dfExpected = pd.concat([pd.read_excel(strPath, sheet_name = strSheet_Name)
+                            for strSheet_Name in pd.ExcelFile(strPath).sheet_names], ignore_index = True)
+    pd.testing.assert_frame_equal(convert_excel_to_df(strPath), dfExpected)
+
+def test_read_excel_returns_copies_and_sees_file_changes(tmp_path):
+    strPath = str(tmp_path / 'product_match.xlsx')
+    write_workbook(strPath, sample_sheets())
+
+    dfFirst = read_excel(strPath)
+    dfFirst.loc[0, 'Item'] = 'changed'
+    assert read_excel(strPath).loc[0, 'Item'] == 'Leche 1 L'
+    assert read_excel(strPath, 'Canal B')['Item'].tolist() == ['Cafe 200g']
+
+    write_workbook(strPath, {'Canal A': pd.DataFrame({'UPC': ['1'], 'Item': ['Nuevo'], 'Price': [1.0]})})
+    os.utime(strPath, ns = (os.stat(strPath).st_atime_ns, os.stat(strPath).st_mtime_ns + 10 ** 9))
+    assert read_excel(strPath)['Item'].tolist() == ['Nuevo']
@@ -0,0 +1,45 @@
+import random
+
+import numpy as np
+from fuzzywuzzy import fuzz, process
+
+from pipeline.fuzzy_match import BlockPool, build_store_block, match_block_positions, match_store, query_sort_key
+
+LST_WORDS = ['leche', 'entera', 'deslactosada', 'lala', 'alpura', 'cafe', 'soluble', 'nescafe', 'arroz', 'verde',
+             'valle', 'frijol', 'negro', 'agua', 'ciel', '1l', '600ml', '500g', 'Jabón', 'Piña', 'niño', 'pack']
+
+def random_items(intItems, intSeed):
+    rndItems = random.Random(intSeed)
+    return [' '.join(rndItems.choice(LST_WORDS) for _ in range(rndItems.randint(1, 5))) for _ in range(intItems)]
+
+def test_match_store_matches_process_extract():
+    lstChoices = random_items(300, 0) + ['', 'LECHE-ENTERA!!', 'leche entera'] * 2
+    lstQueries = random_items(40, 1) + ['leche entera', 'Piña niño', '']
+
+    lstMatches = match_store(lstQueries, lstChoices)
+
+    for strQuery, lstQuery_Matches in zip(lstQueries, lstMatches):
+        assert lstQuery_Matches == process.extract(strQuery, lstChoices, limit = 5, scorer = fuzz.token_sort_ratio)
+
+def test_match_store_scores_nan_choices_like_process_extract():
+    lstChoices = ['Leche nan', float('nan'), 'x', None, 'nan']
+
+    lstMatches = match_store(['nan leche', 'Leche'], lstChoices)
+
+    assert lstMatches[0][0] == ('Leche nan', 100)
+    assert np.isnan(lstMatches[0][1][0]) and lstMatches[0][1][1] == 50
+    for strQuery, lstQuery_Matches in zip(['nan leche', 'Leche'], lstMatches):
+        lstExpected = process.extract(strQuery, lstChoices, limit = 5, scorer = fuzz.token_sort_ratio)
+        assert [intScore for _, intScore in lstQuery_Matches] == [intScore for _, intScore in lstExpected]
+        assert [str(objChoice) for objChoice, _ in lstQuery_Matches] == [str(objChoice) for objChoice, _ in lstExpected]
+
+def test_block_pool_matches_serial_over_several_blocks():
+    lstBlocks = [build_store_block(random_items(200, intSeed)) for intSeed in range(3)]
+    lstQuery_Keys = [query_sort_key(strItem) for strItem in random_items(30, 9)]
+
+    with BlockPool(lstBlocks, 2) as pool:
+        for dictBlock in lstBlocks:
+            arrPositions, arrScores = match_block_positions(lstQuery_Keys, dictBlock, pool = pool)
+            arrSerial_Positions, arrSerial_Scores = match_block_positions(lstQuery_Keys, dictBlock)
+            assert np.array_equal(arrPositions, arrSerial_Positions)
+            assert np.array_equal(arrScores, arrSerial_Scores)
@@ -0,0 +1,48 @@
+import hashlib
+import os
+
+from pipeline.fuzzy_service import MatchingPool, warm_comparison
+
+def comparison_file(intFile):
+    bytesData = f'UPC,Item\n{intFile},Leche entera {intFile}\n'.encode('utf-8')
+    return hashlib.sha256(bytesData).hexdigest(), bytesData
+
+def request(pool, intFile):
+    strHash, bytesData = comparison_file(intFile)
+    executor, strSpool_Path = pool.assign(strHash, bytesData, f'comparison_{intFile}.csv')
+    try:
+        return executor.submit(warm_comparison, strHash, strSpool_Path, 'comparison.csv', pool.intMax_Indexes).result()
+    finally:
+        pool.release(strHash)
+
+def test_pool_evicts_spool_files_with_warm_indexes(tmp_path):
+    pool = MatchingPool(1, str(tmp_path), intMax_Indexes = 2)
+    try:
+        assert request(pool, 1) == (1, False)
+        assert request(pool, 2) == (1, False)
+        assert request(pool, 1) == (1, True)
+        assert request(pool, 3) == (1, False)
+
+        #File 2 was the least recently requested one
+        assert list(pool.dictAssigned) == [comparison_file(1)[0], comparison_file(3)[0]]
+        assert sorted(os.listdir(tmp_path)) == sorted(strHash + '.csv' for strHash in pool.dictAssigned)
+        assert request(pool, 2) == (1, False)
+        assert request(pool, 3) == (1, True)
+    finally:
+        pool.shutdown()
+    assert os.listdir(tmp_path) == []
+
+def test_pool_keeps_files_in_use(tmp_path):
+    pool = MatchingPool(1, str(tmp_path), intMax_Indexes = 1)
+    try:
+        strHash, bytesData = comparison_file(1)
+        pool.assign(strHash, bytesData, 'comparison.csv')
+        #File 1 is older but still in use, file 2 goes once its request is done
+        request(pool, 2)
+        assert list(pool.dictAssigned) == [strHash]
+        assert os.listdir(tmp_path) == [strHash + '.csv']
+
+        pool.release(strHash)
+        assert list(pool.dictAssigned) == [strHash]
+    finally:
+        pool.shutdown()
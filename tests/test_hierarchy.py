@@ -0,0 +1,65 @@
+import random
+
+import pandas as pd
+
+from pipeline.hierarchy import NO_MATCH_FOUND, create_inverted_index, find_best_match, find_best_match_batch
+from pipeline.hierarchy import find_top_matches_batch
+from pipeline.index_store import load_or_build_inverted_index
+
+LST_WORDS = ['tenis', 'nike', 'air', 'max', 'hombre', 'mujer', 'negro', 'blanco', 'running', 'futbol', 'sudadera',
+             'short', 'kids', 'jordan', 'gorra', 'calceta']
+
+#Few words per row and many repeated word sets, so most descriptions tie on several rows
+def hierarchy_frame(intRows, intSeed):
+    rndRows = random.Random(intSeed)
+    return pd.DataFrame({'item_tokens': [' '.join(rndRows.sample(LST_WORDS, rndRows.randint(1, 4))) for _ in range(intRows)],
+                         'Category_Nike_conc': [f'CAT{intRow % 7}-SUB{intRow}' for intRow in range(intRows)]})
+
+def descriptions(intDescriptions, intSeed):
+    rndDescriptions = random.Random(intSeed)
+    lstDescriptions = [' '.join(rndDescriptions.sample(LST_WORDS + ['desconocida'], rndDescriptions.randint(1, 5)))
+                       for _ in range(intDescriptions)]
+    return lstDescriptions + ['', 'desconocida', 'NIKE Air', lstDescriptions[0]]
+
+def test_batch_matches_row_by_row_ties():
+    dfHierarchy = hierarchy_frame(400, 0)
+    inverted_index = create_inverted_index(dfHierarchy, 'item_tokens')
+    lstDescriptions = descriptions(300, 1)
+
+    lstExpected = [find_best_match(strDescription, inverted_index, dfHierarchy) for strDescription in lstDescriptions]
+
+    assert find_best_match_batch(lstDescriptions, inverted_index, dfHierarchy, intBlock_Size = 16) == lstExpected
+    assert lstExpected[-3] == NO_MATCH_FOUND
+
+def test_batch_matches_row_by_row_on_persisted_index(tmp_path):
+    dfHierarchy = hierarchy_frame(300, 2)
+    strSource = tmp_path / 'product_match.xlsx'
+    strSource.write_bytes(b'product_match')
+    load_or_build_inverted_index(str(strSource), dfHierarchy, 'item_tokens', str(tmp_path / 'index_cache'))
+    inverted_index = load_or_build_inverted_index(str(strSource), dfHierarchy, 'item_tokens', str(tmp_path / 'index_cache'))
+    lstDescriptions = descriptions(200, 3)
+
+    lstExpected = [find_best_match(strDescription, inverted_index, dfHierarchy) for strDescription in lstDescriptions]
+
+    assert find_best_match_batch(lstDescriptions, inverted_index, dfHierarchy) == lstExpected
+
+def test_persisted_vocabulary_keeps_term_ids(tmp_path):
+    dfHierarchy = hierarchy_frame(300, 4)
+    strSource = tmp_path / 'product_match.xlsx'
+    strSource.write_bytes(b'product_match')
+    indexStored = load_or_build_inverted_index(str(strSource), dfHierarchy.iloc[:200], 'item_tokens', str(tmp_path / 'index_cache'))
+    lstStored_Terms = indexStored.vocabulary.lstTerms
+
+    #Appended rows: the stored terms keep their ids, the new ones come after them
+    strSource.write_bytes(b'product_match with more rows')
+    dfHierarchy['item_tokens'] = dfHierarchy['item_tokens'].where(dfHierarchy.index < 200, dfHierarchy['item_tokens'] + ' zapatilla')
+    inverted_index = load_or_build_inverted_index(str(strSource), dfHierarchy, 'item_tokens', str(tmp_path / 'index_cache'))
+    assert inverted_index.vocabulary.lstTerms[:len(lstStored_Terms)] == lstStored_Terms
+    assert inverted_index.vocabulary.lstTerms[len(lstStored_Terms):] == ['zapatilla']
+    assert inverted_index.vocabulary.text_ids('nike air') is inverted_index.vocabulary.text_ids('nike air')
+
+    lstDescriptions = descriptions(200, 5) + ['zapatilla nike']
+    dfExpected = find_top_matches_batch(lstDescriptions, create_inverted_index(dfHierarchy, 'item_tokens'), dfHierarchy,
+                                        setStopwords = frozenset(['nike']))
+    pd.testing.assert_frame_equal(find_top_matches_batch(lstDescriptions, inverted_index, dfHierarchy,
+                                                         setStopwords = frozenset(['nike'])), dfExpected)
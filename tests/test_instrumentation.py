@@ -0,0 +1,29 @@
+import subprocess
+import sys
+
+from pipeline import instrumentation
+from pipeline.instrumentation import RunReport, StageRecord
+
+#data_utils (and so the Nike script and the fuzzy notebook) must import where
+#   resource does not exist, as on Windows
+def test_imports_without_resource():
+    strCode = ("import sys; sys.modules['resource'] = None; "
+               "import pipeline.data_utils, pipeline.instrumentation as inst; "
+               "assert inst.resource is None; print(inst.peak_rss_mb())")
+    procCheck = subprocess.run([sys.executable, '-c', strCode], capture_output = True, text = True)
+    assert procCheck.returncode == 0, procCheck.stderr
+
+def test_stage_without_memory_measures(monkeypatch):
+    monkeypatch.setattr(instrumentation, 'read_proc_status', lambda strField: None)
+    monkeypatch.setattr(instrumentation, 'resource', None)
+    monkeypatch.setattr(instrumentation, 'psutil', None)
+    assert instrumentation.peak_rss_mb() is None
+
+    report = RunReport('test')
+    with report.stage('clean', 10) as stageRecord:
+        stageRecord.drop('UPC_empty', 2)
+        stageRecord.intRows_Out = 8
+    dictStage = report.lstStages[0]
+    assert dictStage['peak_rss_mb'] is None
+    assert (dictStage['rows_in'], dictStage['rows_out'], dictStage['dropped']) == (10, 8, {'UPC_empty': 2})
+    assert StageRecord('x').end(1)['rows_out'] == 1
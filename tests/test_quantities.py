@@ -0,0 +1,67 @@
+import re
+
+import pandas as pd
+
+from pipeline.data_utils import extract_quantities_and_units, parse_quantities
+
+
+#Start reference implementation (row-wise parser the vectorized one replaced)
+def reference_weight(strItem):
+    strItem = strItem.lower().replace('-', '')
+    regKilos = re.compile(r'([0-9]+\.?[0-9]*\s?k)')
+    regGrams = re.compile(r'([0-9]+\.?[0-9]*\s?g)')
+
+    if regKilos.search(strItem):
+        if any(strName in strItem for strName in ['kg', 'kgr', 'kilogramo', 'kilo']):
+            strMatch = regKilos.search(strItem.replace(' ', ''))
+            return float(strMatch.group(1).replace('k', '')) * 1000 if strMatch else 0
+        return 0
+    if regGrams.search(strItem):
+        strItem = strItem.replace('granos', '')
+        if any(strName in strItem for strName in ['g', 'gr', 'gramo', 'gramos', 'grms', 'grm']):
+            strMatch = regGrams.search(strItem.replace(' ', ''))
+            return float(strMatch.group(1).replace('g', '')) if strMatch else 0
+        return 0
+    if re.search('por kilo|el kilo|por kg|kg|kilo', strItem):
+        return 1000
+    return 0
+
+def reference_quantity(strItem):
+    strMl = ''.join(re.findall(r'[0-9]+\.?[0-9]*ml', strItem.replace(' ml', 'ml').replace(' - ', ''),
+                               re.IGNORECASE))[:-2]
+    if strMl and float(strMl) != 0:
+        return float(strMl), 'ml'
+    return float(reference_weight(strItem)), 'gr'
+#End reference implementation
+
+#Items without a separate count before the quantity, where both parsers must agree
+LST_ITEMS = ['Agua Natural 600ml', 'Refresco Cola 2.5 ml', 'Leche Entera 1000ML', 'Arroz Super Extra 1 kg',
+             'Frijol Negro 1.5kg', 'Azucar Estandar 2 Kg', 'Cafe Soluble 200g', 'Galletas Maria 170 g',
+             'Chocolate - Amargo 90gr', 'Cafe en granos 250g', 'Jamon de pavo por kilo', 'Queso Panela el kilo',
+             'Tenis talla negro', 'Desodorante Aerosol 150 ml', 'Atun en agua 140 g', 'Aguacate Hass kg',
+             'Jabon de tocador 3 x 150 gr']
+
+def test_parse_quantities_matches_reference():
+    dfQuantities = parse_quantities(pd.Series(LST_ITEMS))
+
+    for intRow, strItem in enumerate(LST_ITEMS):
+        fltCantidad, strUnidad = reference_quantity(strItem)
+        assert dfQuantities['Cantidad'][intRow] == fltCantidad, strItem
+        assert dfQuantities['Unidad'][intRow] == strUnidad, strItem
+
+def test_pack_counts_stay_apart_from_quantities():
+    dfQuantities = parse_quantities(pd.Series(['Refresco Pack 12 355 ml', 'Cerveza 6 pack 355ml',
+                                               'Cafe 12 pzas 500 g', 'Arroz 4 piezas 1 kg', 'Leche 1 L 6 pzas']))
+
+    assert dfQuantities['Cantidad'].tolist() == [355, 355, 500, 1000, 0]
+    assert dfQuantities['Unidad'].tolist() == ['ml', 'ml', 'gr', 'gr', 'gr']
+
+def test_extract_quantities_keeps_row_order():
+    dfCompetitors = pd.DataFrame({'Item': ['Frijol 1 kg', 'Agua 600 ml', 'Sin cantidad', 'Cafe 200g'],
+                                  'Store ID': [1, 2, 3, 4]})
+
+    dfCompetitors = extract_quantities_and_units(dfCompetitors)
+
+    assert dfCompetitors['Store ID'].tolist() == [1, 2, 3, 4]
+    assert dfCompetitors['Cantidad'].tolist() == [1000, 600, 0, 200]
+    assert dfCompetitors['Unidad'].tolist() == ['gr', 'ml', 'gr', 'gr']
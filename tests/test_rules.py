@@ -0,0 +1,84 @@
+import random
+
+import pandas as pd
+import pytest
+
+from pipeline import rules
+
+LST_ITEM_WORDS = ['Tenis', 'NIKE', 'air', 'max', 'hombre', 'mujer', 'Niño', 'futbol', 'sudadera', 'short', 'Jordan',
+                  'gorra', 'calceta', 'mochila', 'running', 'correr']
+
+#Rules in file order:
+#   - '+' words (only the first two terms count, a trailing '+' matches everything)
+#   - rules writing into Subcategoria_Nike, which later rules search
+#   - ELIMINAR rows, also ones updating before deleting
+#   - regex terms next to literal ones
+CONDICIONES = [
+    ('Item_conc', 'nike+air', None, 'RUNNING', None, None),
+    ('Item_conc', 'niño', 'KIDS', None, None, None),
+    ('Item_conc', 'mujer+running+gorra', 'WOMENS', 'RUNNING', None, None),
+    ('Subcategoria_Nike', 'KIDS', None, None, 'KIDS FOOTWEAR', None),
+    ('Item_conc', 'jordan+', 'MENS', 'BASKETBALL', None, None),
+    ('Item_conc', 'air ?max', None, None, 'AIR MAX', None),
+    ('Item_conc', '^tenis', None, None, None, None),
+    ('Subcatgory3_Nike', 'AIR', 'MENS', None, None, None),
+    ('Item_conc', 'calceta', None, None, 'SOCKS', 1),
+    ('Subcategoria_Nike', 'women|kids', None, 'OTHER', None, None),
+    ('Item_conc', 'mochila+gorra', None, None, 'BAGS', 1),
+    ('Subcategoria2_Nike', 'futbol', None, 'FOOTBALL/SOCCER', None, None),
+    ('Item_conc', 'SUDADERA', 'MENS', None, 'HOODIE', None),
+]
+
+def proposals_frame(intRows, intSeed):
+    rndRows = random.Random(intSeed)
+    lstItems = [' '.join(rndRows.sample(LST_ITEM_WORDS, rndRows.randint(1, 4))) for _ in range(intRows)]
+    lstItems[:3] = [None, '', 'tenis nike air max']
+    return pd.DataFrame({'Item_conc': lstItems,
+                         'SKU': [f'SKU{intRow}' for intRow in range(intRows)],
+                         'Subcategoria_Nike': [rndRows.choice(['MENS', 'WOMENS', 'UNISEX']) for _ in range(intRows)],
+                         'Subcategoria2_Nike': [rndRows.choice(['RUNNING', 'futbol', 'LIFESTYLE']) for _ in range(intRows)],
+                         'Subcatgory3_Nike': [rndRows.choice(['SHOES', 'TOPS', None]) for _ in range(intRows)]})
+
+def condiciones_frame():
+    return pd.DataFrame(CONDICIONES, columns = ['Column', 'Word', 'Subcategoria_Nike', 'Subcategoria2_Nike',
+                                                'Subcatgory3_Nike', 'ELIMINAR'])
+
+#Row by row loop of the Nike script before the rule engine
+def baseline_condition_rules(proposals_df, condiciones_df):
+    proposals_df = proposals_df.copy()
+    for _, cond in condiciones_df.iterrows():
+        column = cond['Column']
+        word = cond['Word']
+
+        if '+' in word:
+            terms = word.split('+')
+            matching_rows = proposals_df[proposals_df[column].str.contains(terms[0], case=False, na=False) & proposals_df[column].str.contains(terms[1], case=False, na=False)]
+        else:
+            matching_rows = proposals_df[proposals_df[column].str.contains(word, case=False, na=False)]
+
+        for idx in matching_rows.index:
+            for col in condiciones_df.columns:
+                if col not in ['Column', 'Word', 'ELIMINAR'] and pd.notna(cond[col]):
+                    proposals_df.at[idx, col] = cond[col]
+
+            if cond['ELIMINAR'] == 1:
+                proposals_df.drop(idx, inplace=True)
+    return proposals_df
+
+@pytest.mark.parametrize('boolAhocorasick', [True, False])
+def test_rules_match_baseline_loop(monkeypatch, boolAhocorasick):
+    if boolAhocorasick:
+        pytest.importorskip('ahocorasick')
+    else:
+        monkeypatch.setattr(rules, 'ahocorasick', None)
+
+    proposals_df = proposals_frame(300, 0)
+    condiciones_df = condiciones_frame()
+    dfExpected = baseline_condition_rules(proposals_df, condiciones_df)
+
+    dfResult = rules.apply_condition_rules(proposals_df, condiciones_df)
+
+    pd.testing.assert_frame_equal(dfResult, dfExpected)
+    assert 0 < len(dfResult) < len(proposals_df)
+    assert (dfResult['Subcatgory3_Nike'] == 'KIDS FOOTWEAR').any()
+    pd.testing.assert_frame_equal(proposals_df, proposals_frame(300, 0))
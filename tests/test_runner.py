@@ -0,0 +1,25 @@
+import pandas as pd
+import pytest
+
+from pipeline import runner
+
+TOY_STAGES = {
+    'numbers': {'run': lambda dictConfig, dictFrames, stageRecord: {'numbers': pd.DataFrame({'n': [1, 2, 3]})},
+                'deps': [], 'inputs': None, 'params': []},
+    'doubled': {'run': lambda dictConfig, dictFrames, stageRecord: {'doubled': dictFrames['numbers'] * 2},
+                'deps': ['numbers'], 'inputs': None, 'params': ['factor']},
+}
+
+def test_stage_frames_after_run(tmp_path, monkeypatch):
+    monkeypatch.setitem(runner.PIPELINES, 'toy', TOY_STAGES)
+    dictConfig = runner.complete_config({'pipeline': 'toy', 'base_path': str(tmp_path), 'client_name': 'toy',
+                                         'delivery_date': '2026-10-17', 'client_file': 'none', 'parallel_stages': 1})
+
+    with pytest.raises(ValueError):
+        runner.stage_frames(dictConfig, 'doubled')
+
+    runner.run_pipeline(dictConfig)
+
+    assert runner.stage_frames(dictConfig, 'doubled')['doubled']['n'].tolist() == [2, 4, 6]
+    with pytest.raises(ValueError):
+        runner.stage_frames({**dictConfig, 'factor': 3}, 'doubled')